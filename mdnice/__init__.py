@@ -33,6 +33,7 @@ from .image_uploaders import (
     LocalStorageUploader,
     WechatUploader,
     WechatUploadType,
+    create_session,
     create_smms_uploader,
     create_qiniu_uploader,
     create_github_uploader,
@@ -40,14 +41,36 @@ from .image_uploaders import (
     create_wechat_uploader,
 )
 
+# 导入离线渲染引擎与 CSS 内联引擎
+from .offline import OfflineRenderer, compare_structure
+from .embedded import EmbeddedRenderer
+from .platforms import transform_html
+from .cache import ConversionCache, MemoryCache, UploadCache, uploader_identity, uploader_ttl
+from .incremental import IncrementalPreview
+from .sections import split_sections, stitch_sections
+from .data_urls import extract_data_urls, restore_data_urls
+from .postprocess import PostProcessor, Rule, strip_editor_marks
+from .compact import compact_html
+from .images import ImageRef, collect_images, replace_image_urls, scan_images
+from .output import check_compression, write_if_changed
+from .sinks import OutputSink, DirectorySink, ArchiveSink, JSONLinesSink
+from .themes import EDITOR_STYLE_IDS, load_theme_pack
+from .css_inliner import CSSInliner
+
 import os
+import copy
+import asyncio
+import inspect
+import hashlib
 import re
 import time
 import random
+import textwrap
 from pathlib import Path
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
 from playwright.sync_api import sync_playwright, Browser, Page, Playwright, TimeoutError as PlaywrightTimeoutError
-from typing import Union, List, Optional, Callable, Dict, Any, Literal
+from typing import Union, List, Optional, Callable, Dict, Any, Literal, Tuple, Awaitable
 
 __all__ = [
     'convert',
@@ -57,9 +80,24 @@ __all__ = [
     'MarkdownConverter',
     'ConversionError',
     'ImageUploadMode',
+    'ImageUploader',
     'CodeTheme',
     'BrowserType',
     'BrowserConnectionType',
+    'Engine',
+    'OfflineRenderer',
+    'EmbeddedRenderer',
+    'ConversionCache',
+    'MemoryCache',
+    'UploadCache',
+    'collect_images',
+    'scan_images',
+    'IncrementalPreview',
+    'OutputSink',
+    'DirectorySink',
+    'ArchiveSink',
+    'JSONLinesSink',
+    'CSSInliner',
     '__version__',
     # 图床上传器类
     'SMUploader',
@@ -73,6 +111,7 @@ __all__ = [
     'WechatUploader',
     'WechatUploadType',
     # 便捷函数
+    'create_session',
     'create_smms_uploader',
     'create_qiniu_uploader',
     'create_github_uploader',
@@ -85,6 +124,9 @@ ImageUploadMode = Literal['local', 'remote', 'all']
 CodeTheme = Literal['wechat', 'atom-one-dark', 'atom-one-light', 'monokai', 'github', 'vs2015', 'xcode']
 BrowserType = Literal['chromium', 'firefox', 'webkit']
 BrowserConnectionType = Literal['auto', 'cdp', 'playwright']
+Engine = Literal['browser', 'offline', 'hybrid', 'embedded']
+# 图片上传函数：同步 (path) -> url，或异步 async (path) -> url
+ImageUploader = Union[Callable[[str], str], Callable[[str], Awaitable[str]]]
 
 
 class ConversionError(Exception):
@@ -133,13 +175,44 @@ class MarkdownConverter:
         'juejin': {'button_id': 'nice-sidebar-juejin', 'name': '稀土掘金', 'suffix': 'juejin'}
     }
 
+    # 复制事件拦截脚本（通过 add_init_script 注册，每次导航前自动执行一次）
+    COPY_INTERCEPTOR_JS = """
+    (() => {
+        if (window._copyInterceptorReady) return;
+        window._capturedHTML = null;
+
+        document.addEventListener('copy', function(e) {
+            if (e.clipboardData) {
+                var htmlData = e.clipboardData.getData('text/html');
+                if (htmlData) {
+                    window._capturedHTML = htmlData;
+                }
+            }
+        }, true);
+
+        window._copyInterceptorReady = true;
+    })();
+    """
+
+    # 编辑器页面渲染接口的探测名称（按优先级，use_render_api=True 时探测）
+    # 公开部署的编辑器没有暴露这些全局变量，需要自行构建编辑器并按以下约定暴露
+    # 完整接口：window[name](markdown, options) 或 window[name].render(markdown, options)，直接返回带样式HTML
+    RENDER_API_NAMES = ['mdniceRender', '__MDNICE_RENDER__']
+    # 拆分接口：markdown-it 实例 + juice 内联函数，主题 CSS 取自下列 <style> 元素
+    RENDER_PARSER_NAMES = ['markdownParser', 'mdniceParser']
+    RENDER_JUICE_NAMES = ['juice']
+    RENDER_STYLE_IDS = list(EDITOR_STYLE_IDS.values())
+
+    # 从页面取回大字符串时每块的长度（UTF-16 码元），避免单条协议消息过大
+    TRANSFER_CHUNK_SIZE = 256 * 1024
+
     def __init__(self,
                  headless: bool = True,
                  wait_timeout: int = 30,
                  retry_count: int = 1,
                  on_error: Optional[Callable[[str, Dict[str, Any]], None]] = None,
                  editor_url: Optional[Union[str, List[str]]] = None,
-                 image_uploader: Optional[Callable[[str], str]] = None,
+                 image_uploader: Optional[ImageUploader] = None,
                  image_upload_mode: ImageUploadMode = 'local',
                  code_theme: CodeTheme = 'atom-one-dark',
                  mac_style: bool = True,
@@ -148,7 +221,20 @@ class MarkdownConverter:
                  browser_connection_type: BrowserConnectionType = 'auto',
                  browser_token: Optional[str] = None,
                  clean_html: bool = True,
-                 proxy: Optional[Dict[str, str]] = None) -> None:
+                 proxy: Optional[Dict[str, str]] = None,
+                 use_render_api: bool = False,
+                 verify_ratio: float = 0.0,
+                 render_bundle: Optional[Union[str, Path]] = None,
+                 cache_dir: Optional[Union[str, Path]] = None,
+                 cache_max_bytes: int = 256 * 1024 * 1024,
+                 memory_cache: Optional[MemoryCache] = None,
+                 render_pages: int = 1,
+                 parallel_min_chars: int = 200_000,
+                 post_processors: Optional[List[Rule]] = None,
+                 compact: bool = False,
+                 output_compression: Optional[List[str]] = None,
+                 image_upload_concurrency: int = 4,
+                 upload_cache: Optional[UploadCache] = None) -> None:
         """
         初始化转换器
 
@@ -157,7 +243,7 @@ class MarkdownConverter:
         :param retry_count: 失败重试次数
         :param on_error: 错误通知回调函数
         :param editor_url: 自定义编辑器网址（字符串或列表）
-        :param image_uploader: 图片上传回调函数
+        :param image_uploader: 图片上传回调函数（同步函数，或 async 函数）
         :param image_upload_mode: 图片上传模式（local/remote/all）
         :param code_theme: 代码主题
         :param mac_style: 是否启用 Mac 风格
@@ -167,17 +253,64 @@ class MarkdownConverter:
         :param browser_token: 远程浏览器访问令牌
         :param clean_html: 是否清理HTML中的编辑器标记（默认True）
         :param proxy: 代理配置，例如 {'server': 'http://proxy.com:8080', 'username': 'user', 'password': 'pass'}
+        :param use_render_api: 是否探测并优先调用编辑器页面暴露的渲染接口（绕过 CodeMirror，找不到时自动回退；
+            公开部署的编辑器没有这些接口，适用于自行构建的编辑器）
+        :param verify_ratio: hybrid 引擎下抽样与编辑器渲染结果比对的比例（0~1，默认不比对）
+        :param render_bundle: embedded 引擎使用的编辑器渲染包（JS 文件路径或 URL）
+        :param cache_dir: 转换结果缓存目录（None 表示不缓存；命中时不启动浏览器）
+        :param cache_max_bytes: 转换结果缓存的总大小上限（字节），超过时淘汰最久未使用的条目
+        :param memory_cache: 进程内 LRU 缓存（可在多个转换器间共用，相同的并发请求只转换一次）
+        :param render_pages: 超长文档并行渲染使用的页面数（1 表示不拆分）
+        :param parallel_min_chars: 文档达到多少字符时按标题拆分并行渲染
+        :param post_processors: 自定义后处理规则（见 postprocess 模块），在内置的清理规则之后执行
+        :param compact: 是否压缩输出（去掉冗余的内联样式声明和空白，减小文章体积）
+        :param output_compression: 保存文件时同时生成的压缩副本（gzip/br），例如 ['gzip']
+        :param image_upload_concurrency: 同时上传的图片数（1 表示逐张上传）
+        :param upload_cache: 图片上传缓存（按图片内容和图床记录上传地址，跨运行复用）
         """
         self.headless: bool = headless
         self.wait_timeout: int = wait_timeout * 1000  # Playwright 使用毫秒
         self.retry_count: int = retry_count
         self.on_error: Optional[Callable[[str, Dict[str, Any]], None]] = on_error
-        self.image_uploader: Optional[Callable[[str], str]] = image_uploader
+        self.image_uploader: Optional[ImageUploader] = image_uploader
         self.image_upload_mode: ImageUploadMode = image_upload_mode
+        if image_upload_concurrency < 1:
+            raise ValueError("image_upload_concurrency 必须大于等于 1")
+        self.image_upload_concurrency: int = image_upload_concurrency
+        self.upload_cache: Optional[UploadCache] = upload_cache
+        if upload_cache is not None and image_uploader is not None and uploader_identity(image_uploader) is None:
+            print("⚠️ image_uploader 没有声明 cache_identity，无法区分图床，不使用上传缓存")
         self.code_theme: CodeTheme = code_theme
         self.mac_style: bool = mac_style
         self.clean_html: bool = clean_html
+        self.post_processor: PostProcessor = PostProcessor(
+            ([strip_editor_marks] if clean_html else []) + list(post_processors or []))
+        self.compact: bool = compact
+        # 压缩统计（累计的输入、输出字节数）
+        self.compact_stats: Dict[str, int] = {'input_bytes': 0, 'output_bytes': 0}
+        check_compression(output_compression or [])
+        self.output_compression: List[str] = list(output_compression or [])
+        # 保存文件统计（写入、内容未变化跳过的文件数）
+        self.output_stats: Dict[str, int] = {'written': 0, 'skipped': 0}
         self.proxy: Optional[Dict[str, str]] = proxy
+        self.use_render_api: bool = use_render_api
+
+        if not 0.0 <= verify_ratio <= 1.0:
+            raise ValueError("verify_ratio 必须在 0 到 1 之间")
+        self.verify_ratio: float = verify_ratio
+        self.render_bundle: Optional[Union[str, Path]] = render_bundle
+
+        # 转换结果缓存（磁盘，按内容哈希）
+        self.cache: Optional[ConversionCache] = (
+            ConversionCache(cache_dir, max_bytes=cache_max_bytes) if cache_dir else None)
+        self._editor_version: Optional[str] = None
+        self.memory_cache: Optional[MemoryCache] = memory_cache
+
+        # 超长文档分段并行渲染
+        if render_pages < 1:
+            raise ValueError("render_pages 必须大于等于 1")
+        self.render_pages: int = render_pages
+        self.parallel_min_chars: int = parallel_min_chars
 
         # 远程浏览器配置
         self.browser_ws_endpoint: Optional[str] = browser_ws_endpoint
@@ -190,6 +323,36 @@ class MarkdownConverter:
         self.browser: Optional[Browser] = None
         self.page: Optional[Page] = None
 
+        # 已授予剪贴板权限的源（每个浏览器上下文只授予一次）
+        self._clipboard_granted_origins: set = set()
+
+        # 页面渲染接口模式（'api' / 'pieces' / None）和当前页面已应用的样式
+        self._render_api_mode: Optional[str] = None
+        self._ui_state: Dict[str, Any] = {}
+
+        # 批量转换时通过页面渲染接口预先渲染的结果（(Markdown, 主题, 代码主题, Mac 风格, 平台) -> HTML）
+        self._api_prefetched: Dict[Tuple[str, str, str, bool, str], Optional[str]] = {}
+
+        # 编辑器中是否已输入过内容（再次走编辑器流程前需要先清空）
+        self._editor_used: bool = False
+
+        # 分段并行渲染的工作转换器（各自绑定一个线程和浏览器，多篇文档之间复用，关闭浏览器时一并关闭）
+        self._section_workers: List[Tuple[ThreadPoolExecutor, 'MarkdownConverter']] = []
+
+        # 本次转换中已上传的图片（内容键 -> URL，每次 convert 重置，IncrementalPreview 会话中一直保留）
+        self._uploaded_images: Dict[str, str] = {}
+        # 本地图片的内容键（(路径, 修改时间, 大小) -> 内容键），避免重复读取
+        self._image_hashes: Dict[Tuple[str, int, int], str] = {}
+
+        # 离线渲染器（首次使用 engine='offline' 或 'hybrid' 时创建）
+        self._offline_renderer: Optional[OfflineRenderer] = None
+
+        # 内嵌 JS 渲染器（首次使用 engine='embedded' 时创建，多次转换之间复用）
+        self._embedded_renderer: Optional[EmbeddedRenderer] = None
+
+        # hybrid 引擎统计（每次 convert 重置；增量预览等直接渲染时持续累加）
+        self.hybrid_stats: Dict[str, Any] = self._new_hybrid_stats()
+
         # 默认和备用地址
         self.default_url: str = "https://xiaoqiangclub.github.io/md/"
         self.backup_url: str = "https://whaoa.github.io/markdown-nice/"
@@ -278,51 +441,25 @@ class MarkdownConverter:
         elif self.image_upload_mode != 'local':
             print(f"⚠️ 警告: 未设置图片上传函数，image_upload_mode 参数将被忽略")
 
-    def _clean_html(self, html_content: str) -> str:
+    def _post_process(self, html_content: str) -> str:
         """
-        清理HTML中的编辑器标记
-
-        移除：
-        - data-tool="mdnice编辑器"
-        - data-website="https://www.mdnice.com"
-        - 其他 mdnice 相关属性
+        对输出 HTML 执行后处理流水线（清理编辑器标记和自定义规则，一次扫描完成），启用时再压缩
 
         :param html_content: 原始HTML内容
-        :return: 清理后的HTML内容
+        :return: 处理后的HTML内容
         """
-        if not self.clean_html:
-            return html_content
-
         try:
-            import re
-
-            # 移除 data-tool 属性
-            html_content = re.sub(
-                r'\s*data-tool="mdnice编辑器"',
-                '',
-                html_content
-            )
-
-            # 移除 data-website 属性
-            html_content = re.sub(
-                r'\s*data-website="[^"]*"',
-                '',
-                html_content
-            )
-
-            # 可选：移除其他 mdnice 相关的 data 属性
-            # html_content = re.sub(
-            #     r'\s*data-mdnice-[^=]*="[^"]*"',
-            #     '',
-            #     html_content
-            # )
-
-            print("✅ HTML 已清理编辑器标记")
+            html_content = self.post_processor.process(html_content)
+            if self.compact:
+                size = len(html_content.encode('utf-8'))
+                html_content, saved = compact_html(html_content)
+                self.compact_stats['input_bytes'] += size
+                self.compact_stats['output_bytes'] += size - saved
+                print(f"🗜️ 已压缩 HTML: {size / 1024:.1f} KB → {(size - saved) / 1024:.1f} KB")
             return html_content
-
         except Exception as e:
-            print(f"⚠️ HTML 清理失败: {e}")
-            # 清理失败也返回原内容，不影响功能
+            print(f"⚠️ HTML 后处理失败: {e}")
+            # 后处理失败也返回原内容，不影响功能
             return html_content
 
     def _build_ws_url_with_token(self, ws_endpoint: str, token: Optional[str]) -> str:
@@ -374,6 +511,60 @@ class MarkdownConverter:
         except Exception:
             return False
 
+    def _fetch_page_string(self, producer: str, cdp: Any = None) -> Optional[str]:
+        """
+        在页面内生成字符串并分块取回
+
+        结果先暂存在 window._mdniceTransfer 中，只把长度传回 Python，
+        再按 TRANSFER_CHUNK_SIZE 分块读取并在本地拼接，避免一次性序列化数 MB 的 HTML。
+
+        :param producer: 求值结果为字符串（或 Promise<string>）的 JS 表达式
+        :param cdp: CDP 会话，传入时通过 Runtime.evaluate 读取，否则使用 page.evaluate
+        :return: 完整字符串，结果不是字符串时返回 None
+        """
+        def evaluate(expression: str) -> Any:
+            if cdp is None:
+                return self.page.evaluate(expression)
+            result = cdp.send('Runtime.evaluate', {
+                'expression': expression,
+                'awaitPromise': True,
+                'returnByValue': True
+            })
+            if 'exceptionDetails' in result:
+                raise ConversionError(result['exceptionDetails'].get('text', 'Runtime.evaluate 执行失败'))
+            return result.get('result', {}).get('value')
+
+        length = evaluate(f"""
+            (async () => {{
+                const value = await ({producer});
+                window._mdniceTransfer = (typeof value === 'string') ? value : null;
+                return window._mdniceTransfer === null ? -1 : window._mdniceTransfer.length;
+            }})()
+        """)
+
+        if length is None or length < 0:
+            return None
+
+        chunks = []
+        start = 0
+        try:
+            while start < length:
+                # 不在代理对中间切断，否则单个分块无法正确编码
+                chunk, start = evaluate(f"""
+                    (() => {{
+                        const text = window._mdniceTransfer;
+                        let end = Math.min({start} + {self.TRANSFER_CHUNK_SIZE}, text.length);
+                        const code = text.charCodeAt(end - 1);
+                        if (end < text.length && code >= 0xD800 && code <= 0xDBFF) end -= 1;
+                        return [text.slice({start}, end), end];
+                    }})()
+                """)
+                chunks.append(chunk)
+        finally:
+            evaluate("(() => { window._mdniceTransfer = null; return true; })()")
+
+        return ''.join(chunks)
+
     def _init_driver(self) -> None:
         """初始化浏览器驱动"""
         try:
@@ -490,6 +681,7 @@ class MarkdownConverter:
                 print(f"✅ 本地浏览器驱动初始化成功（{self.browser_type}）")
 
             self.page.set_default_timeout(self.wait_timeout)
+            self._inject_copy_interceptor()
 
         except Exception as e:
             error_msg = f"浏览器驱动初始化失败: {str(e)}"
@@ -525,11 +717,16 @@ class MarkdownConverter:
             raise ConversionError(error_msg) from e
 
     def _close_driver(self) -> None:
-        """关闭浏览器驱动"""
+        """关闭浏览器驱动（包括分段并行渲染的工作浏览器）"""
+        self._close_section_workers()
+        if not (self.page or self.browser or self.playwright):
+            return
+
         try:
             if self.page:
                 self.page.close()
                 self.page = None
+            self._clipboard_granted_origins.clear()
             if self.browser:
                 self.browser.close()
                 self.browser = None
@@ -560,6 +757,9 @@ class MarkdownConverter:
                 self.page.goto(self.current_url, wait_until='domcontentloaded')
                 self.page.wait_for_selector('.CodeMirror', timeout=self.wait_timeout)
                 time.sleep(3)
+                self._ui_state = {}
+                self._render_api_mode = None
+                self._editor_used = False
 
                 print(f"✅ 网页加载成功")
                 return
@@ -588,42 +788,654 @@ class MarkdownConverter:
                         f"{final_error_msg}，最后错误: {str(last_error)}") from last_error
 
     def _inject_copy_interceptor(self) -> None:
-        """注入JavaScript代码来拦截复制事件"""
+        """
+        注册复制事件拦截器
+
+        通过 add_init_script 注册，之后每次导航都会在页面脚本之前自动安装，
+        无需在每次加载或每篇文章之后重新注入。
+        """
         try:
-            # 给页面一点时间完成加载和JS初始化
-            time.sleep(1)
+            self.page.add_init_script(self.COPY_INTERCEPTOR_JS)
+            print("✅ 已注册复制拦截器")
+        except Exception as e:
+            print(f"❌ 注册拦截器失败: {e}")
+            # 注册失败不抛出异常，因为我们有其他获取方案
+            print(f"⚠️ 将使用备用方案获取HTML")
 
-            # 先授予剪贴板权限（如果是远程浏览器）
-            if self.browser_ws_endpoint:
-                self._grant_clipboard_permissions()
+    def _ensure_copy_interceptor(self) -> None:
+        """页面加载后确认拦截器已就绪（init script 未生效时直接注入一次），并授予剪贴板权限"""
+        try:
+            if not self.page.evaluate("() => window._copyInterceptorReady === true"):
+                self.page.evaluate(self.COPY_INTERCEPTOR_JS)
+                print("✅ 已直接注入复制拦截器")
+        except Exception as e:
+            print(f"⚠️ 检查复制拦截器失败: {e}，将使用备用方案获取HTML")
 
-            js_code = """
-            window._capturedHTML = null;
-            window._copyInterceptorReady = false;
-
-            document.addEventListener('copy', function(e) {
-                console.log('复制事件已触发');
-                if (e.clipboardData) {
-                    var htmlData = e.clipboardData.getData('text/html');
-                    if (htmlData) {
-                        window._capturedHTML = htmlData;
-                        console.log('已捕获HTML，长度:', htmlData.length);
+        # 远程浏览器需要显式授予剪贴板权限（每个源只授予一次）
+        if self.browser_ws_endpoint:
+            self._grant_clipboard_permissions()
+
+    def _render_offline(self,
+                        md_content: str,
+                        theme: str,
+                        code_theme: str,
+                        mac_style: bool,
+                        platform: Platform) -> str:
+        """
+        使用离线渲染引擎渲染单篇文档（不启动浏览器）
+
+        :param md_content: Markdown内容
+        :param theme: 主题名称
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        :param platform: 目标平台
+        :return: 转换后的HTML
+        """
+        try:
+            html_content = self._get_offline_renderer().render(
+                md_content, theme=theme, code_theme=code_theme, mac_style=mac_style, platform=platform)
+            print(f"✅ 离线渲染完成（{len(html_content)} 字符）")
+            return html_content
+        except Exception as e:
+            error_msg = f"离线渲染失败: {str(e)}"
+            print(f"❌ {error_msg}")
+            self._notify_error(error_msg, {
+                'stage': '离线渲染',
+                'theme': theme,
+                'error_type': type(e).__name__
+            })
+            raise ConversionError(error_msg) from e
+
+    def _render_embedded(self,
+                         md_content: str,
+                         theme: str,
+                         code_theme: str,
+                         mac_style: bool,
+                         platform: Platform) -> str:
+        """
+        在进程内 JS 引擎中执行编辑器渲染包（不启动浏览器）
+
+        :param md_content: Markdown内容
+        :param theme: 主题名称
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        :param platform: 目标平台
+        :return: 转换后的HTML
+        """
+        try:
+            if self._embedded_renderer is None:
+                self._embedded_renderer = EmbeddedRenderer(
+                    self.render_bundle,
+                    api_names=self.RENDER_API_NAMES,
+                    parser_names=self.RENDER_PARSER_NAMES,
+                    juice_names=self.RENDER_JUICE_NAMES,
+                    timeout=int(self.wait_timeout / 1000))
+
+            html_content = self._embedded_renderer.render(
+                md_content, theme=theme, code_theme=code_theme, mac_style=mac_style, platform=platform)
+            print(f"✅ 内嵌引擎渲染完成（{len(html_content)} 字符）")
+            return html_content
+        except Exception as e:
+            error_msg = f"内嵌引擎渲染失败: {str(e)}"
+            print(f"❌ {error_msg}")
+            self._notify_error(error_msg, {
+                'stage': '内嵌引擎渲染',
+                'theme': theme,
+                'error_type': type(e).__name__
+            })
+            raise ConversionError(error_msg) from e
+
+    def _ensure_browser(self) -> None:
+        """启动浏览器并加载编辑器页面（已就绪时直接返回）"""
+        if self.page is not None:
+            return
+
+        try:
+            self._retry_on_error(self._init_driver)
+            self._retry_on_error(self._load_page)
+        except Exception:
+            # 启动失败时释放已创建的资源，下次调用重新启动
+            self._close_driver()
+            raise
+        self._ensure_copy_interceptor()
+        self._probe_render_api()
+
+        self._editor_version = self._detect_editor_version()
+        if self.cache is not None:
+            # 按实际加载的地址记录（主地址不可用时加载的是备用编辑器，版本不能混用）
+            self.cache.set_editor_version(self.current_url, self._editor_version)
+
+    def _render_version(self, engine: Engine, md_content: str, resolve_editor: bool = True) -> Optional[str]:
+        """
+        获取影响渲染结果的版本标识（用于缓存键）
+
+        :param engine: 渲染引擎
+        :param md_content: Markdown内容（hybrid 引擎据此判断会走哪条渲染路径）
+        :param resolve_editor: 是否区分编辑器版本（进程内缓存靠有效期淘汰，不区分）
+        :return: 版本标识；编辑器版本未知（未打开过页面或记录已过期）时返回 None
+        """
+        pack = load_theme_pack()
+        local_version = f"{__version__}:{pack['version'] if pack else 'builtin'}"
+
+        if engine == 'offline' or (
+                engine == 'hybrid' and not self._get_offline_renderer().unsupported_features(md_content)):
+            return f'offline:{local_version}'
+
+        if engine == 'embedded':
+            bundle = str(self.render_bundle)
+            if os.path.exists(bundle):
+                bundle += f':{os.path.getmtime(bundle)}'
+            return f'embedded:{local_version}:{bundle}'
+
+        if not resolve_editor:
+            return 'editor'
+        if self.page is not None and self._editor_version:
+            return f'editor:{self._editor_version}'
+        version = self.cache.get_editor_version(self.current_url) if self.cache else None
+        return f'editor:{version}' if version else None
+
+    def _cache_key(self,
+                   md_content: str,
+                   engine: Engine,
+                   theme: str,
+                   code_theme: str,
+                   mac_style: bool,
+                   platform: Platform,
+                   resolve_editor: bool = True) -> Optional[str]:
+        """
+        计算转换结果缓存键
+
+        :return: 缓存键；版本未知时返回 None（不能查找，只能在渲染后写入）
+        """
+        version = self._render_version(engine, md_content, resolve_editor)
+        if version is None:
+            return None
+        return ConversionCache.make_key(
+            md_content, theme=theme, code_theme=code_theme, mac_style=mac_style, platform=platform,
+            clean_html=self.clean_html, engine=engine, version=version)
+
+    def _render_document(self,
+                         engine: Engine,
+                         md_content: str,
+                         theme: str,
+                         code_theme: str,
+                         mac_style: bool,
+                         platform: Platform) -> str:
+        """
+        按渲染引擎渲染单篇文档（先查进程内缓存，再查磁盘缓存，命中则不启动浏览器）
+
+        未上传的 Data URL 图片在渲染和缓存中使用占位地址，返回前再替换回来。
+
+        :param engine: 渲染引擎
+        :param md_content: 图片处理后的 Markdown内容
+        :param theme: 主题名称
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        :param platform: 目标平台
+        :return: 转换后的HTML
+        """
+        md_content, data_urls = extract_data_urls(md_content)
+        if self.memory_cache is not None:
+            memory_key = self._cache_key(
+                md_content, engine, theme, code_theme, mac_style, platform, resolve_editor=False)
+            html_content = self.memory_cache.get_or_render(
+                memory_key,
+                lambda: self._render_with_disk_cache(engine, md_content, theme, code_theme, mac_style, platform))
+        else:
+            html_content = self._render_with_disk_cache(engine, md_content, theme, code_theme, mac_style, platform)
+        return restore_data_urls(html_content, data_urls)
+
+    def _render_with_disk_cache(self,
+                                engine: Engine,
+                                md_content: str,
+                                theme: str,
+                                code_theme: str,
+                                mac_style: bool,
+                                platform: Platform) -> str:
+        """按渲染引擎渲染单篇文档（启用磁盘缓存时先查缓存）"""
+        if self.cache is not None:
+            cache_key = self._cache_key(md_content, engine, theme, code_theme, mac_style, platform)
+            html_content = self.cache.get(cache_key)
+            if html_content is not None:
+                print(f"💾 命中转换缓存（{len(html_content)} 字符）")
+                return html_content
+
+        html_content = self._render_uncached(engine, md_content, theme, code_theme, mac_style, platform)
+
+        if self.cache is not None:
+            # 浏览器刚启动时编辑器版本才确定，这里重新计算缓存键
+            cache_key = self._cache_key(md_content, engine, theme, code_theme, mac_style, platform)
+            if cache_key is not None:
+                self.cache.set(cache_key, html_content)
+        return html_content
+
+    def _render_uncached(self,
+                         engine: Engine,
+                         md_content: str,
+                         theme: str,
+                         code_theme: str,
+                         mac_style: bool,
+                         platform: Platform) -> str:
+        """按渲染引擎渲染单篇文档（不经过缓存）"""
+        if engine == 'offline':
+            return self._render_offline(md_content, theme, code_theme, mac_style, platform)
+        if engine == 'embedded':
+            return self._render_embedded(md_content, theme, code_theme, mac_style, platform)
+        if engine == 'hybrid':
+            return self._render_hybrid(md_content, theme, code_theme, mac_style, platform)
+
+        if self.render_pages > 1 and len(md_content) >= self.parallel_min_chars:
+            html_content = self._render_sections(md_content, theme, code_theme, mac_style, platform)
+            if html_content is not None:
+                return html_content
+
+        self._ensure_browser()
+        return self._render_in_browser(
+            md_content, theme, code_theme, mac_style, platform, clear_editor=self._editor_used)
+
+    def _spawn_worker(self) -> 'MarkdownConverter':
+        """
+        创建配置相同、浏览器独立的转换器（Playwright 同步接口的对象只能在创建它的线程中使用）
+
+        可变属性逐一复制或重置，工作转换器和当前转换器之间不共享任何可变状态
+
+        :return: 尚未启动浏览器的转换器
+        """
+        worker = copy.copy(self)
+        # 配置：复制一份
+        worker.proxy = copy.deepcopy(self.proxy)
+        worker.url_list = list(self.url_list)
+        worker.output_compression = list(self.output_compression)
+        worker.post_processor = PostProcessor(self.post_processor.rules)
+        # 浏览器和页面状态
+        worker.playwright = None
+        worker.browser = None
+        worker.page = None
+        worker._clipboard_granted_origins = set()
+        worker._render_api_mode = None
+        worker._ui_state = {}
+        worker._api_prefetched = {}
+        worker._editor_used = False
+        worker._section_workers = []
+        # 统计、缓存和渲染器：工作转换器只负责在浏览器中渲染，不使用这些状态
+        worker.compact_stats = {'input_bytes': 0, 'output_bytes': 0}
+        worker.output_stats = {'written': 0, 'skipped': 0}
+        worker.hybrid_stats = self._new_hybrid_stats()
+        worker._uploaded_images = {}
+        worker._image_hashes = {}
+        worker._offline_renderer = None
+        worker._embedded_renderer = None
+        worker.image_uploader = None
+        worker.upload_cache = None
+        worker.cache = None
+        worker.memory_cache = None
+        worker.render_pages = 1
+        return worker
+
+    def _close_section_workers(self) -> None:
+        """在各自的线程中关闭工作转换器的浏览器，并结束工作线程"""
+        workers, self._section_workers = self._section_workers, []
+        for executor, worker in workers:
+            try:
+                executor.submit(worker._close_driver).result()
+            except Exception as e:
+                print(f"⚠️ 关闭分段渲染浏览器时出错: {e}")
+            finally:
+                executor.shutdown()
+
+    def _render_sections(self,
+                         md_content: str,
+                         theme: str,
+                         code_theme: str,
+                         mac_style: bool,
+                         platform: Platform) -> Optional[str]:
+        """
+        超长文档按标题拆分，第一段在当前页面渲染，其余各段在独立页面中并行渲染，再按顺序拼接
+
+        :param md_content: Markdown内容
+        :param theme: 主题名称
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        :param platform: 目标平台
+        :return: 拼接后的HTML；不能拆分或并行渲染失败时返回 None（由调用方整篇渲染）
+        """
+        sections = split_sections(md_content, self.render_pages)
+        if len(sections) < 2:
+            return None
+
+        print(f"🧩 文档较长（{len(md_content)} 字符），拆成 {len(sections)} 段并行渲染")
+        start_time = time.time()
+
+        # 工作转换器按需补足；每个工作转换器固定在自己的线程中，浏览器在多篇文档之间复用
+        while len(self._section_workers) < len(sections) - 1:
+            self._section_workers.append((
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix='mdnice-section'), self._spawn_worker()))
+
+        try:
+            futures = [executor.submit(worker._render_uncached, 'browser', section, theme, code_theme, mac_style, platform)
+                       for (executor, worker), section in zip(self._section_workers, sections[1:])]
+            self._ensure_browser()
+            htmls = [self._render_in_browser(
+                sections[0], theme, code_theme, mac_style, platform, clear_editor=self._editor_used)]
+            htmls.extend(future.result() for future in futures)
+            html_content = stitch_sections(htmls)
+        except Exception as e:
+            print(f"⚠️ 分段并行渲染失败: {e}，改为整篇渲染")
+            self._notify_error(f"分段并行渲染失败: {str(e)}", {
+                'stage': '分段渲染',
+                'sections': len(sections),
+                'error_type': type(e).__name__
+            })
+            return None
+
+        print(f"✅ {len(sections)} 段渲染完成并已拼接（{time.time() - start_time:.1f} 秒）")
+        return html_content
+
+    def _get_offline_renderer(self) -> OfflineRenderer:
+        """获取（首次使用时创建的）离线渲染器"""
+        if self._offline_renderer is None:
+            self._offline_renderer = OfflineRenderer()
+        return self._offline_renderer
+
+    @staticmethod
+    def _new_hybrid_stats() -> Dict[str, Any]:
+        """hybrid 引擎的初始统计"""
+        return {'offline': 0, 'fallback': 0, 'verified': 0, 'mismatched': 0, 'mismatches': []}
+
+    def _render_hybrid(self,
+                       md_content: str,
+                       theme: str,
+                       code_theme: str,
+                       mac_style: bool,
+                       platform: Platform) -> str:
+        """
+        hybrid 引擎：默认离线渲染，遇到离线引擎不支持的语法时交给编辑器，并按比例抽样比对
+
+        :param md_content: Markdown内容
+        :param theme: 主题名称
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        :param platform: 目标平台
+        :return: 转换后的HTML
+        """
+        features = self._get_offline_renderer().unsupported_features(md_content)
+        if features:
+            print(f"🔀 包含离线引擎不支持的语法（{'、'.join(features)}），使用编辑器渲染")
+            self.hybrid_stats['fallback'] += 1
+            self._ensure_browser()
+            return self._render_in_browser(
+                md_content, theme, code_theme, mac_style, platform, clear_editor=self._editor_used)
+
+        html_content = self._render_offline(md_content, theme, code_theme, mac_style, platform)
+        self.hybrid_stats['offline'] += 1
+
+        if self.verify_ratio and random.random() < self.verify_ratio:
+            try:
+                print("🔍 抽样比对编辑器渲染结果...")
+                self._ensure_browser()
+                browser_html = self._render_in_browser(
+                    md_content, theme, code_theme, mac_style, platform, clear_editor=self._editor_used)
+                # 编辑器把外链转为文末脚注，离线引擎不转换，比对时还原为普通链接
+                differences = compare_structure(browser_html, html_content, ignore_link_footnotes=True)
+                self.hybrid_stats['verified'] += 1
+                if differences:
+                    self.hybrid_stats['mismatched'] += 1
+                    self.hybrid_stats['mismatches'].append(differences)
+                    print(f"⚠️ 离线结果与编辑器结构不一致: {differences[0]}")
+                else:
+                    print("✅ 离线结果与编辑器结构一致")
+            except Exception as e:
+                print(f"⚠️ 抽样比对失败（不影响离线结果）: {e}")
+
+        return html_content
+
+    def _report_hybrid_stats(self) -> None:
+        """输出 hybrid 引擎的渲染分布与抽样比对不一致率"""
+        stats = self.hybrid_stats
+        print(f"📊 混合渲染: 离线 {stats['offline']} 项，编辑器 {stats['fallback']} 项")
+        if stats['verified']:
+            stats['mismatch_rate'] = stats['mismatched'] / stats['verified']
+            print(f"📊 抽样比对 {stats['verified']} 项，结构不一致 {stats['mismatched']} 项"
+                  f"（{stats['mismatch_rate']:.1%}）")
+
+    def _probe_render_api(self) -> None:
+        """探测编辑器页面是否暴露了可直接调用的渲染接口"""
+        self._render_api_mode = None
+        if not self.use_render_api:
+            return
+
+        try:
+            self._render_api_mode = self.page.evaluate("""
+                ([apiNames, parserNames, juiceNames, styleIds]) => {
+                    const pick = (names, test) => {
+                        for (const name of names) {
+                            const value = window[name];
+                            if (value && test(value)) return value;
+                        }
+                        return null;
+                    };
+
+                    const api = pick(apiNames, v => typeof v === 'function' || typeof v.render === 'function');
+                    if (api) {
+                        const render = typeof api === 'function' ? api : api.render.bind(api);
+                        window._mdniceRenderHooks = { render: (md, options) => render(md, options) };
+                        return 'api';
+                    }
+
+                    const parser = pick(parserNames, v => typeof v.render === 'function');
+                    const juice = pick(juiceNames, v => typeof v === 'function' || typeof v.inlineContent === 'function');
+                    if (parser && juice) {
+                        const juiceOptions = { inlinePseudoElements: true, preserveImportant: true };
+                        window._mdniceRenderHooks = {
+                            render: (md) => {
+                                const css = styleIds.map(id => {
+                                    const el = document.getElementById(id);
+                                    return el ? el.textContent : '';
+                                }).join('\\n');
+                                const html = '<section id="nice">' + parser.render(md) + '</section>';
+                                return typeof juice.inlineContent === 'function'
+                                    ? juice.inlineContent(html, css, juiceOptions)
+                                    : juice('<style>' + css + '</style>' + html, juiceOptions);
+                            }
+                        };
+                        return 'pieces';
                     }
+
+                    window._mdniceRenderHooks = null;
+                    return null;
                 }
-            }, true);
+            """, [self.RENDER_API_NAMES, self.RENDER_PARSER_NAMES, self.RENDER_JUICE_NAMES, self.RENDER_STYLE_IDS])
+        except Exception as e:
+            print(f"⚠️ 探测页面渲染接口失败: {e}")
+            self._render_api_mode = None
 
-            window._copyInterceptorReady = true;
-            console.log('复制拦截器已安装');
-            """
+        if self._render_api_mode == 'api':
+            print("⚡ 检测到页面渲染接口，将绕过编辑器直接渲染")
+        elif self._render_api_mode == 'pieces':
+            print("⚡ 检测到 markdown-it 与 juice，将绕过编辑器直接渲染（知乎、掘金格式由微信格式转换）")
+        else:
+            print("ℹ️ 未检测到页面渲染接口，使用编辑器流程")
 
-            self.page.evaluate(js_code)
-            print("✅ 已注入复制拦截器")
+    def _detect_editor_version(self) -> str:
+        """
+        根据页面加载的脚本和样式地址计算编辑器版本标识（构建产物带 hash，部署更新后会变化）
 
+        :return: 版本标识（16 位十六进制），获取失败时返回 'unknown'
+        """
+        try:
+            assets = self.page.evaluate("""
+                () => [...document.querySelectorAll('script[src], link[rel="stylesheet"][href]')]
+                    .map(el => el.src || el.href)
+                    .sort()
+            """)
+            return hashlib.sha256('\n'.join(assets).encode('utf-8')).hexdigest()[:16]
         except Exception as e:
-            error_msg = f"注入拦截器失败: {str(e)}"
-            print(f"❌ {error_msg}")
-            # 注入失败不抛出异常，因为我们有其他获取方案
-            print(f"⚠️ 将使用备用方案获取HTML")
+            print(f"⚠️ 获取编辑器版本失败: {e}")
+            return 'unknown'
+
+    def _render_via_api(self,
+                        markdown_list: List[str],
+                        theme: str,
+                        code_theme: str,
+                        mac_style: bool,
+                        platform: Platform) -> List[Optional[str]]:
+        """
+        调用页面渲染接口批量渲染文档（不经过 CodeMirror 和预览区）
+
+        :param markdown_list: 待渲染的 Markdown 列表
+        :param theme: 主题名称
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        :param platform: 目标平台
+        :return: 与输入一一对应的HTML列表，渲染失败的项为 None
+        """
+        options = {'theme': theme, 'codeTheme': code_theme, 'macStyle': mac_style, 'platform': platform}
+        lengths = self.page.evaluate("""
+            async ([docs, options]) => {
+                const hooks = window._mdniceRenderHooks;
+                window._mdniceRenderQueue = [];
+                for (const md of docs) {
+                    let html = null;
+                    try {
+                        html = await hooks.render(md, options);
+                    } catch (err) {
+                        console.error('渲染接口调用失败:', err);
+                    }
+                    window._mdniceRenderQueue.push(typeof html === 'string' ? html : null);
+                }
+                return window._mdniceRenderQueue.map(html => html === null ? -1 : html.length);
+            }
+        """, [markdown_list, options])
+
+        results: List[Optional[str]] = []
+        try:
+            for index, length in enumerate(lengths):
+                if length < 0:
+                    results.append(None)
+                else:
+                    results.append(self._fetch_page_string(f"window._mdniceRenderQueue[{index}]"))
+        finally:
+            self.page.evaluate("() => { window._mdniceRenderQueue = null; }")
+        return results
+
+    def _prefetch_api_renders(self,
+                              documents: List[Tuple[str, str]],
+                              code_theme: str,
+                              mac_style: bool,
+                              platform: Platform) -> None:
+        """
+        批量转换时，把缓存中没有的文档按主题分组，每组通过一次页面渲染接口调用全部渲染
+
+        结果暂存在 _api_prefetched 中，逐项渲染时直接取用；接口不可用或调用失败时不预渲染，逐项走原流程。
+
+        :param documents: [(图片处理后的 Markdown, 主题)]
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        :param platform: 目标平台
+        """
+        groups: Dict[str, List[str]] = {}
+        for md_content, theme in documents:
+            md_content = extract_data_urls(md_content)[0]
+            if self.render_pages > 1 and len(md_content) >= self.parallel_min_chars:
+                continue  # 超长文档分段并行渲染
+            if self.memory_cache is not None and self._cache_key(
+                    md_content, 'browser', theme, code_theme, mac_style, platform,
+                    resolve_editor=False) in self.memory_cache:
+                continue
+            if self.cache is not None and self._cache_key(
+                    md_content, 'browser', theme, code_theme, mac_style, platform) in self.cache:
+                continue
+            if md_content not in groups.setdefault(theme, []):
+                groups[theme].append(md_content)
+
+        if sum(len(group) for group in groups.values()) < 2:
+            return
+
+        try:
+            self._ensure_browser()
+            if self._render_api_mode not in ('api', 'pieces'):
+                return
+            for theme, group in groups.items():
+                if self._render_api_mode == 'pieces':
+                    self._apply_styles(theme, code_theme, mac_style)
+                start_time = time.time()
+                results = self._render_via_api(group, theme, code_theme, mac_style, platform)
+                for md_content, html_content in zip(group, results):
+                    if html_content and self._render_api_mode == 'pieces':
+                        html_content = transform_html(html_content, platform)
+                    self._api_prefetched[(md_content, theme, code_theme, mac_style, platform)] = html_content
+                print(f"⚡ 页面渲染接口批量渲染 {len(group)} 篇文档（{time.time() - start_time:.1f} 秒）")
+        except Exception as e:
+            print(f"⚠️ 批量渲染失败: {e}，逐项渲染")
+
+    def _apply_styles(self, theme: str, code_theme: str, mac_style: bool) -> None:
+        """
+        在编辑器中应用主题、代码主题和 Mac 风格（与当前页面状态一致的项不再重复点击）
+
+        :param theme: 主题名称
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        """
+        if self._ui_state.get('theme') != theme:
+            self._select_theme(theme)
+            self._ui_state['theme'] = theme
+
+        if self._ui_state.get('code_theme') != code_theme:
+            self._select_code_theme(code_theme)
+            self._ui_state['code_theme'] = code_theme
+
+        if self._ui_state.get('mac_style') != mac_style:
+            self._set_mac_style(mac_style)
+            self._ui_state['mac_style'] = mac_style
+
+    def _render_in_browser(self,
+                           md_content: str,
+                           theme: str,
+                           code_theme: str,
+                           mac_style: bool,
+                           platform: Platform,
+                           clear_editor: bool = False) -> str:
+        """
+        在编辑器页面中渲染单篇文档
+
+        优先调用页面渲染接口；接口不可用或渲染失败时回退到编辑器 DOM 流程。
+        拆分接口只能渲染微信格式，其他平台由微信格式经 platforms.transform_html 转换。
+
+        :param md_content: Markdown内容
+        :param theme: 主题名称
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        :param platform: 目标平台
+        :param clear_editor: 走 DOM 流程前是否先清空编辑器
+        :return: 转换后的HTML
+        """
+        html_content = self._api_prefetched.pop((md_content, theme, code_theme, mac_style, platform), None)
+        if html_content and len(html_content) >= 50:
+            print(f"✅ 使用批量渲染的结果（{len(html_content)} 字符）")
+            return html_content
+
+        if self._render_api_mode in ('api', 'pieces'):
+            try:
+                if self._render_api_mode == 'pieces':
+                    # 拆分接口依赖页面当前的主题样式
+                    self._apply_styles(theme, code_theme, mac_style)
+                html_content = self._render_via_api([md_content], theme, code_theme, mac_style, platform)[0]
+                if html_content and len(html_content) >= 50:
+                    print(f"✅ 已通过页面渲染接口获取HTML（{len(html_content)} 字符）")
+                    if self._render_api_mode == 'pieces':
+                        html_content = transform_html(html_content, platform)
+                    return html_content
+                print("⚠️ 页面渲染接口未返回有效内容，回退到编辑器流程")
+            except Exception as e:
+                print(f"⚠️ 页面渲染接口调用失败: {e}，回退到编辑器流程")
+
+        if clear_editor:
+            self._clear_editor()
+
+        self._editor_used = True
+        self._apply_styles(theme, code_theme, mac_style)
+        self._input_markdown(md_content)
+        return self._retry_on_error(self._get_converted_html, platform)
 
     def _select_theme(self, theme: str) -> None:
         """
@@ -839,106 +1651,289 @@ class MarkdownConverter:
 
         return False
 
-    def _process_images_in_markdown(self, markdown_content: str, base_path: Optional[Path] = None) -> str:
+    def _upload_target(self, image_path: str, base_path: Optional[Path] = None) -> Optional[str]:
         """
-        处理Markdown中的图片，根据模式上传到图床
+        确定图片的上传目标
 
-        :param markdown_content: Markdown内容
+        :param image_path: Markdown 中的图片地址
         :param base_path: Markdown文件所在目录，用于解析相对路径
-        :return: 处理后的Markdown内容
+        :return: 传给上传函数的路径或地址；不需要上传时返回 None
         """
-        if not self.image_uploader:
-            return markdown_content
+        is_remote = self._is_remote_url(image_path)
+        is_data = self._is_data_url(image_path)
+
+        if not self._should_upload_image(image_path, is_remote):
+            if is_remote:
+                print(f"  ⏭️ 跳过网络图片 [模式不匹配]: {image_path[:60]}...")
+            elif is_data:
+                print(f"  ⏭️ 跳过Data URL图片 [模式不匹配]")
+            else:
+                print(f"  ⏭️ 跳过本地图片 [模式不匹配]: {Path(image_path).name}")
+            return None
 
-        mode_names = {
-            'local': '仅本地图片',
-            'remote': '仅网络图片',
-            'all': '所有图片'
-        }
-        print(f"🖼️ 开始处理Markdown中的图片 [模式: {mode_names[self.image_upload_mode]}]")
+        if is_remote or is_data:
+            return image_path
 
-        pattern = r'!\[([^\]]*)\]\(([^)\s]+)(?:\s+"([^"]*)")?\)'
+        if base_path and not os.path.isabs(image_path):
+            full_path = base_path / image_path
+        else:
+            full_path = Path(image_path)
+
+        full_path = full_path.resolve()
 
-        uploaded_count = 0
-        skipped_count = 0
-        failed_count = 0
+        if not full_path.exists():
+            print(f"  ⚠️ 图片文件不存在，保持原样: {image_path}")
+            return None
 
-        def replace_image(match: re.Match) -> str:
-            nonlocal uploaded_count, skipped_count, failed_count
+        valid_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg'}
+        if full_path.suffix.lower() not in valid_extensions:
+            print(f"  ⚠️ 非图片文件，跳过: {full_path.name}")
+            return None
 
-            alt_text = match.group(1)
-            image_path = match.group(2)
-            title_text = match.group(3) if match.group(3) else None
+        return str(full_path)
 
-            is_remote = self._is_remote_url(image_path)
-            is_data = self._is_data_url(image_path)
+    def _upload_image(self, upload_target: str) -> str:
+        """
+        调用上传函数上传一张图片
 
-            if not self._should_upload_image(image_path, is_remote):
-                skipped_count += 1
-                if is_remote:
-                    print(f"  ⏭️ 跳过网络图片 [模式不匹配]: {image_path[:60]}...")
-                elif is_data:
-                    print(f"  ⏭️ 跳过Data URL图片 [模式不匹配]")
-                else:
-                    print(f"  ⏭️ 跳过本地图片 [模式不匹配]: {Path(image_path).name}")
-                return match.group(0)
+        :param upload_target: 图片路径或地址
+        :return: 上传后的URL
+        """
+        uploaded_url = self.image_uploader(upload_target)
+        if not uploaded_url:
+            raise ValueError("上传函数返回空URL")
+        return uploaded_url
+
+    def _upload_key(self, upload_target: str) -> str:
+        """
+        计算图片的去重键（本地图片按文件内容，Data URL 按内容，网络图片按地址；与上传缓存的内容键一致）
 
+        :param upload_target: 图片路径或地址
+        :return: 去重键
+        """
+        if self._is_data_url(upload_target):
+            return UploadCache.content_key(upload_target)
+        if self._is_remote_url(upload_target):
+            return 'url:' + upload_target
+
+        stat = os.stat(upload_target)
+        identity = (upload_target, stat.st_mtime_ns, stat.st_size)
+        key = self._image_hashes.get(identity)
+        if key is None:
+            key = self._image_hashes[identity] = UploadCache.content_key(upload_target)
+        return key
+
+    def _uploader_is_async(self) -> bool:
+        """上传函数是否为异步函数（async def 函数或 __call__ 为 async 的对象）"""
+        uploader = self.image_uploader
+        return inspect.iscoroutinefunction(uploader) or inspect.iscoroutinefunction(
+            getattr(uploader, '__call__', None))
+
+    def _upload_images(self, upload_targets: List[str]) -> List[Union[str, Exception]]:
+        """
+        并发上传图片（线程数不超过 image_upload_concurrency）
+
+        :param upload_targets: 图片路径或地址列表
+        :return: 与输入顺序一致的上传结果（URL 或上传时抛出的异常）
+        """
+        if self._uploader_is_async():
             try:
-                upload_target = image_path
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(self._upload_images_async(upload_targets))
+            # 同步接口被事件循环中的代码调用（如 Jupyter），不能嵌套 asyncio.run，只能在新线程中运行；
+            # 异步服务应改用 await process_images_async，避免阻塞事件循环
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                return executor.submit(asyncio.run, self._upload_images_async(upload_targets)).result()
+
+        def upload(upload_target: str) -> Union[str, Exception]:
+            try:
+                return self._upload_image(upload_target)
+            except Exception as e:
+                return e
 
-                if not is_remote and not is_data:
-                    if base_path and not os.path.isabs(image_path):
-                        full_path = base_path / image_path
-                    else:
-                        full_path = Path(image_path)
+        if self.image_upload_concurrency <= 1 or len(upload_targets) <= 1:
+            return [upload(target) for target in upload_targets]
 
-                    full_path = full_path.resolve()
+        workers = min(self.image_upload_concurrency, len(upload_targets))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mdnice-upload') as executor:
+            return list(executor.map(upload, upload_targets))
 
-                    if not full_path.exists():
-                        print(f"  ⚠️ 图片文件不存在，保持原样: {image_path}")
-                        skipped_count += 1
-                        return match.group(0)
+    async def _upload_images_async(self, upload_targets: List[str]) -> List[Union[str, Exception]]:
+        """
+        用异步上传函数并发上传图片（同时进行的上传不超过 image_upload_concurrency）
 
-                    valid_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg'}
-                    if full_path.suffix.lower() not in valid_extensions:
-                        print(f"  ⚠️ 非图片文件，跳过: {full_path.name}")
-                        skipped_count += 1
-                        return match.group(0)
+        :param upload_targets: 图片路径或地址列表
+        :return: 与输入顺序一致的上传结果（URL 或上传时抛出的异常）
+        """
+        semaphore = asyncio.Semaphore(self.image_upload_concurrency)
 
-                    upload_target = str(full_path)
-                    print(f"  📤 正在上传本地图片: {full_path.name}")
-                elif is_data:
-                    print(f"  📤 正在上传Data URL图片")
-                else:
-                    print(f"  📤 正在上传网络图片: {image_path[:60]}...")
+        async def upload(upload_target: str) -> Union[str, Exception]:
+            async with semaphore:
+                try:
+                    uploaded_url = await self.image_uploader(upload_target)
+                    if not uploaded_url:
+                        raise ValueError("上传函数返回空URL")
+                    return uploaded_url
+                except Exception as e:
+                    return e
 
-                uploaded_url = self.image_uploader(upload_target)
+        return list(await asyncio.gather(*(upload(target) for target in upload_targets)))
 
-                if not uploaded_url:
-                    raise ValueError("上传函数返回空URL")
+    def _upload_cache_identity(self) -> Optional[str]:
+        """
+        获取上传缓存使用的图床标识
 
-                print(f"  ✅ 图片已上传: {uploaded_url}")
-                uploaded_count += 1
+        :return: 图床标识；未配置上传缓存或上传函数没有声明 cache_identity 时返回 None
+        """
+        if self.upload_cache is None or self.image_uploader is None:
+            return None
+        return uploader_identity(self.image_uploader)
 
-                if title_text:
-                    return f'![{alt_text}]({uploaded_url} "{title_text}")'
-                else:
-                    return f'![{alt_text}]({uploaded_url})'
+    def _plan_image_uploads(self,
+                            markdown_content: str,
+                            base_path: Optional[Path] = None) -> Tuple[List[Tuple[ImageRef, str]], Dict[str, str],
+                                                                       Dict[str, int]]:
+        """
+        收集Markdown中的图片（行内、引用式和 HTML 图片，跳过代码块），确定需要上传的图片
+        （内容相同的只上传一次，已上传或已缓存的直接复用）
 
+        :param markdown_content: Markdown内容
+        :param base_path: Markdown文件所在目录，用于解析相对路径
+        :return: ([(图片地址, 去重键)], {去重键: 上传目标}, 计数)
+        """
+        mode_names = {
+            'local': '仅本地图片',
+            'remote': '仅网络图片',
+            'all': '所有图片'
+        }
+        print(f"🖼️ 开始处理Markdown中的图片 [模式: {mode_names[self.image_upload_mode]}]")
+
+        counts = {'uploaded': 0, 'reused': 0, 'skipped': 0, 'failed': 0}
+
+        pending: List[Tuple[ImageRef, str]] = []  # (图片地址, 去重键)
+        to_upload: Dict[str, str] = {}
+        identity = self._upload_cache_identity()
+        for ref in scan_images(markdown_content):
+            try:
+                target = self._upload_target(ref.url, base_path)
+                if target is None:
+                    counts['skipped'] += 1
+                    continue
+                key = self._upload_key(target)
             except Exception as e:
                 print(f"  ❌ 图片上传失败: {str(e)}")
-                failed_count += 1
-                return match.group(0)
+                counts['failed'] += 1
+                continue
+
+            pending.append((ref, key))
+            if key in self._uploaded_images or key in to_upload:
+                continue
+            if identity is not None:
+                cached_url = self.upload_cache.get(key, identity, uploader_ttl(self.image_uploader))
+                if cached_url:
+                    self._uploaded_images[key] = cached_url
+                    continue
+            to_upload[key] = target
+            if self._is_data_url(target):
+                print(f"  📤 正在上传Data URL图片")
+            elif self._is_remote_url(target):
+                print(f"  📤 正在上传网络图片: {target[:60]}...")
+            else:
+                print(f"  📤 正在上传本地图片: {Path(target).name}")
+
+        if len(to_upload) > 1 and self.image_upload_concurrency > 1:
+            print(f"  🚀 并发上传 {len(to_upload)} 张图片（最多 {self.image_upload_concurrency} 个）")
+        return pending, to_upload, counts
+
+    def _apply_image_uploads(self,
+                             markdown_content: str,
+                             pending: List[Tuple[ImageRef, str]],
+                             outcomes: Dict[str, Union[str, Exception]],
+                             counts: Dict[str, int]) -> str:
+        """
+        按上传结果一次性替换图片地址
+
+        :param markdown_content: Markdown内容
+        :param pending: _plan_image_uploads 收集的 [(图片地址, 去重键)]
+        :param outcomes: 本次上传结果 {去重键: URL 或异常}
+        :param counts: 计数（原地更新）
+        :return: 处理后的Markdown内容
+        """
+        replacements: List[Tuple[ImageRef, str]] = []
+        identity = self._upload_cache_identity()
+        for ref, key in pending:
+            if key in outcomes:
+                result = outcomes.pop(key)
+                if isinstance(result, Exception):
+                    print(f"  ❌ 图片上传失败: {str(result)}")
+                    counts['failed'] += 1
+                    continue
+                print(f"  ✅ 图片已上传: {result}")
+                counts['uploaded'] += 1
+                self._uploaded_images[key] = result
+                if identity is not None:
+                    self.upload_cache.set(key, identity, result)
+            elif key in self._uploaded_images:
+                result = self._uploaded_images[key]
+                print(f"  ♻️ 图片已上传过，复用: {result}")
+                counts['reused'] += 1
+            else:
+                counts['failed'] += 1  # 同一张图片上传失败，其他引用保持原样
+                continue
 
-        result = re.sub(pattern, replace_image, markdown_content)
+            replacements.append((ref, result))
 
-        total = uploaded_count + skipped_count + failed_count
+        total = sum(counts.values())
         if total > 0:
-            print(f"🖼️ 图片处理完成: 共 {total} 张 (上传 {uploaded_count}, 跳过 {skipped_count}, 失败 {failed_count})")
+            reused = f", 复用 {counts['reused']}" if counts['reused'] else ""
+            print(f"🖼️ 图片处理完成: 共 {total} 张 (上传 {counts['uploaded']}{reused}, "
+                  f"跳过 {counts['skipped']}, 失败 {counts['failed']})")
         else:
             print(f"🖼️ 未检测到图片")
 
-        return result
+        return replace_image_urls(markdown_content, replacements)
+
+    def _process_images_in_markdown(self, markdown_content: str, base_path: Optional[Path] = None) -> str:
+        """
+        处理Markdown中的图片，根据模式上传到图床
+
+        先收集全部图片，内容相同的图片只上传一次（同一次 convert 中跨文档复用），再并发上传，最后一次性替换图片地址
+
+        :param markdown_content: Markdown内容
+        :param base_path: Markdown文件所在目录，用于解析相对路径
+        :return: 处理后的Markdown内容
+        """
+        if not self.image_uploader:
+            return markdown_content
+
+        pending, to_upload, counts = self._plan_image_uploads(markdown_content, base_path)
+        outcomes = dict(zip(to_upload, self._upload_images(list(to_upload.values()))))
+        return self._apply_image_uploads(markdown_content, pending, outcomes, counts)
+
+    async def process_images_async(self, markdown_content: str, base_path: Optional[Union[str, Path]] = None) -> str:
+        """
+        在事件循环中处理Markdown中的图片（供异步服务调用，上传期间不阻塞事件循环）
+
+        异步上传函数在事件循环中并发执行；同步上传函数（包括内置上传器）整体放到一个线程中，
+        由 image_upload_concurrency 线程池并发上传
+
+        :param markdown_content: Markdown内容
+        :param base_path: Markdown文件所在目录，用于解析相对路径
+        :return: 处理后的Markdown内容（可直接传给 convert）
+        """
+        if not self.image_uploader:
+            return markdown_content
+
+        base_path = Path(base_path) if base_path is not None else None
+        if not self._uploader_is_async():
+            return await asyncio.to_thread(self._process_images_in_markdown, markdown_content, base_path)
+
+        # 读取文件、计算哈希、查询上传缓存放到线程中，避免阻塞事件循环
+        pending, to_upload, counts = await asyncio.to_thread(
+            self._plan_image_uploads, markdown_content, base_path)
+        results = await self._upload_images_async(list(to_upload.values()))
+        return self._apply_image_uploads(markdown_content, pending, dict(zip(to_upload, results)), counts)
 
     def _input_markdown(self, markdown_content: str) -> None:
         """
@@ -1074,8 +2069,11 @@ class MarkdownConverter:
 
     def _grant_clipboard_permissions(self) -> None:
         """
-        使用 CDP 授予剪贴板权限
+        使用 CDP 授予剪贴板权限（同一上下文中每个源只授予一次）
         """
+        if self.current_url in self._clipboard_granted_origins:
+            return
+
         try:
             # 获取 CDP Session
             cdp = self.page.context.new_cdp_session(self.page)
@@ -1086,6 +2084,7 @@ class MarkdownConverter:
                 'origin': self.current_url
             })
 
+            self._clipboard_granted_origins.add(self.current_url)
             print("✅ 已授予剪贴板权限 (CDP)")
 
         except Exception as e:
@@ -1111,8 +2110,7 @@ class MarkdownConverter:
 
             # 使用 CDP 的 Runtime.evaluate 执行 JavaScript
             # 这种方式更稳定，不会因为页面状态而失败
-            result = cdp.send('Runtime.evaluate', {
-                'expression': '''
+            html_content = self._fetch_page_string('''
                 (async () => {
                     try {
                         const clipboardItems = await navigator.clipboard.read();
@@ -1128,18 +2126,13 @@ class MarkdownConverter:
                         return 'ERROR: ' + err.message;
                     }
                 })()
-                ''',
-                'awaitPromise': True,
-                'returnByValue': True
-            })
+            ''', cdp=cdp)
 
-            if 'result' in result and 'value' in result['result']:
-                html_content = result['result']['value']
-                if html_content and not html_content.startswith('ERROR:'):
-                    print(f"✅ 通过 CDP 成功获取内容（{len(html_content)} 字符）")
-                    return html_content
-                else:
-                    print(f"⚠️ CDP 返回错误: {html_content}")
+            if html_content and not html_content.startswith('ERROR:'):
+                print(f"✅ 通过 CDP 成功获取内容（{len(html_content)} 字符）")
+                return html_content
+            elif html_content:
+                print(f"⚠️ CDP 返回错误: {html_content}")
 
             return None
 
@@ -1159,21 +2152,16 @@ class MarkdownConverter:
             # 使用 CDP 的 Runtime.evaluate，即使页面状态异常也能工作
             cdp = self.page.context.new_cdp_session(self.page)
 
-            result = cdp.send('Runtime.evaluate', {
-                'expression': '''
+            html_content = self._fetch_page_string('''
                 (() => {
                     const editor = document.querySelector('#nice-rich-text-editor');
                     return editor ? editor.innerHTML : null;
                 })()
-                ''',
-                'returnByValue': True
-            })
+            ''', cdp=cdp)
 
-            if 'result' in result and 'value' in result['result']:
-                html_content = result['result']['value']
-                if html_content:
-                    print(f"✅ 通过 DOM 直接获取成功（{len(html_content)} 字符）")
-                    return html_content
+            if html_content:
+                print(f"✅ 通过 DOM 直接获取成功（{len(html_content)} 字符）")
+                return html_content
 
             return None
 
@@ -1198,29 +2186,6 @@ class MarkdownConverter:
 
             print(f"📋 准备获取 {platform_name} 格式HTML...")
 
-            # 检查预览区域
-            try:
-                preview_check = self.page.evaluate("""
-                    () => {
-                        var editor = document.querySelector('#nice-rich-text-editor');
-                        if (editor) {
-                            return {
-                                hasContent: editor.innerHTML.trim().length > 0,
-                                contentLength: editor.innerHTML.trim().length
-                            };
-                        }
-                        return null;
-                    }
-                """)
-
-                if preview_check:
-                    print(
-                        f"📊 预览区域状态: 长度={preview_check['contentLength']}, 有内容={preview_check['hasContent']}")
-                    if not preview_check['hasContent']:
-                        print("⚠️ 警告：预览区域为空！")
-            except Exception as e:
-                print(f"⚠️ 检查预览区域失败: {e}")
-
             # 清空之前捕获的内容
             try:
                 self.page.evaluate("() => { window._capturedHTML = null; }")
@@ -1242,7 +2207,7 @@ class MarkdownConverter:
                 print(f"📋 方案1: 尝试使用拦截器获取...")
                 copy_button.click()
                 time.sleep(1.5)
-                html_content = self.page.evaluate("() => window._capturedHTML")
+                html_content = self._fetch_page_string("window._capturedHTML")
                 if html_content:
                     print(f"✅ 拦截器方案成功（{len(html_content)} 字符）")
             except Exception as e:
@@ -1268,11 +2233,11 @@ class MarkdownConverter:
             if not html_content:
                 try:
                     print("📋 方案5: 最后降级方案（DOM 获取）...")
-                    html_content = self.page.evaluate("""
-                        () => {
+                    html_content = self._fetch_page_string("""
+                        (() => {
                             var editor = document.querySelector('#nice-rich-text-editor');
                             return editor ? editor.innerHTML : '';
-                        }
+                        })()
                     """)
                     if html_content:
                         print(f"✅ 降级方案成功（{len(html_content)} 字符）")
@@ -1295,9 +2260,6 @@ class MarkdownConverter:
             else:
                 print("⚠️ 警告：HTML可能不包含样式信息")
 
-            # 清理HTML
-            html_content = self._clean_html(html_content)
-
             return html_content
 
         except Exception as e:
@@ -1320,7 +2282,7 @@ class MarkdownConverter:
         """
         try:
             js_read_clipboard = f"""
-            async () => {{
+            (async () => {{
                 try {{
                     document.querySelector('#{button_id}').click();
                     await new Promise(r => setTimeout(r, 800));
@@ -1338,10 +2300,10 @@ class MarkdownConverter:
                     console.error('读取剪贴板失败:', err);
                     return null;
                 }}
-            }}
+            }})()
             """
 
-            html_content = self.page.evaluate(js_read_clipboard)
+            html_content = self._fetch_page_string(js_read_clipboard)
             if html_content:
                 print("✅ 通过剪贴板API成功获取内容")
             return html_content
@@ -1369,41 +2331,24 @@ class MarkdownConverter:
                 error_msg, {'stage': '读取文件', 'file_path': str(file_path)})
             raise
 
-    def _wrap_full_html(self, html_content: str, title: str = "文章", platform: Platform = 'wechat') -> str:
-        """
-        包装为完整HTML文档
-
-        :param html_content: HTML内容片段
-        :param title: 文档标题
-        :param platform: 目标平台
-        :return: 完整的HTML文档
-        """
-        platform_name = self.PLATFORM_CONFIG[platform]['name']
-        return f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <meta http-equiv="X-UA-Compatible" content="ie=edge">
-    <title>{title} - {platform_name}</title>
-    <link rel="icon" href="https://s2.loli.net/2025/07/27/ZmzSQsgpKOM2xBk.png" type="image/png">
-    <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
+    # 完整HTML文档的页面样式
+    FULL_HTML_STYLE = """\
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
             max-width: 800px;
             margin: 0 auto;
             padding: 20px;
             font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
             background-color: #f5f5f5;
             line-height: 1.6;
-        }}
-        .container {{
+        }
+        .container {
             background-color: #fff;
             padding: 40px;
             border-radius: 8px;
             box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-        }}
-        .platform-badge {{
+        }
+        .platform-badge {
             display: inline-block;
             padding: 4px 12px;
             margin-bottom: 20px;
@@ -1411,17 +2356,46 @@ class MarkdownConverter:
             color: #1890ff;
             border-radius: 4px;
             font-size: 14px;
-        }}
-        @media (max-width: 768px) {{
-            body {{ padding: 10px; }}
-            .container {{ padding: 20px; }}
-        }}
-        @media print {{
-            body {{ background-color: white; }}
-            .container {{ box-shadow: none; padding: 0; }}
-            .platform-badge {{ display: none; }}
-        }}
-    </style>
+        }
+        @media (max-width: 768px) {
+            body { padding: 10px; }
+            .container { padding: 20px; }
+        }
+        @media print {
+            body { background-color: white; }
+            .container { box-shadow: none; padding: 0; }
+            .platform-badge { display: none; }
+        }
+"""
+
+    def _wrap_full_html(self,
+                        html_content: str,
+                        title: str = "文章",
+                        platform: Platform = 'wechat',
+                        stylesheet: Optional[str] = None) -> str:
+        """
+        包装为完整HTML文档
+
+        :param html_content: HTML内容片段
+        :param title: 文档标题
+        :param platform: 目标平台
+        :param stylesheet: 外部样式表地址（None 时内联页面样式）
+        :return: 完整的HTML文档
+        """
+        platform_name = self.PLATFORM_CONFIG[platform]['name']
+        if stylesheet:
+            head_style = f'    <link rel="stylesheet" href="{stylesheet}">'
+        else:
+            head_style = f"    <style>\n{self.FULL_HTML_STYLE}    </style>"
+        return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta http-equiv="X-UA-Compatible" content="ie=edge">
+    <title>{title} - {platform_name}</title>
+    <link rel="icon" href="https://s2.loli.net/2025/07/27/ZmzSQsgpKOM2xBk.png" type="image/png">
+{head_style}
 </head>
 <body>
     <div class="container">
@@ -1431,6 +2405,54 @@ class MarkdownConverter:
 </body>
 </html>"""
 
+    def _output_filename(self, html_content: str, original_name: Optional[str], platform: Platform) -> str:
+        """
+        生成输出文件名
+
+        :param html_content: HTML内容
+        :param original_name: 原始文件名
+        :param platform: 目标平台
+        :return: 文件名（没有原始文件名时按内容命名，重复生成相同内容时得到同一个文件名）
+        """
+        platform_suffix = self.PLATFORM_CONFIG[platform]['suffix']
+        if original_name:
+            return Path(original_name).stem + f'_{platform_suffix}.html'
+        digest = hashlib.sha256(html_content.encode('utf-8')).hexdigest()[:12]
+        return f'article_{platform_suffix}_{digest}.html'
+
+    def _save_to_sink(self,
+                      html_content: str,
+                      sink: OutputSink,
+                      original_name: Optional[str] = None,
+                      wrap_full_html: bool = False,
+                      platform: Platform = 'wechat') -> str:
+        """
+        写入输出目标
+
+        :param html_content: HTML内容
+        :param sink: 输出目标
+        :param original_name: 原始文件名
+        :param wrap_full_html: 是否包装为完整HTML（归档中的页面共用一份样式表）
+        :param platform: 目标平台
+        :return: 写入位置
+        """
+        try:
+            filename = self._output_filename(html_content, original_name, platform)
+            if wrap_full_html:
+                title = Path(original_name).stem if original_name else "文章"
+                stylesheet = sink.link_stylesheet(textwrap.dedent(self.FULL_HTML_STYLE))
+                html_content = self._wrap_full_html(html_content, title, platform, stylesheet)
+
+            location = sink.write(filename, html_content, {'platform': platform, 'source': original_name})
+            print(f"💾 已写入: {location}")
+            return location
+        except Exception as e:
+            error_msg = f"写入输出失败: {str(e)}"
+            print(f"❌ {error_msg}")
+            self._notify_error(
+                error_msg, {'stage': '保存文件', 'sink': type(sink).__name__})
+            raise
+
     def _save_html(self,
                    html_content: str,
                    output_path: Union[str, Path],
@@ -1449,15 +2471,10 @@ class MarkdownConverter:
         """
         try:
             output_path = Path(output_path)
-            platform_suffix = self.PLATFORM_CONFIG[platform]['suffix']
 
             if output_path.is_dir() or not output_path.suffix:
                 output_path.mkdir(parents=True, exist_ok=True)
-                if original_name:
-                    filename = Path(original_name).stem + f'_{platform_suffix}.html'
-                else:
-                    filename = f'article_{platform_suffix}_{int(time.time())}.html'
-                output_path = output_path / filename
+                output_path = output_path / self._output_filename(html_content, original_name, platform)
             else:
                 output_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -1465,10 +2482,12 @@ class MarkdownConverter:
             final_html = self._wrap_full_html(
                 html_content, title, platform) if wrap_full_html else html_content
 
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(final_html)
-
-            print(f"💾 已保存HTML文件: {output_path}")
+            if write_if_changed(output_path, final_html, self.output_compression):
+                self.output_stats['written'] += 1
+                print(f"💾 已保存HTML文件: {output_path}")
+            else:
+                self.output_stats['skipped'] += 1
+                print(f"⏭️ 内容未变化，跳过写入: {output_path}")
             return output_path
         except Exception as e:
             error_msg = f"保存文件失败: {str(e)}"
@@ -1499,101 +2518,152 @@ class MarkdownConverter:
             selected = theme
         return selected
 
+    def _prepare_item(self,
+                      md_item: Union[str, Path],
+                      theme: Union[str, List[str], None]) -> Tuple[Optional[str], str, str]:
+        """
+        读取一项输入并处理其中的图片
+
+        :param md_item: Markdown 文件路径或内容
+        :param theme: 主题（列表时随机选择）
+        :return: (原文件名，内容输入时为 None, 图片处理后的 Markdown, 选定的主题)
+        """
+        is_file = isinstance(md_item, Path) or (
+                isinstance(md_item, str) and
+                (md_item.endswith('.md') or md_item.endswith('.markdown')) and
+                os.path.exists(md_item)
+        )
+
+        if is_file:
+            file_path = Path(md_item)
+            md_content = self._read_markdown_file(file_path)
+            original_name = file_path.name
+            print(f"📄 读取文件: {md_item}（{len(md_content)} 字符）")
+
+            md_content = self._process_images_in_markdown(
+                md_content,
+                base_path=file_path.parent
+            )
+        else:
+            md_content = md_item
+            original_name = None
+            print(f"📝 使用Markdown内容（{len(md_content)} 字符）")
+
+            md_content = self._process_images_in_markdown(md_content)
+
+        return original_name, md_content, self._parse_theme(theme)
+
     def convert(self,
                 markdown: Union[str, Path, List[Union[str, Path]]],
                 theme: Union[str, List[str], None] = 'normal',
-                output_dir: Optional[Union[str, Path]] = None,
+                output_dir: Optional[Union[str, Path, OutputSink]] = None,
                 return_html: bool = True,
                 wrap_full_html: bool = False,
-                platform: Platform = 'wechat',
+                platform: Union[Platform, List[Platform]] = 'wechat',
                 code_theme: Optional[CodeTheme] = None,
-                mac_style: Optional[bool] = None) -> Union[str, List[str], Path, List[Path]]:
+                mac_style: Optional[bool] = None,
+                engine: Engine = 'browser') -> Union[str, List[str], Path, List[Path], Dict[str, Any]]:
         """
         转换Markdown到指定平台格式
 
         :param markdown: Markdown内容或文件路径
         :param theme: 主题选择
-        :param output_dir: 输出目录
+        :param output_dir: 输出目录，或输出目标（DirectorySink/ArchiveSink/JSONLinesSink，由调用方关闭）
         :param return_html: 是否返回HTML内容
         :param wrap_full_html: 是否包装为完整HTML
-        :param platform: 目标平台（wechat/zhihu/juejin）
+        :param platform: 目标平台（wechat/zhihu/juejin），传入列表时只渲染一次微信格式，其他平台由转换得到
         :param code_theme: 代码主题（可选，覆盖初始化时的设置）
         :param mac_style: Mac 风格（可选，覆盖初始化时的设置）
-        :return: HTML内容或文件路径
+        :param engine: 渲染引擎（browser: 编辑器页面渲染；offline: 纯 Python 离线渲染，无需浏览器；
+                       hybrid: 默认离线渲染，不支持的文档交给编辑器，并按 verify_ratio 抽样比对；
+                       embedded: 在进程内 JS 引擎中执行编辑器渲染包，需要 render_bundle）
+        :return: HTML内容或文件路径；platform 为列表时返回 {平台: 结果} 字典
         """
         try:
-            if platform not in self.PLATFORM_CONFIG:
-                raise ValueError(f"不支持的平台: {platform}")
+            platforms = platform if isinstance(platform, list) else [platform]
+            if not platforms:
+                raise ValueError("platform 列表不能为空")
+            for target in platforms:
+                if target not in self.PLATFORM_CONFIG:
+                    raise ValueError(f"不支持的平台: {target}")
+
+            # 多个平台时只渲染微信格式，其他平台通过 transform_html 转换（不再重复渲染和读取剪贴板）
+            render_platform = platforms[0] if len(platforms) == 1 else 'wechat'
+
+            if engine not in ('browser', 'offline', 'hybrid', 'embedded'):
+                raise ValueError(f"不支持的渲染引擎: {engine}")
+
+            if engine == 'embedded' and not self.render_bundle:
+                raise ValueError("engine='embedded' 需要通过 render_bundle 指定编辑器渲染包")
 
             final_code_theme = code_theme if code_theme is not None else self.code_theme
             final_mac_style = mac_style if mac_style is not None else self.mac_style
 
-            print(f"\n🎯 目标平台: {self.PLATFORM_CONFIG[platform]['name']}")
+            print(f"\n🎯 目标平台: {'、'.join(self.PLATFORM_CONFIG[target]['name'] for target in platforms)}")
 
-            self._retry_on_error(self._init_driver)
-            self._retry_on_error(self._load_page)
-            self._inject_copy_interceptor()
+            if engine == 'offline':
+                print("⚡ 渲染引擎: 离线渲染（不启动浏览器）")
+            elif engine == 'embedded':
+                print("⚡ 渲染引擎: 内嵌 JS 引擎（不启动浏览器）")
+            elif engine == 'hybrid':
+                print("⚡ 渲染引擎: 混合渲染（按需启动浏览器）")
+                self.hybrid_stats = self._new_hybrid_stats()
 
             is_multiple = isinstance(markdown, list)
             markdown_list = markdown if is_multiple else [markdown]
 
-            results = []
+            platform_results: Dict[str, list] = {target: [] for target in platforms}
+            self.output_stats = {'written': 0, 'skipped': 0}
+            self._uploaded_images = {}
+            results = platform_results[platforms[0]]
             failed_items = []
 
+            # 浏览器引擎批量转换：浏览器启动后，如果探测到页面渲染接口，先准备好剩余文档，
+            # 缓存中没有的一次调用页面渲染接口全部渲染；没有接口时逐项转换，不提前读取文档、上传图片
+            prepared: Dict[int, Union[Tuple[Optional[str], str, str], Exception]] = {}
+            batch_pending = engine == 'browser' and self.use_render_api and len(markdown_list) > 1
+
             for idx, md_item in enumerate(markdown_list, 1):
+                if batch_pending and self.page is not None:
+                    batch_pending = False
+                    if self._render_api_mode in ('api', 'pieces'):
+                        print("📦 批量转换：先读取剩余文档并处理图片，再批量调用页面渲染接口")
+                        for rest_idx in range(idx, len(markdown_list) + 1):
+                            try:
+                                prepared[rest_idx] = self._prepare_item(markdown_list[rest_idx - 1], theme)
+                            except Exception as e:
+                                prepared[rest_idx] = e
+                        self._prefetch_api_renders(
+                            [(item[1], item[2]) for item in prepared.values() if not isinstance(item, Exception)],
+                            final_code_theme, final_mac_style, render_platform)
+
                 print(f"\n{'=' * 70}")
                 print(f"📌 处理第 {idx}/{len(markdown_list)} 项")
                 print(f"{'=' * 70}")
 
                 try:
-                    is_file = isinstance(md_item, Path) or (
-                            isinstance(md_item, str) and
-                            (md_item.endswith('.md') or md_item.endswith('.markdown')) and
-                            os.path.exists(md_item)
-                    )
-
-                    if is_file:
-                        file_path = Path(md_item)
-                        md_content = self._read_markdown_file(file_path)
-                        original_name = file_path.name
-                        print(f"📄 读取文件: {md_item}（{len(md_content)} 字符）")
-
-                        md_content = self._process_images_in_markdown(
-                            md_content,
-                            base_path=file_path.parent
-                        )
-                    else:
-                        md_content = md_item
-                        original_name = None
-                        print(f"📝 使用Markdown内容（{len(md_content)} 字符）")
-
-                        md_content = self._process_images_in_markdown(md_content)
-
-                    if idx > 1:
-                        self._clear_editor()
-
-                    selected_theme = self._parse_theme(theme)
-                    self._select_theme(selected_theme)
-
-                    self._select_code_theme(final_code_theme)
-
-                    self._set_mac_style(final_mac_style)
-
-                    self._input_markdown(md_content)
-
-                    html_content = self._retry_on_error(
-                        self._get_converted_html, platform)
-
-                    if output_dir:
-                        file_path = self._save_html(
-                            html_content, output_dir, original_name, wrap_full_html, platform)
-                        results.append(file_path if not return_html else html_content)
-                    else:
-                        results.append(html_content)
-
-                    if idx < len(markdown_list):
-                        self._inject_copy_interceptor()
-                        time.sleep(1)
+                    item = prepared[idx] if idx in prepared else self._prepare_item(md_item, theme)
+                    if isinstance(item, Exception):
+                        raise item
+                    original_name, md_content, selected_theme = item
+
+                    html_content = self._render_document(
+                        engine, md_content, selected_theme, final_code_theme, final_mac_style, render_platform)
+
+                    for target in platforms:
+                        target_html = (html_content if target == render_platform
+                                       else transform_html(html_content, target))
+                        target_html = self._post_process(target_html)
+                        if isinstance(output_dir, OutputSink):
+                            location = self._save_to_sink(
+                                target_html, output_dir, original_name, wrap_full_html, target)
+                            platform_results[target].append(location if not return_html else target_html)
+                        elif output_dir:
+                            file_path = self._save_html(
+                                target_html, output_dir, original_name, wrap_full_html, target)
+                            platform_results[target].append(file_path if not return_html else target_html)
+                        else:
+                            platform_results[target].append(target_html)
 
                 except Exception as e:
                     error_msg = f"处理第 {idx} 项失败: {str(e)}"
@@ -1614,11 +2684,33 @@ class MarkdownConverter:
                     print(f"  ❌ 失败项 {item['index']}: {item['error']}")
             else:
                 print(f"🎉 全部完成！共 {len(results)} 项")
+            if engine == 'hybrid':
+                self._report_hybrid_stats()
+            if self.memory_cache is not None:
+                stats = self.memory_cache.stats()
+                print(f"📊 进程内缓存: 命中 {stats['hits']} 次，合并 {stats['coalesced']} 次，"
+                      f"未命中 {stats['misses']} 次，{stats['entries']} 条")
+            if self.compact and self.compact_stats['input_bytes']:
+                stats = self.compact_stats
+                print(f"📊 HTML 压缩: 共节省 {(stats['input_bytes'] - stats['output_bytes']) / 1024:.1f} KB"
+                      f"（{1 - stats['output_bytes'] / stats['input_bytes']:.1%}）")
+            if output_dir:
+                stats = output_dir.stats if isinstance(output_dir, OutputSink) else self.output_stats
+                print(f"📊 保存文件: 写入 {stats['written']} 个，内容未变化跳过 {stats['skipped']} 个")
+            if self.cache is not None:
+                stats = self.cache.stats()
+                print(f"📊 转换缓存: 命中 {stats['hits']} 次，未命中 {stats['misses']} 次"
+                      f"（命中率 {stats['hit_rate']:.1%}），占用 {stats['total_bytes'] / 1024:.1f} KB")
+            if self.upload_cache is not None and self.image_uploader:
+                stats = self.upload_cache.stats()
+                print(f"📊 上传缓存: 命中 {stats['hits']} 次，未命中 {stats['misses']} 次，共 {stats['entries']} 条记录")
             print(f"{'=' * 70}\n")
 
             if not results:
                 raise ConversionError("所有项目均转换失败")
 
+            if isinstance(platform, list):
+                return {target: (items if is_multiple else items[0]) for target, items in platform_results.items()}
             return results if is_multiple else results[0]
 
         except Exception as e:
@@ -1628,6 +2720,7 @@ class MarkdownConverter:
                 error_msg, {'stage': '总体流程', 'platform': platform})
             raise
         finally:
+            self._api_prefetched.clear()
             self._close_driver()
 
 
@@ -1637,7 +2730,7 @@ class MarkdownConverter:
 
 def convert(
         markdown: Union[str, Path, List[Union[str, Path]]],
-        platform: Platform = 'wechat',
+        platform: Union[Platform, List[Platform]] = 'wechat',
         theme: Union[str, List[str], None] = 'normal',
         output_dir: Optional[Union[str, Path]] = None,
         return_html: bool = True,
@@ -1655,13 +2748,16 @@ def convert(
         browser_type: BrowserType = 'chromium',
         browser_connection_type: BrowserConnectionType = 'auto',
         browser_token: Optional[str] = None,
-        proxy: Optional[Dict[str, str]] = None
-) -> Union[str, List[str], Path, List[Path]]:
+        proxy: Optional[Dict[str, str]] = None,
+        engine: Engine = 'browser',
+        verify_ratio: float = 0.0,
+        render_bundle: Optional[Union[str, Path]] = None
+) -> Union[str, List[str], Path, List[Path], Dict[str, Any]]:
     """
     通用转换函数：转换Markdown到指定平台格式
 
     :param markdown: Markdown内容或文件路径（支持单个或列表）
-    :param platform: 目标平台（wechat/zhihu/juejin）
+    :param platform: 目标平台（wechat/zhihu/juejin），传入列表时只渲染一次，其他平台由微信格式转换得到
     :param theme: 主题名称、列表或None（随机）
     :param output_dir: 输出目录（None则不保存）
     :param return_html: 是否返回HTML内容
@@ -1680,7 +2776,10 @@ def convert(
     :param browser_connection_type: 连接类型（auto/cdp/playwright）
     :param browser_token: 远程浏览器访问令牌
     :param proxy: 代理配置，例如 {'server': 'http://proxy.com:8080'}
-    :return: HTML内容字符串、文件路径或它们的列表
+    :param engine: 渲染引擎（browser/offline/hybrid/embedded）
+    :param verify_ratio: hybrid 引擎下抽样与编辑器比对的比例（0~1）
+    :param render_bundle: embedded 引擎使用的编辑器渲染包（JS 文件路径或 URL）
+    :return: HTML内容字符串、文件路径或它们的列表；platform 为列表时返回 {平台: 结果} 字典
     """
     converter = MarkdownConverter(
         headless=headless,
@@ -1696,7 +2795,9 @@ def convert(
         browser_type=browser_type,
         browser_connection_type=browser_connection_type,
         browser_token=browser_token,
-        proxy=proxy
+        proxy=proxy,
+        verify_ratio=verify_ratio,
+        render_bundle=render_bundle
     )
     return converter.convert(
         markdown=markdown,
@@ -1704,7 +2805,8 @@ def convert(
         output_dir=output_dir,
         return_html=return_html,
         wrap_full_html=wrap_full_html,
-        platform=platform
+        platform=platform,
+        engine=engine
     )
 
 
@@ -1727,7 +2829,10 @@ def to_wechat(
         browser_type: BrowserType = 'chromium',
         browser_connection_type: BrowserConnectionType = 'auto',
         browser_token: Optional[str] = None,
-        proxy: Optional[Dict[str, str]] = None
+        proxy: Optional[Dict[str, str]] = None,
+        engine: Engine = 'browser',
+        verify_ratio: float = 0.0,
+        render_bundle: Optional[Union[str, Path]] = None
 ) -> Union[str, List[str], Path, List[Path]]:
     """
     转换Markdown为微信公众号格式
@@ -1751,6 +2856,9 @@ def to_wechat(
     :param browser_connection_type: 连接类型（auto/cdp/playwright）
     :param browser_token: 远程浏览器访问令牌
     :param proxy: 代理配置
+    :param engine: 渲染引擎（browser/offline/hybrid/embedded）
+    :param verify_ratio: hybrid 引擎下抽样与编辑器比对的比例（0~1）
+    :param render_bundle: embedded 引擎使用的编辑器渲染包（JS 文件路径或 URL）
     :return: HTML内容或文件路径
     """
     return convert(
@@ -1773,7 +2881,10 @@ def to_wechat(
         browser_type=browser_type,
         browser_connection_type=browser_connection_type,
         browser_token=browser_token,
-        proxy=proxy
+        proxy=proxy,
+        engine=engine,
+        verify_ratio=verify_ratio,
+        render_bundle=render_bundle
     )
 
 
@@ -1796,7 +2907,10 @@ def to_zhihu(
         browser_type: BrowserType = 'chromium',
         browser_connection_type: BrowserConnectionType = 'auto',
         browser_token: Optional[str] = None,
-        proxy: Optional[Dict[str, str]] = None
+        proxy: Optional[Dict[str, str]] = None,
+        engine: Engine = 'browser',
+        verify_ratio: float = 0.0,
+        render_bundle: Optional[Union[str, Path]] = None
 ) -> Union[str, List[str], Path, List[Path]]:
     """
     转换Markdown为知乎格式
@@ -1823,7 +2937,10 @@ def to_zhihu(
         browser_type=browser_type,
         browser_connection_type=browser_connection_type,
         browser_token=browser_token,
-        proxy=proxy
+        proxy=proxy,
+        engine=engine,
+        verify_ratio=verify_ratio,
+        render_bundle=render_bundle
     )
 
 
@@ -1846,7 +2963,10 @@ def to_juejin(
         browser_type: BrowserType = 'chromium',
         browser_connection_type: BrowserConnectionType = 'auto',
         browser_token: Optional[str] = None,
-        proxy: Optional[Dict[str, str]] = None
+        proxy: Optional[Dict[str, str]] = None,
+        engine: Engine = 'browser',
+        verify_ratio: float = 0.0,
+        render_bundle: Optional[Union[str, Path]] = None
 ) -> Union[str, List[str], Path, List[Path]]:
     """
     转换Markdown为稀土掘金格式
@@ -1873,5 +2993,8 @@ def to_juejin(
         browser_type=browser_type,
         browser_connection_type=browser_connection_type,
         browser_token=browser_token,
-        proxy=proxy
+        proxy=proxy,
+        engine=engine,
+        verify_ratio=verify_ratio,
+        render_bundle=render_bundle
     )
\ No newline at end of file
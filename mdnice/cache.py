@@ -0,0 +1,617 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：转换结果缓存 按内容哈希把 HTML 保存到磁盘 按总大小做 LRU 淘汰
+# 文件路径：mdnice/cache.py
+
+"""
+转换结果缓存
+
+- ConversionCache：磁盘缓存，跨进程、跨运行复用
+- MemoryCache：进程内 LRU 缓存，并发的相同请求合并为一次转换
+- UploadCache：图片上传缓存（SQLite），图片内容 + 图床 -> 上传得到的地址，跨运行复用
+
+缓存键是（图片处理后的）Markdown 与主题、代码主题、Mac 风格、平台、clean_html、
+渲染引擎和编辑器版本的 SHA-256。编辑器版本在每次打开页面时记录，下次直接使用
+记录值计算缓存键，因此缓存命中时完全不需要启动浏览器；记录超过有效期后视为未知，
+会重新打开页面确认版本。
+
+示例：
+    >>> from mdnice import MarkdownConverter
+    >>> converter = MarkdownConverter(cache_dir='.mdnice_cache')
+    >>> converter.convert('article.md')   # 第二次转换直接命中缓存
+    >>> converter.cache.stats()
+"""
+
+import os
+import json
+import asyncio
+import inspect
+import time
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+
+class ConversionCache:
+    """
+    磁盘转换结果缓存
+
+    每条结果保存为 <缓存目录>/<键前两位>/<键>.html，文件修改时间即最近使用时间，
+    总大小超过上限时按最近使用时间从旧到新淘汰。
+    """
+
+    VERSIONS_FILE = 'editor_versions.json'
+
+    def __init__(self,
+                 cache_dir: Union[str, Path],
+                 max_bytes: int = 256 * 1024 * 1024,
+                 version_ttl: int = 24 * 3600) -> None:
+        """
+        初始化缓存
+
+        :param cache_dir: 缓存目录
+        :param max_bytes: 缓存总大小上限（字节）
+        :param version_ttl: 编辑器版本记录的有效期（秒），过期后需要重新打开页面确认
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.version_ttl = version_ttl
+
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self._total_bytes = sum(path.stat().st_size for path in self._entries())
+        self._versions: Dict[str, Dict[str, Any]] = self._load_versions()
+
+    # ------------------------------------------------------------------
+    # 编辑器版本
+    # ------------------------------------------------------------------
+
+    def _load_versions(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.cache_dir / self.VERSIONS_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get_editor_version(self, editor_url: str) -> Optional[str]:
+        """
+        获取记录的编辑器版本
+
+        :param editor_url: 编辑器地址
+        :return: 版本标识；没有记录或记录已过期时返回 None
+        """
+        record = self._versions.get(editor_url)
+        if not record or time.time() - record.get('checked_at', 0) > self.version_ttl:
+            return None
+        return record.get('version')
+
+    def set_editor_version(self, editor_url: str, version: str) -> None:
+        """
+        记录编辑器版本（每次打开页面后调用）
+
+        :param editor_url: 编辑器地址
+        :param version: 版本标识
+        """
+        with self._lock:
+            self._versions[editor_url] = {'version': version, 'checked_at': time.time()}
+            self._atomic_write(self.cache_dir / self.VERSIONS_FILE,
+                               json.dumps(self._versions, ensure_ascii=False, indent=2))
+
+    # ------------------------------------------------------------------
+    # 结果缓存
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def make_key(markdown_content: str, **options) -> str:
+        """
+        计算缓存键
+
+        :param markdown_content: 图片处理后的 Markdown
+        :param options: 影响输出的其他参数（主题、平台、编辑器版本等）
+        :return: 十六进制 SHA-256
+        """
+        payload = json.dumps(options, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(payload.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(markdown_content.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f'{key}.html'
+
+    def _entries(self):
+        return self.cache_dir.glob('*/*.html')
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        """
+        读取缓存（命中时刷新最近使用时间）
+
+        :param key: 缓存键；为 None（版本未知，无法查找）时按未命中计
+        :return: HTML；未命中时返回 None
+        """
+        html_content = None
+        if key is not None:
+            path = self._path(key)
+            try:
+                html_content = path.read_text(encoding='utf-8')
+                os.utime(path)
+            except OSError:
+                html_content = None
+
+        with self._lock:
+            self._counters['hits' if html_content is not None else 'misses'] += 1
+        return html_content
+
+    def __contains__(self, key: Optional[str]) -> bool:
+        """是否有缓存（不计入命中统计）"""
+        return key is not None and self._path(key).exists()
+
+    def set(self, key: str, html_content: str) -> None:
+        """
+        写入缓存，超过总大小上限时淘汰最久未使用的条目
+
+        :param key: 缓存键
+        :param html_content: HTML
+        """
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        try:
+            old_size = path.stat().st_size
+        except OSError:
+            old_size = 0
+
+        self._atomic_write(path, html_content)
+        with self._lock:
+            self._total_bytes += path.stat().st_size - old_size
+            self._counters['writes'] += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """按最近使用时间淘汰，直到总大小降到上限的 90%"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        self._total_bytes = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._total_bytes <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            self._total_bytes -= size
+            self._counters['evictions'] += 1
+
+    @staticmethod
+    def _atomic_write(path: Path, content: str) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def clear(self) -> None:
+        """清空缓存（保留编辑器版本记录）"""
+        with self._lock:
+            for path in list(self._entries()):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取统计信息
+
+        :return: 命中、未命中、写入、淘汰次数，命中率，当前大小
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+            stats['total_bytes'] = self._total_bytes
+            stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+class _Flight:
+    """正在进行中的一次转换（同键的并发请求等待同一个结果）"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class MemoryCache:
+    """
+    进程内 LRU 转换结果缓存（线程安全）
+
+    按条目数和总字节数双重限制；相同键的并发请求合并为一次转换（single-flight），
+    其余请求等待并共享结果。适合在 HTTP 服务中由多个转换器实例共用。
+
+    示例：
+        >>> shared = MemoryCache(max_entries=512, max_bytes=32 * 1024 * 1024, ttl=600)
+        >>> converter = MarkdownConverter(memory_cache=shared)   # 每个工作线程一个转换器
+        >>> shared.stats()
+    """
+
+    def __init__(self,
+                 max_entries: int = 1024,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = None) -> None:
+        """
+        初始化缓存
+
+        :param max_entries: 最大条目数
+        :param max_bytes: 最大总字节数（按 UTF-8 编码长度计）
+        :param ttl: 条目有效期（秒），None 表示不过期；编辑器更新后旧结果最多保留这么久
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Tuple[str, int, float]]' = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._total_bytes = 0
+        self._counters: Dict[str, int] = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0}
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """在持有锁时查找条目（过期条目直接删除）"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        html_content, size, stored_at = entry
+        if self.ttl is not None and time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            self._total_bytes -= size
+            return None
+        self._entries.move_to_end(key)
+        return html_content
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存
+
+        :param key: 缓存键
+        :return: HTML；未命中时返回 None
+        """
+        with self._lock:
+            html_content = self._lookup(key)
+            self._counters['hits' if html_content is not None else 'misses'] += 1
+            return html_content
+
+    def __contains__(self, key: str) -> bool:
+        """是否有未过期的缓存（不计入命中统计）"""
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def set(self, key: str, html_content: str) -> None:
+        """
+        写入缓存，超过条目数或总字节数上限时淘汰最久未使用的条目
+
+        :param key: 缓存键
+        :param html_content: HTML
+        """
+        size = len(html_content.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            self._entries[key] = (html_content, size, time.time())
+            self._total_bytes += size
+
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self._counters['evictions'] += 1
+
+    def get_or_render(self, key: str, render: Callable[[], str]) -> str:
+        """
+        读取缓存，未命中时转换；同键的并发调用只转换一次
+
+        :param key: 缓存键
+        :param render: 转换函数（只在当前调用负责转换时执行）
+        :return: HTML
+        """
+        with self._lock:
+            html_content = self._lookup(key)
+            if html_content is not None:
+                self._counters['hits'] += 1
+                return html_content
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._counters['misses'] += 1
+            else:
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = render()
+            self.set(key, flight.result)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取统计信息
+
+        :return: 命中、未命中、合并、淘汰次数，命中率，当前条目数和字节数
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+            stats['hit_rate'] = (stats['hits'] + stats['coalesced']) / lookups if lookups else 0.0
+            stats['entries'] = len(self._entries)
+            stats['total_bytes'] = self._total_bytes
+            stats['in_flight'] = len(self._flights)
+        return stats
+
+
+def uploader_identity(upload: Callable[[str], str]) -> Optional[str]:
+    """
+    取得上传函数对应的图床标识（用作上传缓存键的一部分）
+
+    内置上传器的 upload 方法使用 cache_identity()（图床类型和目标空间，不含密钥）；
+    自定义函数需要设置 cache_identity 属性（字符串或返回字符串的函数）。
+    不能用函数名代替：所有 lambda、同一个类的不同实例名称都相同，指向不同图床时会互相取到对方的地址。
+
+    :param upload: 上传函数
+    :return: 图床标识；没有声明时返回 None（不使用上传缓存）
+    """
+    for owner in (getattr(upload, '__self__', None), upload):
+        identity = getattr(owner, 'cache_identity', None)
+        if callable(identity):
+            return identity()
+        if isinstance(identity, str):
+            return identity
+    return None
+
+
+def uploader_ttl(upload: Callable[[str], str]) -> Optional[float]:
+    """
+    取得上传结果的有效期（如微信临时素材 3 天后失效）
+
+    :param upload: 上传函数
+    :return: 有效期（秒），None 表示上传器没有限制
+    """
+    for owner in (getattr(upload, '__self__', None), upload):
+        ttl = getattr(owner, 'cache_ttl', None)
+        if ttl is not None:
+            return ttl
+    return None
+
+
+class UploadCache:
+    """
+    图片上传缓存（SQLite，线程安全，可多个进程共用同一个文件）
+
+    以图片内容哈希和图床标识为键记录上传得到的地址。每天重新生成相同文章时，
+    已上传过的图片直接使用记录的地址，不再占用图床配额。
+    有效期取 ttl 参数和上传器声明的 cache_ttl 中较小的一个，过期记录在查询时删除。
+    export_to / import_from 用于在 CI 机器之间共享记录。
+
+    示例：
+        >>> cache = UploadCache('.mdnice_cache/uploads.db')
+        >>> converter = MarkdownConverter(image_uploader=uploader.upload, upload_cache=cache)
+        >>> upload = cache.wrap(uploader.upload)   # 单独使用上传器时
+    """
+
+    def __init__(self, path: Union[str, Path], ttl: Optional[float] = None) -> None:
+        """
+        初始化上传缓存
+
+        :param path: SQLite 数据库文件路径（不存在时创建）
+        :param ttl: 记录有效期（秒），None 表示不过期
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {'hits': 0, 'misses': 0, 'writes': 0, 'expired': 0}
+        self._connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS uploads ('
+                'content_key TEXT NOT NULL, uploader TEXT NOT NULL, url TEXT NOT NULL, '
+                'uploaded_at REAL NOT NULL, PRIMARY KEY (content_key, uploader))')
+
+    @staticmethod
+    def content_key(image: Union[str, bytes]) -> str:
+        """
+        计算图片的内容键（本地文件和字节按内容，Data URL 按内容，网络图片按地址）
+
+        :param image: 本地路径、网络地址、Data URL 或图片字节
+        :return: 内容键
+        """
+        if isinstance(image, bytes):
+            return 'file:' + hashlib.sha256(image).hexdigest()
+        if image.startswith('data:'):
+            return 'data:' + hashlib.sha256(image.encode('utf-8')).hexdigest()
+        if image.startswith(('http://', 'https://', 'ftp://')):
+            return 'url:' + image
+        sha256 = hashlib.sha256()
+        with open(image, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return 'file:' + sha256.hexdigest()
+
+    def get(self, content_key: str, uploader: str, ttl: Optional[float] = None) -> Optional[str]:
+        """
+        查找上传记录
+
+        :param content_key: 内容键
+        :param uploader: 图床标识
+        :param ttl: 上传器自身的有效期（秒），与缓存的 ttl 取较小值
+        :return: 上传得到的地址；没有记录或已过期时返回 None
+        """
+        limits = [limit for limit in (self.ttl, ttl) if limit is not None]
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT url, uploaded_at FROM uploads WHERE content_key = ? AND uploader = ?',
+                (content_key, uploader)).fetchone()
+            if row is not None and limits and time.time() - row[1] > min(limits):
+                with self._connection:
+                    self._connection.execute(
+                        'DELETE FROM uploads WHERE content_key = ? AND uploader = ?', (content_key, uploader))
+                self._counters['expired'] += 1
+                row = None
+            self._counters['hits' if row is not None else 'misses'] += 1
+        return row[0] if row is not None else None
+
+    def set(self, content_key: str, uploader: str, url: str) -> None:
+        """
+        记录上传结果
+
+        :param content_key: 内容键
+        :param uploader: 图床标识
+        :param url: 上传得到的地址
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO uploads (content_key, uploader, url, uploaded_at) VALUES (?, ?, ?, ?)',
+                (content_key, uploader, url, time.time()))
+            self._counters['writes'] += 1
+
+    def wrap(self, upload: Callable[[str], str]) -> Callable[[str], str]:
+        """
+        包装上传函数：上传前先查缓存，上传成功后记录结果
+
+        :param upload: 上传函数（如 SMUploader(...).upload，也可以是 async 函数）
+        :return: 带缓存的上传函数；上传函数没有 cache_identity 时原样返回（不使用缓存）
+        """
+        identity = uploader_identity(upload)
+        if identity is None:
+            print("⚠️ 上传函数没有声明 cache_identity，无法区分图床，不使用上传缓存")
+            return upload
+        ttl = uploader_ttl(upload)
+
+        if inspect.iscoroutinefunction(upload):
+            async def cached_upload(image: str) -> str:
+                key = await asyncio.to_thread(self.content_key, image)
+                url = await asyncio.to_thread(self.get, key, identity, ttl)
+                if url is None:
+                    url = await upload(image)
+                    if url:
+                        await asyncio.to_thread(self.set, key, identity, url)
+                return url
+        else:
+            def cached_upload(image: str) -> str:
+                key = self.content_key(image)
+                url = self.get(key, identity, ttl)
+                if url is None:
+                    url = upload(image)
+                    if url:
+                        self.set(key, identity, url)
+                return url
+
+        cached_upload.cache_identity = identity
+        cached_upload.cache_ttl = ttl
+        return cached_upload
+
+    def export_to(self, path: Union[str, Path]) -> int:
+        """
+        导出全部记录为 JSON 文件（供其他机器导入）
+
+        :param path: 导出文件路径
+        :return: 导出的记录数
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT content_key, uploader, url, uploaded_at FROM uploads ORDER BY uploaded_at').fetchall()
+        records = [{'content_key': key, 'uploader': uploader, 'url': url, 'uploaded_at': uploaded_at}
+                   for key, uploader, url, uploaded_at in rows]
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        ConversionCache._atomic_write(path, json.dumps({'version': 1, 'uploads': records}, ensure_ascii=False))
+        return len(records)
+
+    def import_from(self, path: Union[str, Path]) -> int:
+        """
+        导入 export_to 导出的记录（同一键保留较新的记录）
+
+        :param path: 导出文件路径
+        :return: 新增或更新的记录数
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            records = json.load(f).get('uploads', [])
+
+        changed = 0
+        with self._lock, self._connection:
+            for record in records:
+                cursor = self._connection.execute(
+                    'INSERT INTO uploads (content_key, uploader, url, uploaded_at) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (content_key, uploader) DO UPDATE SET url = excluded.url, '
+                    'uploaded_at = excluded.uploaded_at WHERE excluded.uploaded_at > uploads.uploaded_at',
+                    (record['content_key'], record['uploader'], record['url'], record['uploaded_at']))
+                changed += cursor.rowcount
+        return changed
+
+    def clear(self) -> None:
+        """清空全部记录"""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM uploads')
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取统计信息
+
+        :return: 命中、未命中、写入、过期次数，命中率，记录数
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats['entries'] = self._connection.execute('SELECT COUNT(*) FROM uploads').fetchone()[0]
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
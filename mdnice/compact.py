@@ -0,0 +1,196 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：HTML 压缩 去掉内联样式中的冗余声明和无意义空白 减小输出体积
+# 文件路径：mdnice/compact.py
+
+"""
+HTML 压缩
+
+编辑器输出的每个段落、span、代码 token 都带着完整的 style，其中很多声明是多余的：
+同一属性写了多次、被后面的简写覆盖、与父元素继承下来的值相同、等于元素的默认值。
+公众号等平台只认内联样式，不能改用 class，这里逐个元素删掉这些声明并去掉空白：
+
+- 重复声明只保留最终生效的一条，被后面简写覆盖的长写属性删除
+- 可继承属性与最近的显式祖先声明相同、且元素没有浏览器默认值时删除
+- 等于元素默认值的非继承属性删除（如 span 上的 margin: 0）
+- 去掉声明之间、逗号前后的空白和块级元素之间的空白文本
+
+示例：
+    >>> compacted, saved = compact_html(html_content)
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+from .css_inliner import HTMLElement, parse_html, serialize_html, split_declarations
+
+# 可继承属性
+INHERITED_PROPERTIES = frozenset({
+    'color', 'font-family', 'font-size', 'font-style', 'font-weight', 'line-height',
+    'letter-spacing', 'word-spacing', 'text-align', 'word-break', 'word-wrap', 'overflow-wrap',
+})
+
+# 浏览器默认样式中会重新设置这些可继承属性的元素（继承值不能代替显式声明）
+_UA_INHERITED_OVERRIDES: Dict[str, frozenset] = {
+    'font-size': frozenset({'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'small', 'sub', 'sup', 'code', 'pre',
+                            'kbd', 'samp'}),
+    'font-weight': frozenset({'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'strong', 'b', 'th'}),
+    'font-style': frozenset({'em', 'i', 'cite', 'var', 'dfn', 'address'}),
+    'font-family': frozenset({'code', 'pre', 'kbd', 'samp', 'tt'}),
+    'color': frozenset({'a'}),
+    'text-align': frozenset({'th'}),
+}
+
+# 没有默认外边距、内边距、边框的元素，以及它们可以省略的默认值
+_PLAIN_ELEMENTS = frozenset({'span', 'section', 'strong', 'b', 'em', 'i', 'code', 'a', 'li', 'img',
+                             'figcaption', 'sup', 'sub'})
+_DEFAULT_VALUES: Dict[str, frozenset] = {
+    'margin': frozenset({'0', '0px'}),
+    'margin-top': frozenset({'0', '0px'}),
+    'margin-right': frozenset({'0', '0px'}),
+    'margin-bottom': frozenset({'0', '0px'}),
+    'margin-left': frozenset({'0', '0px'}),
+    'padding': frozenset({'0', '0px'}),
+    'padding-top': frozenset({'0', '0px'}),
+    'padding-right': frozenset({'0', '0px'}),
+    'padding-bottom': frozenset({'0', '0px'}),
+    'padding-left': frozenset({'0', '0px'}),
+    'border': frozenset({'none', '0'}),
+    'background': frozenset({'none', 'transparent'}),
+    'background-color': frozenset({'transparent'}),
+    'box-shadow': frozenset({'none'}),
+    'text-indent': frozenset({'0', '0px'}),
+    'float': frozenset({'none'}),
+}
+_INLINE_DISPLAY = frozenset({'span', 'strong', 'b', 'em', 'i', 'code', 'a', 'sup', 'sub'})
+_BLOCK_DISPLAY = frozenset({'section', 'p', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote',
+                            'figure', 'figcaption', 'pre', 'ul', 'ol'})
+# 两侧都是这些元素时，中间的空白文本不影响排版
+_BLOCK_ELEMENTS = _BLOCK_DISPLAY | {'li', 'table', 'hr', 'br'}
+
+# 简写属性 -> 会被它重置的长写属性（后出现的简写覆盖之前的这些属性）
+# 不能按前缀判断：border 不重置 border-radius，overflow 不重置 overflow-wrap，outline 不重置 outline-offset
+_SIDES = ('top', 'right', 'bottom', 'left')
+_SHORTHANDS: Dict[str, frozenset] = {
+    'margin': frozenset(f'margin-{side}' for side in _SIDES),
+    'padding': frozenset(f'padding-{side}' for side in _SIDES),
+    'border': frozenset({f'border-{side}{part}' for side in _SIDES for part in ('', '-width', '-style', '-color')}
+                        | {'border-width', 'border-style', 'border-color', 'border-image', 'border-image-source',
+                           'border-image-slice', 'border-image-width', 'border-image-outset',
+                           'border-image-repeat'}),
+    'border-width': frozenset(f'border-{side}-width' for side in _SIDES),
+    'border-style': frozenset(f'border-{side}-style' for side in _SIDES),
+    'border-color': frozenset(f'border-{side}-color' for side in _SIDES),
+    **{f'border-{side}': frozenset(f'border-{side}-{part}' for part in ('width', 'style', 'color'))
+       for side in _SIDES},
+    'border-radius': frozenset({'border-top-left-radius', 'border-top-right-radius',
+                                'border-bottom-right-radius', 'border-bottom-left-radius'}),
+    'background': frozenset({'background-color', 'background-image', 'background-repeat', 'background-position',
+                             'background-position-x', 'background-position-y', 'background-size',
+                             'background-attachment', 'background-origin', 'background-clip'}),
+    'font': frozenset({'font-style', 'font-variant', 'font-variant-caps', 'font-weight', 'font-stretch',
+                       'font-size', 'line-height', 'font-family', 'font-size-adjust', 'font-kerning'}),
+    'list-style': frozenset({'list-style-type', 'list-style-position', 'list-style-image'}),
+    'text-decoration': frozenset({'text-decoration-line', 'text-decoration-style', 'text-decoration-color',
+                                  'text-decoration-thickness'}),
+    'outline': frozenset({'outline-color', 'outline-style', 'outline-width'}),
+    'overflow': frozenset({'overflow-x', 'overflow-y'}),
+}
+
+# 保留空白的元素
+_PRESERVE_WHITESPACE = frozenset({'pre', 'code', 'textarea'})
+
+_SPACES = re.compile(r'\s+')
+_COMMA = re.compile(r'\s*,\s*')
+
+
+def _normalize_value(value: str) -> str:
+    value = _COMMA.sub(',', _SPACES.sub(' ', value.strip()))
+    # 双引号在属性中会转义为 &quot;，改用单引号
+    if '"' in value and "'" not in value:
+        value = value.replace('"', "'")
+    return value
+
+
+def _effective(declarations: List[Tuple[str, str, bool]]) -> List[Tuple[str, str, bool]]:
+    """合并重复声明和被后面简写覆盖的长写属性，保持最终生效的值和顺序"""
+    result: List[Tuple[str, str, bool]] = []
+    for prop, value, important in declarations:
+        overridden = [item for item in result
+                      if (item[0] == prop or item[0] in _SHORTHANDS.get(prop, ()))
+                      and (important or not item[2])]
+        if any(item[0] == prop and item[2] and not important for item in result):
+            continue  # 之前的 !important 仍然生效
+        for item in overridden:
+            result.remove(item)
+        result.append((prop, _normalize_value(value), important))
+    return result
+
+
+def _is_default(tag: str, prop: str, value: str) -> bool:
+    if prop == 'display':
+        return (value == 'inline' and tag in _INLINE_DISPLAY) or (value == 'block' and tag in _BLOCK_DISPLAY)
+    return tag in _PLAIN_ELEMENTS and value.lower() in _DEFAULT_VALUES.get(prop, ())
+
+
+def _is_block(node) -> bool:
+    return isinstance(node, HTMLElement) and node.tag in _BLOCK_ELEMENTS
+
+
+def _compact_element(element: HTMLElement, inherited: Dict[str, str], preserve: bool = False) -> None:
+    """
+    压缩元素及其后代
+
+    :param element: 元素
+    :param inherited: 祖先显式声明的可继承属性
+    :param preserve: 是否位于保留空白的元素（pre/code）内
+    """
+    style = element.attrs.get('style')
+    own = inherited
+    if style is not None:
+        kept = []
+        own = dict(inherited)
+        for prop, value, important in _effective(split_declarations(style)):
+            if not important:
+                if prop in INHERITED_PROPERTIES and inherited.get(prop) == value \
+                        and element.tag not in _UA_INHERITED_OVERRIDES.get(prop, ()):
+                    continue
+                if _is_default(element.tag, prop, value):
+                    continue
+            if prop in INHERITED_PROPERTIES:
+                own[prop] = value
+            kept.append(f"{prop}:{value}{'!important' if important else ''}")
+        if kept:
+            element.attrs['style'] = ';'.join(kept)
+        else:
+            del element.attrs['style']
+
+    preserve = preserve or element.tag in _PRESERVE_WHITESPACE
+    if not preserve:
+        children = element.children
+        element.children = [
+            child for index, child in enumerate(children)
+            if not (isinstance(child, str) and not child.strip()
+                    and (index == 0 or _is_block(children[index - 1]))
+                    and (index == len(children) - 1 or _is_block(children[index + 1])))]
+
+    for child in element.children:
+        if isinstance(child, HTMLElement):
+            _compact_element(child, own, preserve)
+
+
+def compact_html(html_content: str) -> Tuple[str, int]:
+    """
+    压缩 HTML 中的内联样式和空白
+
+    :param html_content: HTML
+    :return: (压缩后的 HTML, 节省的字节数)
+    """
+    root = parse_html(html_content)
+    _compact_element(root, {})
+    compacted = serialize_html(root)
+    saved = len(html_content.encode('utf-8')) - len(compacted.encode('utf-8'))
+    if saved < 0:
+        return html_content, 0
+    return compacted, saved
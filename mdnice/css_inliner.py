@@ -0,0 +1,606 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：CSS 内联引擎 把主题样式编译后一次遍历写入元素的 style 属性
+# 文件路径：mdnice/css_inliner.py
+
+"""
+CSS 内联引擎
+
+微信公众号等平台只保留内联样式，需要把主题 CSS 写到每个元素上。
+规则在构造时解析并编译一次：按最右侧选择器的 ID/类/标签建立索引，
+匹配结果（命中的规则组合）与最终 style 字符串都会被缓存复用，
+整棵树只遍历一次。同一主题与代码主题组合的编译结果全局缓存。
+
+可单独使用，既能处理离线渲染结果，也能处理从浏览器取回的 HTML：
+
+    >>> from mdnice.css_inliner import CSSInliner
+    >>> CSSInliner('#nice p { color: red; }').inline('<section id="nice"><p>hi</p></section>')
+    '<section id="nice"><p style="color: red;">hi</p></section>'
+"""
+
+import re
+from functools import lru_cache
+from html import escape
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+from .themes import get_theme_css, get_code_theme_css
+
+# ============================================================================
+# 轻量 DOM
+# ============================================================================
+
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                 'link', 'meta', 'source', 'track', 'wbr'}
+
+
+class HTMLElement:
+    """HTML 元素节点（文本节点直接以字符串形式保存在 children 中，保持原始转义）"""
+
+    __slots__ = ('tag', 'attrs', 'children', 'parent')
+
+    def __init__(self, tag: str, attrs: Dict[str, Optional[str]],
+                 parent: Optional['HTMLElement'] = None) -> None:
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List[Any] = []
+        self.parent = parent
+
+    @property
+    def classes(self) -> List[str]:
+        return (self.attrs.get('class') or '').split()
+
+    def element_children(self) -> List['HTMLElement']:
+        return [child for child in self.children if isinstance(child, HTMLElement)]
+
+    def iter(self):
+        """深度优先遍历所有后代元素"""
+        for child in self.children:
+            if isinstance(child, HTMLElement):
+                yield child
+                yield from child.iter()
+
+
+class _HTMLTreeBuilder(HTMLParser):
+    """把 HTML 片段解析为 HTMLElement 树"""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.root = HTMLElement('#root', {})
+        self.current = self.root
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        element = HTMLElement(tag, dict(attrs), self.current)
+        self.current.children.append(element)
+        if tag not in VOID_ELEMENTS:
+            self.current = element
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.current.children.append(HTMLElement(tag, dict(attrs), self.current))
+
+    def handle_endtag(self, tag: str) -> None:
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data: str) -> None:
+        self.current.children.append(data)
+
+    def handle_entityref(self, name: str) -> None:
+        self.current.children.append(f'&{name};')
+
+    def handle_charref(self, name: str) -> None:
+        self.current.children.append(f'&#{name};')
+
+    def handle_comment(self, data: str) -> None:
+        self.current.children.append(f'<!--{data}-->')
+
+    def handle_decl(self, decl: str) -> None:
+        self.current.children.append(f'<!{decl}>')
+
+
+def parse_html(html_content: str) -> HTMLElement:
+    """
+    解析 HTML 片段
+
+    :param html_content: HTML 字符串
+    :return: 虚拟根节点（tag 为 '#root'）
+    """
+    builder = _HTMLTreeBuilder()
+    builder.feed(html_content)
+    builder.close()
+    return builder.root
+
+
+def _escape_attribute(value: str) -> str:
+    return value.replace('&', '&amp;').replace('"', '&quot;')
+
+
+def serialize_html(node: HTMLElement) -> str:
+    """
+    把节点的子内容序列化为 HTML
+
+    :param node: 根节点（通常为 parse_html 的返回值）
+    :return: HTML 字符串
+    """
+    parts: List[str] = []
+
+    def walk(element: HTMLElement) -> None:
+        for child in element.children:
+            if isinstance(child, str):
+                parts.append(child)
+                continue
+            parts.append(f'<{child.tag}')
+            for name, value in child.attrs.items():
+                if value is None:
+                    parts.append(f' {name}')
+                else:
+                    parts.append(f' {name}="{_escape_attribute(value)}"')
+            parts.append('>')
+            if child.tag in VOID_ELEMENTS:
+                continue
+            walk(child)
+            parts.append(f'</{child.tag}>')
+
+    walk(node)
+    return ''.join(parts)
+
+
+# ============================================================================
+# CSS 解析
+# ============================================================================
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_SIMPLE_SELECTOR_RE = re.compile(r"""
+    \#(?P<id>[-\w]+)
+  | \.(?P<cls>[-\w]+)
+  | \[\s*(?P<attr>[-\w]+)\s*(?:(?P<op>[~^$*|]?=)\s*(?P<value>"[^"]*"|'[^']*'|[^\]\s]*)\s*)?\]
+  | (?P<pseudo>::?[-\w]+)
+  | (?P<tag>[-\w]+|\*)
+""", re.X)
+
+# 支持的伪类与伪元素
+_PSEUDO_CLASSES = {':first-child', ':last-child'}
+_PSEUDO_ELEMENTS = {'::before': 'before', ':before': 'before', '::after': 'after', ':after': 'after'}
+
+
+def split_declarations(body: str) -> List[Tuple[str, str, bool]]:
+    """
+    拆分声明块，忽略括号和引号内的分号（如 data URL）
+
+    :param body: 声明块文本（不含花括号）或 style 属性值
+    :return: [(属性名, 值, 是否 !important), ...]
+    """
+    declarations = []
+    depth = 0
+    quote = ''
+    start = 0
+    for index, char in enumerate(body + ';'):
+        if quote:
+            if char == quote:
+                quote = ''
+        elif char in '"\'':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ';' and depth == 0:
+            item = body[start:index].strip()
+            start = index + 1
+            if ':' not in item:
+                continue
+            prop, value = item.split(':', 1)
+            value = value.strip()
+            important = value.lower().endswith('!important')
+            if important:
+                value = value[:-len('!important')].strip()
+            if value:
+                declarations.append((prop.strip().lower(), value, important))
+    return declarations
+
+
+class _Compound:
+    """复合选择器（如 p.custom#nice[data-x]:first-child）"""
+
+    __slots__ = ('tag', 'id', 'classes', 'attrs', 'pseudo_classes')
+
+    def __init__(self) -> None:
+        self.tag: Optional[str] = None
+        self.id: Optional[str] = None
+        self.classes: List[str] = []
+        self.attrs: List[Tuple[str, Optional[str], Optional[str]]] = []
+        self.pseudo_classes: List[str] = []
+
+    def matches(self, element: HTMLElement) -> bool:
+        if self.tag and element.tag != self.tag:
+            return False
+        if self.id and element.attrs.get('id') != self.id:
+            return False
+        if self.classes:
+            element_classes = element.classes
+            for name in self.classes:
+                if name not in element_classes:
+                    return False
+        for name, op, expected in self.attrs:
+            if name not in element.attrs:
+                return False
+            if op is None:
+                continue
+            actual = element.attrs[name] or ''
+            if op == '=' and actual != expected:
+                return False
+            if op == '~=' and expected not in actual.split():
+                return False
+            if op == '^=' and not actual.startswith(expected):
+                return False
+            if op == '$=' and not actual.endswith(expected):
+                return False
+            if op == '*=' and expected not in actual:
+                return False
+            if op == '|=' and not (actual == expected or actual.startswith(expected + '-')):
+                return False
+        for pseudo in self.pseudo_classes:
+            parent = element.parent
+            if parent is None:
+                return False
+            siblings = parent.element_children()
+            if pseudo == ':first-child' and siblings[0] is not element:
+                return False
+            if pseudo == ':last-child' and siblings[-1] is not element:
+                return False
+        return True
+
+
+def _tokenize_selector(selector: str) -> List[str]:
+    """按空白和 > 拆分选择器（忽略方括号与引号内部）"""
+    tokens: List[str] = []
+    current = ''
+    bracket = 0
+    quote = ''
+    for char in selector:
+        if quote:
+            current += char
+            if char == quote:
+                quote = ''
+        elif char in '"\'':
+            quote = char
+            current += char
+        elif char == '[':
+            bracket += 1
+            current += char
+        elif char == ']':
+            bracket -= 1
+            current += char
+        elif bracket == 0 and (char.isspace() or char == '>'):
+            if current:
+                tokens.append(current)
+                current = ''
+            if char == '>':
+                tokens.append('>')
+        else:
+            current += char
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+def _parse_selector(selector: str):
+    """
+    解析单个选择器
+
+    :return: (复合选择器列表[(组合符, _Compound)], 伪元素, 特异性)，不支持时返回 None
+    """
+    parts: List[Tuple[str, _Compound]] = []
+    pseudo_element = None
+    combinator = ' '
+    specificity = [0, 0, 0]
+
+    for token in _tokenize_selector(selector):
+        if token == '>':
+            combinator = '>'
+            continue
+        if pseudo_element:
+            return None  # 伪元素只能出现在最后
+        compound = _Compound()
+        position = 0
+        for match in _SIMPLE_SELECTOR_RE.finditer(token):
+            if match.start() != position:
+                return None
+            position = match.end()
+            if match.group('id'):
+                compound.id = match.group('id')
+                specificity[0] += 1
+            elif match.group('cls'):
+                compound.classes.append(match.group('cls'))
+                specificity[1] += 1
+            elif match.group('attr'):
+                value = match.group('value')
+                if value and value[0] in '"\'':
+                    value = value[1:-1]
+                compound.attrs.append((match.group('attr').lower(), match.group('op'), value))
+                specificity[1] += 1
+            elif match.group('pseudo'):
+                pseudo = match.group('pseudo').lower()
+                if pseudo in _PSEUDO_ELEMENTS:
+                    pseudo_element = _PSEUDO_ELEMENTS[pseudo]
+                    specificity[2] += 1
+                elif pseudo in _PSEUDO_CLASSES:
+                    compound.pseudo_classes.append(pseudo)
+                    specificity[1] += 1
+                else:
+                    return None
+            elif match.group('tag') != '*':
+                compound.tag = match.group('tag').lower()
+                specificity[2] += 1
+        if position != len(token):
+            return None
+        parts.append((combinator, compound))
+        combinator = ' '
+
+    if not parts:
+        return None
+    return parts, pseudo_element, tuple(specificity)
+
+
+def _iter_css_rules(css: str):
+    """逐条产出 (选择器文本, 声明块)，跳过 @ 规则"""
+    css = _COMMENT_RE.sub('', css)
+    index = 0
+    length = len(css)
+    while index < length:
+        brace = css.find('{', index)
+        if brace == -1:
+            break
+        prelude = css[index:brace].strip()
+        depth = 1
+        end = brace + 1
+        while end < length and depth:
+            if css[end] == '{':
+                depth += 1
+            elif css[end] == '}':
+                depth -= 1
+            end += 1
+        body = css[brace + 1:end - 1]
+        index = end
+        if prelude.startswith('@'):
+            continue
+        yield prelude, body
+
+
+# ============================================================================
+# 内联引擎
+# ============================================================================
+
+class _CompiledRule:
+    """编译后的单条规则（一个选择器对应一条）"""
+
+    __slots__ = ('rank', 'parts', 'pseudo_element', 'declarations')
+
+    def __init__(self, parts, pseudo_element, declarations) -> None:
+        self.rank = 0
+        self.parts = parts
+        self.pseudo_element = pseudo_element
+        self.declarations = declarations
+
+    def matches(self, element: HTMLElement) -> bool:
+        return self._match(element, len(self.parts) - 1)
+
+    def _match(self, element: HTMLElement, position: int) -> bool:
+        combinator, compound = self.parts[position]
+        if not compound.matches(element):
+            return False
+        if position == 0:
+            return True
+        parent = element.parent
+        if combinator == '>':
+            return parent is not None and parent.tag != '#root' and self._match(parent, position - 1)
+        while parent is not None and parent.tag != '#root':
+            if self._match(parent, position - 1):
+                return True
+            parent = parent.parent
+        return False
+
+
+class CSSInliner:
+    """
+    编译后的 CSS 内联器
+
+    规则按最右侧复合选择器的 ID、类名、标签建立索引，每个元素只检查可能命中的规则；
+    命中规则组合到计算样式、计算样式加原有内联样式到最终 style 字符串都会缓存，
+    相同结构的元素直接复用结果。
+    """
+
+    # 计算结果缓存的最大条目数（超过后清空重建）
+    MAX_CACHE_ENTRIES = 8192
+
+    def __init__(self, css: str) -> None:
+        """
+        编译 CSS
+
+        :param css: CSS 文本
+        """
+        rules: List[Tuple[Tuple[int, int, int], int, _CompiledRule]] = []
+        order = 0
+        for prelude, body in _iter_css_rules(css):
+            declarations = tuple(split_declarations(body))
+            if not declarations:
+                continue
+            for selector in prelude.split(','):
+                parsed = _parse_selector(selector)
+                if parsed is None:
+                    continue
+                parts, pseudo_element, specificity = parsed
+                rules.append((specificity, order, _CompiledRule(parts, pseudo_element, declarations)))
+                order += 1
+
+        # 按层叠顺序（特异性、出现顺序）排序后的位置即为规则的 rank
+        rules.sort(key=lambda item: (item[0], item[1]))
+        self.rules: List[_CompiledRule] = []
+        self._by_id: Dict[str, List[_CompiledRule]] = {}
+        self._by_class: Dict[str, List[_CompiledRule]] = {}
+        self._by_tag: Dict[str, List[_CompiledRule]] = {}
+        self._universal: List[_CompiledRule] = []
+
+        for rank, (_, _, rule) in enumerate(rules):
+            rule.rank = rank
+            self.rules.append(rule)
+            key = rule.parts[-1][1]
+            if key.id:
+                self._by_id.setdefault(key.id, []).append(rule)
+            elif key.classes:
+                self._by_class.setdefault(key.classes[0], []).append(rule)
+            elif key.tag:
+                self._by_tag.setdefault(key.tag, []).append(rule)
+            else:
+                self._universal.append(rule)
+
+        self._computed_cache: Dict[Tuple[int, ...], Tuple[Dict[str, str], Dict[str, str]]] = {}
+        self._style_cache: Dict[Tuple[Tuple[int, ...], str], str] = {}
+
+    def _candidates(self, element: HTMLElement) -> List[_CompiledRule]:
+        candidates = list(self._universal)
+        element_id = element.attrs.get('id')
+        if element_id and element_id in self._by_id:
+            candidates.extend(self._by_id[element_id])
+        for name in set(element.classes):
+            if name in self._by_class:
+                candidates.extend(self._by_class[name])
+        if element.tag in self._by_tag:
+            candidates.extend(self._by_tag[element.tag])
+        return candidates
+
+    def _computed(self, ranks: Tuple[int, ...]) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """按 rank 顺序合并命中规则的声明，返回 (普通声明, !important 声明)"""
+        cached = self._computed_cache.get(ranks)
+        if cached is not None:
+            return cached
+        normal: Dict[str, str] = {}
+        important: Dict[str, str] = {}
+        for rank in ranks:
+            for prop, value, is_important in self.rules[rank].declarations:
+                if is_important:
+                    important[prop] = value
+                else:
+                    normal[prop] = value
+        if len(self._computed_cache) >= self.MAX_CACHE_ENTRIES:
+            self._computed_cache.clear()
+        self._computed_cache[ranks] = (normal, important)
+        return normal, important
+
+    def _style_for(self, ranks: Tuple[int, ...], existing: str) -> str:
+        """计算最终 style 字符串（原有内联样式优先，!important 规则最高）"""
+        key = (ranks, existing)
+        cached = self._style_cache.get(key)
+        if cached is not None:
+            return cached
+        normal, important = self._computed(ranks)
+        merged = dict(normal)
+        for prop, value, _ in split_declarations(existing):
+            merged[prop] = value
+        merged.update(important)
+        style = ' '.join(f'{prop}: {value};' for prop, value in merged.items())
+        if len(self._style_cache) >= self.MAX_CACHE_ENTRIES:
+            self._style_cache.clear()
+        self._style_cache[key] = style
+        return style
+
+    @staticmethod
+    def _pseudo_content(value: Optional[str]) -> Optional[str]:
+        """解析 content 属性，返回要插入的 HTML 文本；none/normal 返回 None"""
+        if value is None:
+            return None
+        value = value.strip()
+        if value in ('none', 'normal'):
+            return None
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+            return escape(value[1:-1], quote=False)
+        return ''
+
+    def inline_tree(self, root: HTMLElement) -> None:
+        """
+        把样式写入整棵树（原地修改）
+
+        :param root: parse_html 返回的根节点
+        """
+        # 伪元素生成的 span 在遍历结束后统一插入，避免影响 :first-child 等判断
+        pending: List[Tuple[HTMLElement, str, HTMLElement]] = []
+        stack = [root]
+        while stack:
+            element = stack.pop()
+            for child in element.children:
+                if isinstance(child, HTMLElement):
+                    stack.append(child)
+            if element is root:
+                continue
+
+            matched: Dict[Optional[str], List[int]] = {}
+            for rule in self._candidates(element):
+                if rule.matches(element):
+                    matched.setdefault(rule.pseudo_element, []).append(rule.rank)
+
+            target = matched.get(None)
+            if target:
+                existing = element.attrs.get('style') or ''
+                element.attrs['style'] = self._style_for(tuple(sorted(target)), existing)
+
+            for pseudo in ('before', 'after'):
+                ranks = matched.get(pseudo)
+                if not ranks:
+                    continue
+                normal, important = self._computed(tuple(sorted(ranks)))
+                declarations = dict(normal)
+                declarations.update(important)
+                content = self._pseudo_content(declarations.pop('content', None))
+                if content is None:
+                    continue
+                span = HTMLElement('span', {}, element)
+                if declarations:
+                    span.attrs['style'] = ' '.join(f'{prop}: {value};' for prop, value in declarations.items())
+                if content:
+                    span.children.append(content)
+                pending.append((element, pseudo, span))
+
+        for element, pseudo, span in pending:
+            if pseudo == 'before':
+                element.children.insert(0, span)
+            else:
+                element.children.append(span)
+
+    def inline(self, html_content: str) -> str:
+        """
+        内联 HTML 字符串中的样式
+
+        :param html_content: HTML 字符串
+        :return: 带内联样式的 HTML
+        """
+        root = parse_html(html_content)
+        self.inline_tree(root)
+        return serialize_html(root)
+
+
+@lru_cache(maxsize=32)
+def get_inliner(css: str) -> CSSInliner:
+    """
+    获取（缓存的）CSS 内联器
+
+    :param css: CSS 文本
+    :return: 编译后的内联器
+    """
+    return CSSInliner(css)
+
+
+@lru_cache(maxsize=64)
+def get_theme_inliner(theme: str, code_theme: str, mac_style: bool = True) -> CSSInliner:
+    """
+    获取主题、代码主题与 Mac 风格组合对应的内联器（每种组合只编译一次）
+
+    :param theme: 文章主题
+    :param code_theme: 代码主题
+    :param mac_style: 是否启用 Mac 风格
+    :return: 编译后的内联器
+    """
+    return get_inliner(get_theme_css(theme) + get_code_theme_css(code_theme, mac_style))
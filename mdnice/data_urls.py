@@ -0,0 +1,119 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：Data URL 图片提取 渲染前把内联 base64 图片换成短占位地址 渲染后再换回
+# 文件路径：mdnice/data_urls.py
+
+"""
+Data URL 图片提取
+
+未上传的 data:image/... 图片会随 Markdown 一起输入编辑器、参与渲染和复制，再随 HTML 传回，
+几张截图就能让每个环节多处理几十 MB。这里在渲染前把它们换成按内容哈希命名的短占位地址，
+编辑器和缓存中只出现占位地址，渲染完成后再把原始 Data URL 替换回 HTML。
+
+内容相同（解码后字节相同）的图片共用一个占位地址，同一个 Data URL 只解码一次。
+
+示例：
+    >>> md, data_urls = extract_data_urls(markdown_content)
+    >>> html = restore_data_urls(render(md), data_urls)
+"""
+
+import re
+import base64
+import hashlib
+import binascii
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote_to_bytes
+
+# 占位地址使用保留域名 .invalid，不会发出网络请求
+PLACEHOLDER_PREFIX = 'https://mdnice.invalid/data/'
+
+# 比占位地址还短的 Data URL 不值得替换
+MIN_DATA_URL_LENGTH = 256
+
+_DATA_URL_PATTERN = re.compile(
+    r'data:image/([a-zA-Z0-9.+-]+)((?:;[a-zA-Z0-9.+=-]+)*),([A-Za-z0-9+/=%._~-]+)')
+# 占位地址的扩展名只含小写字母和数字（与 _placeholder 生成的一致）
+_PLACEHOLDER_PATTERN = re.compile(re.escape(PLACEHOLDER_PREFIX) + r'[0-9a-f]{32}\.[a-z0-9]+')
+_EXTENSIONS = {'jpeg': 'jpg', 'svg+xml': 'svg', 'x-icon': 'ico', 'vnd.microsoft.icon': 'ico'}
+
+
+# 已解码过的 Data URL：原文的 SHA-256 -> 占位地址（只保存摘要，不让几 MB 的原文常驻内存）
+_PLACEHOLDER_CACHE_SIZE = 256
+_placeholder_cache: 'OrderedDict[bytes, Optional[str]]' = OrderedDict()
+_placeholder_lock = threading.Lock()
+
+
+def _placeholder(subtype: str, parameters: str, payload: str) -> Optional[str]:
+    """生成占位地址（同一个 Data URL 只解码一次）"""
+    key = hashlib.sha256(f'{subtype}\0{parameters}\0{payload}'.encode('ascii')).digest()
+    with _placeholder_lock:
+        if key in _placeholder_cache:
+            _placeholder_cache.move_to_end(key)
+            return _placeholder_cache[key]
+
+    placeholder = _decode_placeholder(subtype, parameters, payload)
+    with _placeholder_lock:
+        _placeholder_cache[key] = placeholder
+        while len(_placeholder_cache) > _PLACEHOLDER_CACHE_SIZE:
+            _placeholder_cache.popitem(last=False)
+    return placeholder
+
+
+def _decode_placeholder(subtype: str, parameters: str, payload: str) -> Optional[str]:
+    """解码 Data URL 并按内容哈希生成占位地址（无法解码时返回 None）"""
+    try:
+        if ';base64' in parameters.lower():
+            data = base64.b64decode(payload, validate=True)
+        else:
+            data = unquote_to_bytes(payload)
+    except (binascii.Error, ValueError):
+        return None
+
+    subtype = subtype.lower()
+    digest = hashlib.sha256(subtype.encode('ascii') + b'\0' + data).hexdigest()[:32]
+    extension = _EXTENSIONS.get(subtype) or re.sub(r'[^a-z0-9]', '', subtype.split('+')[0]) or 'bin'
+    return f'{PLACEHOLDER_PREFIX}{digest}.{extension}'
+
+
+def extract_data_urls(markdown_content: str) -> Tuple[str, Dict[str, str]]:
+    """
+    把 Markdown 中的 Data URL 图片替换为占位地址
+
+    :param markdown_content: Markdown内容
+    :return: (替换后的 Markdown, {占位地址: 原始 Data URL})
+    """
+    if 'data:image/' not in markdown_content:
+        return markdown_content, {}
+
+    data_urls: Dict[str, str] = {}
+
+    def replace(match: re.Match) -> str:
+        if len(match.group(0)) < MIN_DATA_URL_LENGTH:
+            return match.group(0)
+        placeholder = _placeholder(match.group(1), match.group(2), match.group(3))
+        if placeholder is None:
+            return match.group(0)
+        data_urls.setdefault(placeholder, match.group(0))
+        return placeholder
+
+    result = _DATA_URL_PATTERN.sub(replace, markdown_content)
+    if data_urls:
+        saved = len(markdown_content) - len(result)
+        print(f"🗜️ 已提取 {len(data_urls)} 张 Data URL 图片（{saved / 1024:.1f} KB），渲染时使用占位地址")
+    return result, data_urls
+
+
+def restore_data_urls(html_content: str, data_urls: Dict[str, str]) -> str:
+    """
+    把 HTML 中的占位地址替换回原始 Data URL
+
+    :param html_content: 渲染得到的 HTML
+    :param data_urls: extract_data_urls 返回的映射
+    :return: 替换后的 HTML
+    """
+    if not data_urls:
+        return html_content
+    return _PLACEHOLDER_PATTERN.sub(lambda m: data_urls.get(m.group(0), m.group(0)), html_content)
@@ -0,0 +1,173 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：内嵌 JS 引擎 在进程内的 V8 中执行编辑器渲染包 不启动浏览器
+# 文件路径：mdnice/embedded.py
+
+"""
+内嵌 JS 引擎
+
+编辑器中 Markdown 到带样式 HTML 的转换本身是纯 JavaScript（markdown-it + juice），
+浏览器的布局和绘制都是额外开销。这里把编辑器的渲染包加载到进程内的 V8（mini-racer）中，
+每篇文档直接调用渲染函数，省去 Chromium 的启动时间和内存。
+
+渲染包约定与页面渲染接口一致（见 MarkdownConverter._probe_render_api）：
+- 完整接口：全局函数 mdniceRender(markdown, options)，或带 render 方法的对象
+- 拆分接口：markdown-it 实例 markdownParser + juice 内联函数，样式取自主题包，
+  渲染微信格式后再转换为知乎、掘金格式（见 platforms 模块）
+
+依赖：pip install mini-racer
+"""
+
+import json
+import weakref
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import requests
+
+from .image_uploaders import shared_session
+from .platforms import transform_html
+from .themes import get_editor_css, load_theme_pack
+
+try:
+    from py_mini_racer import MiniRacer
+except ImportError:
+    MiniRacer = None  # 内嵌引擎需要 mini-racer
+
+# 浏览器全局对象的最小替身（渲染包通常挂载到 window 上）
+_PRELUDE_JS = """
+var window = globalThis;
+var self = globalThis;
+var global = globalThis;
+"""
+
+# 与页面渲染接口探测逻辑一致的调用入口
+_GLUE_JS = """
+var __mdniceEmbedded = (function () {
+    var config = %s;
+    var pick = function (names, test) {
+        for (var i = 0; i < names.length; i++) {
+            var value = globalThis[names[i]];
+            if (value && test(value)) return value;
+        }
+        return null;
+    };
+
+    var api = pick(config.apiNames, function (v) { return typeof v === 'function' || typeof v.render === 'function'; });
+    var parser = pick(config.parserNames, function (v) { return typeof v.render === 'function'; });
+    var juice = pick(config.juiceNames, function (v) { return typeof v === 'function' || typeof v.inlineContent === 'function'; });
+    var mode = api ? 'api' : (parser && juice ? 'pieces' : null);
+    var juiceOptions = { inlinePseudoElements: true, preserveImportant: true };
+
+    return {
+        mode: mode,
+        render: function (md, options, css) {
+            var result;
+            if (mode === 'api') {
+                result = typeof api === 'function' ? api(md, options) : api.render(md, options);
+            } else {
+                var html = '<section id="nice">' + parser.render(md) + '</section>';
+                result = typeof juice.inlineContent === 'function'
+                    ? juice.inlineContent(html, css, juiceOptions)
+                    : juice('<style>' + css + '</style>' + html, juiceOptions);
+            }
+            if (result && typeof result.then === 'function') {
+                throw new Error('内嵌引擎需要同步的渲染接口');
+            }
+            return result;
+        }
+    };
+})();
+"""
+
+
+class EmbeddedRenderer:
+    """
+    内嵌 JS 渲染器
+
+    渲染包只在创建时编译一次，之后每篇文档只是一次函数调用。
+    """
+
+    def __init__(self,
+                 bundle: Union[str, Path],
+                 api_names: Optional[List[str]] = None,
+                 parser_names: Optional[List[str]] = None,
+                 juice_names: Optional[List[str]] = None,
+                 timeout: int = 30,
+                 session: Optional[requests.Session] = None) -> None:
+        """
+        初始化渲染器
+
+        :param bundle: 渲染包路径或 URL
+        :param api_names: 完整渲染接口的全局名称（默认与页面探测一致）
+        :param parser_names: markdown-it 实例的全局名称
+        :param juice_names: juice 函数的全局名称
+        :param timeout: 下载渲染包的超时时间（秒）
+        :param session: 下载渲染包使用的 HTTP 会话（默认使用共享的连接池会话）
+        """
+        if MiniRacer is None:
+            raise ImportError("内嵌引擎需要 mini-racer: pip install mini-racer")
+
+        source = self._load_bundle(bundle, timeout, session or shared_session())
+        config = {
+            'apiNames': api_names or ['mdniceRender', '__MDNICE_RENDER__'],
+            'parserNames': parser_names or ['markdownParser', 'mdniceParser'],
+            'juiceNames': juice_names or ['juice'],
+        }
+
+        self.context = MiniRacer()
+        # 解释器退出前主动释放 V8 上下文（留到模块清理阶段释放可能卡住）
+        self._finalizer = weakref.finalize(self, self.context.close)
+        self.context.eval(_PRELUDE_JS)
+        self.context.eval(source)
+        self.context.eval(_GLUE_JS % json.dumps(config))
+
+        self.mode: Optional[str] = self.context.eval('__mdniceEmbedded.mode')
+        if self.mode is None:
+            raise RuntimeError("渲染包中找不到渲染接口（mdniceRender 或 markdownParser + juice）")
+
+        if self.mode == 'pieces' and load_theme_pack() is None:
+            print("⚠️ 未找到主题包，内嵌引擎将使用内置近似样式（运行 themes.harvest() 可获得与编辑器一致的样式）")
+
+        print(f"⚡ 内嵌引擎已加载渲染包（{'完整接口' if self.mode == 'api' else 'markdown-it + juice'}）")
+
+    @staticmethod
+    def _load_bundle(bundle: Union[str, Path], timeout: int, session: requests.Session) -> str:
+        """读取本地渲染包，或从 URL 下载"""
+        if isinstance(bundle, str) and bundle.startswith(('http://', 'https://')):
+            print(f"📥 正在下载渲染包: {bundle}")
+            response = session.get(bundle, timeout=timeout)
+            response.raise_for_status()
+            return response.text
+
+        with open(bundle, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def render(self,
+               markdown_content: str,
+               theme: str = 'normal',
+               code_theme: str = 'atom-one-dark',
+               mac_style: bool = True,
+               platform: str = 'wechat') -> str:
+        """
+        渲染 Markdown 为带内联样式的 HTML
+
+        :param markdown_content: Markdown内容
+        :param theme: 文章主题
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        :param platform: 目标平台
+        :return: 带内联样式的HTML
+        """
+        options: Dict[str, Any] = {'theme': theme, 'codeTheme': code_theme, 'macStyle': mac_style,
+                                   'platform': platform}
+        css = get_editor_css(theme, code_theme, mac_style) if self.mode == 'pieces' else ''
+        html_content = self.context.call('__mdniceEmbedded.render', markdown_content, options, css)
+        if not isinstance(html_content, str):
+            raise RuntimeError("渲染接口未返回 HTML 字符串")
+        return transform_html(html_content, platform) if self.mode == 'pieces' else html_content
+
+    def close(self) -> None:
+        """释放 JS 运行时"""
+        self._finalizer()
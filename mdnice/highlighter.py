@@ -0,0 +1,126 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：离线代码高亮 使用 Pygments 分词并按编辑器代码主题输出内联样式
+# 文件路径：mdnice/highlighter.py
+
+"""
+离线代码高亮
+
+编辑器使用 highlight.js 高亮代码，输出 <span class="hljs-keyword"> 等元素，再由 juice
+把代码主题的颜色内联到每个 span 上。这里用 Pygments 分词，把 Pygments 的 token 类型映射为
+highlight.js 的类名，并直接写入对应代码主题的内联样式，输出与编辑器相同的结构。
+
+高亮结果按（语言, 代码, 代码主题）缓存，批量转换中重复的代码片段只高亮一次。
+
+依赖：pip install pygments（未安装时代码块不高亮）
+"""
+
+from html import escape
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from .themes import CODE_THEME_TOKEN_STYLES
+
+try:
+    from pygments.lexers import get_lexer_by_name
+    from pygments.token import Token
+    from pygments.util import ClassNotFound
+except ImportError:
+    get_lexer_by_name = None  # 未安装 Pygments 时不高亮
+
+# Pygments token 类型 -> highlight.js 类名（未列出的子类型沿父类型查找）
+_TOKEN_CLASSES: Dict = {}
+if get_lexer_by_name is not None:
+    _TOKEN_CLASSES = {
+        Token.Comment: 'comment',
+        Token.Comment.Preproc: 'meta',
+        Token.Comment.PreprocFile: 'string',
+        Token.Keyword: 'keyword',
+        Token.Keyword.Constant: 'literal',
+        Token.Keyword.Type: 'type',
+        Token.Operator.Word: 'keyword',
+        Token.Name.Builtin: 'built_in',
+        Token.Name.Builtin.Pseudo: 'built_in',
+        Token.Name.Function: 'title',
+        Token.Name.Class: 'title',
+        Token.Name.Decorator: 'meta',
+        Token.Name.Tag: 'name',
+        Token.Name.Attribute: 'attr',
+        Token.Name.Variable: 'variable',
+        Token.Name.Constant: 'variable',
+        Token.Literal.String: 'string',
+        Token.Literal.String.Doc: 'comment',
+        Token.Literal.Number: 'number',
+        Token.Generic.Inserted: 'addition',
+        Token.Generic.Deleted: 'deletion',
+        Token.Generic.Heading: 'section',
+        Token.Generic.Subheading: 'section',
+    }
+
+
+@lru_cache(maxsize=256)
+def _token_class(token_type) -> Optional[str]:
+    """查找 token 类型对应的 highlight.js 类名"""
+    while token_type is not None:
+        if token_type in _TOKEN_CLASSES:
+            return _TOKEN_CLASSES[token_type]
+        token_type = token_type.parent
+    return None
+
+
+@lru_cache(maxsize=64)
+def _get_lexer(language: str):
+    """获取（缓存的）语言分词器，不支持的语言返回 None"""
+    try:
+        return get_lexer_by_name(language, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def highlight_code(code: str, language: str, code_theme: str) -> Optional[str]:
+    """
+    高亮代码，返回 <code> 内部的 HTML（结果缓存）
+
+    :param code: 代码文本（不含末尾换行）
+    :param language: 语言名称（与代码块的 info 字符串一致）
+    :param code_theme: 代码主题
+    :return: 带内联样式的 span 序列；未安装 Pygments 或语言不支持时返回 None
+    """
+    if get_lexer_by_name is None or not language:
+        return None
+
+    lexer = _get_lexer(language.lower())
+    if lexer is None:
+        return None
+
+    styles = CODE_THEME_TOKEN_STYLES.get(code_theme, CODE_THEME_TOKEN_STYLES['atom-one-dark'])
+    parts: List[str] = []
+    current_class: Optional[str] = None
+    buffer: List[str] = []
+
+    def flush() -> None:
+        if not buffer:
+            return
+        text = escape(''.join(buffer), quote=False)
+        if current_class:
+            style = styles.get(current_class)
+            style_attr = f' style="{style}"' if style else ''
+            parts.append(f'<span class="hljs-{current_class}"{style_attr}>{text}</span>')
+        else:
+            parts.append(text)
+        buffer.clear()
+
+    # 相邻的同类 token 合并为一个 span，减少输出体积；类型不同的空白不放进 span
+    for token_type, value in lexer.get_tokens(code):
+        css_class = _token_class(token_type)
+        if css_class != current_class and not value.strip():
+            css_class = None
+        if css_class != current_class:
+            flush()
+            current_class = css_class
+        buffer.append(value)
+    flush()
+
+    return ''.join(parts)
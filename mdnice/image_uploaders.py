@@ -22,7 +22,10 @@ import json
 import base64
 import hashlib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import tempfile
+import threading
 from pathlib import Path
 from typing import Optional, Union, Tuple
 from datetime import datetime
@@ -50,12 +53,62 @@ class WechatUploadType(Enum):
 # 辅助函数
 # ============================================================================
 
-def _image_to_bytes(image: Union[str, bytes, 'Image.Image'], format: str = 'JPEG') -> Tuple[bytes, str]:
+# 连接池与重试的默认配置
+DEFAULT_POOL_SIZE = 16
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+
+_shared_session: Optional[requests.Session] = None
+_shared_session_lock = threading.Lock()
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE,
+                   retries: int = DEFAULT_RETRIES,
+                   backoff_factor: float = DEFAULT_BACKOFF_FACTOR) -> requests.Session:
+    """
+    创建带连接池和重试的 HTTP 会话
+
+    连接保持 keep-alive，批量上传时复用已建立的 TCP/TLS 连接。
+    只对读取请求（GET、HEAD、OPTIONS）在连接失败和 429/5xx 时按指数退避重试；
+    上传请求（POST、PUT）不自动重试，避免重复上传或因文件已存在而报错。
+
+    :param pool_size: 每个主机的连接池大小（不小于同时上传的图片数）
+    :param retries: 最大重试次数
+    :param backoff_factor: 退避系数（第 n 次重试前等待 backoff_factor * 2^(n-1) 秒）
+    :return: HTTP 会话（可在多个上传器之间共用）
+    """
+    retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                  backoff_factor=backoff_factor, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS'}), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def shared_session() -> requests.Session:
+    """
+    获取进程内共享的 HTTP 会话（上传器未指定 session 时使用）
+
+    :return: HTTP 会话
+    """
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = create_session()
+    return _shared_session
+
+
+def _image_to_bytes(image: Union[str, bytes, 'Image.Image'], format: str = 'JPEG',
+                    session: Optional[requests.Session] = None) -> Tuple[bytes, str]:
     """
     将各种图片输入转换为字节数据
 
     :param image: 图片输入（路径、URL、bytes、PIL.Image等）
     :param format: 输出格式（JPEG、PNG等）
+    :param session: 下载网络图片使用的 HTTP 会话（默认使用共享会话）
     :return: (图片字节数据, 文件名)
     """
     file_data = b''
@@ -113,7 +166,7 @@ def _image_to_bytes(image: Union[str, bytes, 'Image.Image'], format: str = 'JPEG
 
             # 网络图片 URL
             if image.startswith(('http://', 'https://')):
-                response = requests.get(image, timeout=10)
+                response = (session or shared_session()).get(image, timeout=10)
                 response.raise_for_status()
                 file_data = response.content
                 # 尝试从 URL 获取文件名
@@ -159,13 +212,16 @@ class SMUploader:
 
     def __init__(self,
                  api_token: Optional[str] = None,
-                 api_domain: str = 'https://smms.app') -> None:
+                 api_domain: str = 'https://smms.app',
+                 session: Optional[requests.Session] = None) -> None:
         """
         初始化上传器
 
         :param api_token: SM.MS API Token（可选，但建议提供以提高配额）
         :param api_domain: API 域名（默认 https://smms.app，也可使用 https://sm.ms）
+        :param session: HTTP 会话（默认使用共享的连接池会话）
         """
+        self.session: requests.Session = session or shared_session()
         self.api_domain = api_domain.rstrip('/')
         self.api_url = f'{self.api_domain}/api/v2/upload'
         self.api_token = api_token
@@ -175,6 +231,10 @@ class SMUploader:
         domain_name = 'smms.app (国内优化)' if 'smms.app' in self.api_domain else 'sm.ms (国际)'
         print(f"  ℹ️ SM.MS 使用域名: {domain_name}")
 
+    def cache_identity(self) -> str:
+        """图床标识（上传缓存按此区分不同图床和存储空间）"""
+        return f'SMUploader:{self.api_domain}'
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到 SM.MS
@@ -188,7 +248,7 @@ class SMUploader:
         try:
             # 处理网络图片
             if image_path.startswith('http'):
-                response = requests.get(image_path, timeout=10)
+                response = self.session.get(image_path, timeout=10)
                 file_data = response.content
                 filename = f"remote_{hash(image_path)}.jpg"
             else:
@@ -210,7 +270,7 @@ class SMUploader:
                 headers['Authorization'] = self.api_token
 
             # 上传
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
                 files=files,
                 headers=headers,
@@ -252,17 +312,23 @@ class ImgURLUploader:
     获取 Token：https://www.imgurl.org/vip/manage/api
     """
 
-    def __init__(self, api_token: str, api_uid: str):
+    def __init__(self, api_token: str, api_uid: str, session: Optional[requests.Session] = None):
         """
         初始化上传器
 
         :param api_token: ImgURL API Token
         :param api_uid: ImgURL 用户 UID
+        :param session: HTTP 会话（默认使用共享的连接池会话）
         """
+        self.session: requests.Session = session or shared_session()
         self.api_url = 'https://www.imgurl.org/api/v2/upload'
         self.api_token = api_token
         self.api_uid = api_uid
 
+    def cache_identity(self) -> str:
+        """图床标识（上传缓存按此区分不同图床和存储空间）"""
+        return f'ImgURLUploader:{self.api_uid}'
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到 ImgURL
@@ -276,7 +342,7 @@ class ImgURLUploader:
         try:
             # 读取图片
             if image_path.startswith('http'):
-                response = requests.get(image_path, timeout=10)
+                response = self.session.get(image_path, timeout=10)
                 file_data = response.content
             else:
                 with open(image_path, 'rb') as f:
@@ -296,7 +362,7 @@ class ImgURLUploader:
                 'image': image_base64
             }
 
-            response = requests.post(self.api_url, data=data, timeout=30)
+            response = self.session.post(self.api_url, data=data, timeout=30)
             result = response.json()
 
             if result.get('code') == 200:
@@ -324,10 +390,19 @@ class LuoGuoUploader:
     - 国内访问快
     """
 
-    def __init__(self):
-        """初始化上传器"""
+    def __init__(self, session: Optional[requests.Session] = None):
+        """
+        初始化上传器
+
+        :param session: HTTP 会话（默认使用共享的连接池会话）
+        """
+        self.session: requests.Session = session or shared_session()
         self.api_url = 'https://imgtu.com/api/v1/upload'
 
+    def cache_identity(self) -> str:
+        """图床标识（上传缓存按此区分不同图床和存储空间）"""
+        return 'LuoGuoUploader'
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到路过图床
@@ -341,7 +416,7 @@ class LuoGuoUploader:
         try:
             # 读取图片
             if image_path.startswith('http'):
-                response = requests.get(image_path, timeout=10)
+                response = self.session.get(image_path, timeout=10)
                 file_data = response.content
                 filename = f"remote_{hash(image_path)}.jpg"
             else:
@@ -352,7 +427,7 @@ class LuoGuoUploader:
             # 上传
             files = {'source': (filename, file_data)}
 
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
                 files=files,
                 timeout=30
@@ -391,7 +466,8 @@ class QiniuUploader:
     依赖：pip install qiniu
     """
 
-    def __init__(self, access_key: str, secret_key: str, bucket: str, domain: str):
+    def __init__(self, access_key: str, secret_key: str, bucket: str, domain: str,
+                 session: Optional[requests.Session] = None):
         """
         初始化上传器
 
@@ -399,7 +475,9 @@ class QiniuUploader:
         :param secret_key: 七牛云 SecretKey
         :param bucket: 存储空间名称
         :param domain: CDN 域名（需要自己配置）
+        :param session: HTTP 会话（默认使用共享的连接池会话）
         """
+        self.session: requests.Session = session or shared_session()
         try:
             from qiniu import Auth, put_data
             self.auth = Auth(access_key, secret_key)
@@ -409,6 +487,10 @@ class QiniuUploader:
         except ImportError:
             raise ImportError("请先安装七牛云SDK: pip install qiniu")
 
+    def cache_identity(self) -> str:
+        """图床标识（上传缓存按此区分不同图床和存储空间）"""
+        return f'QiniuUploader:{self.bucket}:{self.domain}'
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到七牛云
@@ -422,7 +504,7 @@ class QiniuUploader:
         try:
             # 读取图片
             if image_path.startswith('http'):
-                response = requests.get(image_path, timeout=10)
+                response = self.session.get(image_path, timeout=10)
                 file_data = response.content
                 filename = f"remote_{hash(image_path)}.jpg"
             else:
@@ -467,7 +549,8 @@ class AliyunOSSUploader:
     """
 
     def __init__(self, access_key_id: str, access_key_secret: str,
-                 endpoint: str, bucket_name: str):
+                 endpoint: str, bucket_name: str,
+                 session: Optional[requests.Session] = None):
         """
         初始化上传器
 
@@ -475,7 +558,9 @@ class AliyunOSSUploader:
         :param access_key_secret: AccessKey Secret
         :param endpoint: Endpoint（如 oss-cn-hangzhou.aliyuncs.com）
         :param bucket_name: Bucket 名称
+        :param session: HTTP 会话（默认使用共享的连接池会话）
         """
+        self.session: requests.Session = session or shared_session()
         try:
             import oss2
             auth = oss2.Auth(access_key_id, access_key_secret)
@@ -485,6 +570,10 @@ class AliyunOSSUploader:
         except ImportError:
             raise ImportError("请先安装阿里云OSS SDK: pip install oss2")
 
+    def cache_identity(self) -> str:
+        """图床标识（上传缓存按此区分不同图床和存储空间）"""
+        return f'AliyunOSSUploader:{self.endpoint}:{self.bucket_name}'
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到阿里云 OSS
@@ -498,7 +587,7 @@ class AliyunOSSUploader:
         try:
             # 读取图片
             if image_path.startswith('http'):
-                response = requests.get(image_path, timeout=10)
+                response = self.session.get(image_path, timeout=10)
                 file_data = response.content
                 filename = f"remote_{hash(image_path)}.jpg"
             else:
@@ -540,7 +629,8 @@ class UpyunUploader:
     依赖：pip install upyun
     """
 
-    def __init__(self, bucket: str, username: str, password: str, domain: str):
+    def __init__(self, bucket: str, username: str, password: str, domain: str,
+                 session: Optional[requests.Session] = None):
         """
         初始化上传器
 
@@ -548,7 +638,9 @@ class UpyunUploader:
         :param username: 操作员账号
         :param password: 操作员密码
         :param domain: 加速域名
+        :param session: HTTP 会话（默认使用共享的连接池会话）
         """
+        self.session: requests.Session = session or shared_session()
         try:
             import upyun
             self.up = upyun.UpYun(bucket, username, password, timeout=30)
@@ -556,6 +648,10 @@ class UpyunUploader:
         except ImportError:
             raise ImportError("请先安装又拍云SDK: pip install upyun")
 
+    def cache_identity(self) -> str:
+        """图床标识（上传缓存按此区分不同图床和存储空间）"""
+        return f'UpyunUploader:{self.domain}'
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到又拍云
@@ -569,7 +665,7 @@ class UpyunUploader:
         try:
             # 读取图片
             if image_path.startswith('http'):
-                response = requests.get(image_path, timeout=10)
+                response = self.session.get(image_path, timeout=10)
                 file_data = response.content
                 filename = f"remote_{hash(image_path)}.jpg"
             else:
@@ -615,7 +711,8 @@ class GitHubUploader:
     """
 
     def __init__(self, token: str, repo: str, branch: str = 'main',
-                 use_jsdelivr: bool = True):
+                 use_jsdelivr: bool = True,
+                 session: Optional[requests.Session] = None):
         """
         初始化上传器
 
@@ -623,13 +720,19 @@ class GitHubUploader:
         :param repo: 仓库名（格式：username/repo）
         :param branch: 分支名
         :param use_jsdelivr: 是否使用 jsdelivr CDN
+        :param session: HTTP 会话（默认使用共享的连接池会话）
         """
+        self.session: requests.Session = session or shared_session()
         self.api_url = 'https://api.github.com/repos'
         self.token = token
         self.repo = repo
         self.branch = branch
         self.use_jsdelivr = use_jsdelivr
 
+    def cache_identity(self) -> str:
+        """图床标识（上传缓存按此区分不同图床和存储空间）"""
+        return f'GitHubUploader:{self.repo}:{self.branch}:{self.use_jsdelivr}'
+
     def upload(self, image_path: str) -> str:
         """
         上传图片到 GitHub
@@ -643,7 +746,7 @@ class GitHubUploader:
         try:
             # 读取图片
             if image_path.startswith('http'):
-                response = requests.get(image_path, timeout=10)
+                response = self.session.get(image_path, timeout=10)
                 file_data = response.content
                 filename = f"remote_{hash(image_path)}.jpg"
             else:
@@ -671,7 +774,7 @@ class GitHubUploader:
                 'branch': self.branch
             }
 
-            response = requests.put(
+            response = self.session.put(
                 url, json=data, headers=headers, timeout=30)
             result = response.json()
 
@@ -704,19 +807,25 @@ class LocalStorageUploader:
     - 自己搭建的服务器
     """
 
-    def __init__(self, storage_dir: str, base_url: str):
+    def __init__(self, storage_dir: str, base_url: str, session: Optional[requests.Session] = None):
         """
         初始化上传器
 
         :param storage_dir: 本地存储目录
         :param base_url: 访问的基础URL
+        :param session: HTTP 会话（默认使用共享的连接池会话）
         """
+        self.session: requests.Session = session or shared_session()
         self.storage_dir = Path(storage_dir)
         self.base_url = base_url.rstrip('/')
 
         # 创建目录
         self.storage_dir.mkdir(parents=True, exist_ok=True)
 
+    def cache_identity(self) -> str:
+        """图床标识（上传缓存按此区分不同图床和存储空间）"""
+        return f'LocalStorageUploader:{self.storage_dir.resolve()}:{self.base_url}'
+
     def upload(self, image_path: str) -> str:
         """
         复制图片到本地目录
@@ -730,7 +839,7 @@ class LocalStorageUploader:
         try:
             # 读取图片
             if image_path.startswith('http'):
-                response = requests.get(image_path, timeout=10)
+                response = self.session.get(image_path, timeout=10)
                 file_data = response.content
                 filename = f"remote_{hash(image_path)}.jpg"
             else:
@@ -805,6 +914,9 @@ class WechatUploader:
     # Token 缓存过期时间（提前5分钟刷新）
     TOKEN_EXPIRE_MARGIN = 300
 
+    # 临时素材有效期（秒）
+    TEMPORARY_MEDIA_TTL = 3 * 24 * 3600
+
     def __init__(
             self,
             app_id: str,
@@ -815,6 +927,7 @@ class WechatUploader:
             server_token: Optional[str] = None,
             verbose: bool = True,
             proxies: Optional[dict] = None,
+            session: Optional[requests.Session] = None,
     ):
         """
         初始化微信公众号图床上传器
@@ -827,7 +940,9 @@ class WechatUploader:
         :param server_token: 服务器认证令牌（可选）
         :param verbose: 是否显示详细日志
         :param proxies: 代理配置
+        :param session: HTTP 会话（默认使用共享的连接池会话）
         """
+        self.session: requests.Session = session or shared_session()
         if not Image:
             raise ImportError("微信上传器需要 Pillow: pip install Pillow")
 
@@ -854,6 +969,18 @@ class WechatUploader:
         # Token 缓存
         self._access_token = None
         self._token_expires_at = 0
+        self._token_lock = threading.Lock()
+
+    def cache_identity(self) -> str:
+        """图床标识（上传缓存按此区分不同图床和存储空间）"""
+        return f'WechatUploader:{self.app_id}:{self.upload_type.name}'
+
+    @property
+    def cache_ttl(self) -> Optional[float]:
+        """上传结果的有效期（临时素材 3 天后失效，提前 1 小时视为过期）"""
+        if self.upload_type == WechatUploadType.TEMPORARY:
+            return self.TEMPORARY_MEDIA_TTL - 3600
+        return None
 
     def upload(self, image) -> str:
         """
@@ -874,7 +1001,7 @@ class WechatUploader:
                 raise Exception("❌ 获取 access_token 失败")
 
             # 使用 _image_to_bytes 函数转换图片
-            file_data, filename = _image_to_bytes(image, format='JPEG')
+            file_data, filename = _image_to_bytes(image, format='JPEG', session=self.session)
 
             # 根据上传类型检查文件大小
             max_size_mb = self._get_max_size()
@@ -964,7 +1091,7 @@ class WechatUploader:
             if self.verbose:
                 print(f"  📤 正在上传临时素材到微信公众号...")
 
-            response = requests.post(
+            response = self.session.post(
                 url, files=files, proxies=self.proxies, timeout=30)
             response.raise_for_status()
 
@@ -1004,7 +1131,7 @@ class WechatUploader:
             if self.verbose:
                 print(f"  📤 正在上传永久素材到微信公众号...")
 
-            response = requests.post(
+            response = self.session.post(
                 url, files=files, proxies=self.proxies, timeout=30)
             response.raise_for_status()
 
@@ -1049,7 +1176,7 @@ class WechatUploader:
             if self.verbose:
                 print(f"  📤 正在上传图文消息图片到微信公众号...")
 
-            response = requests.post(
+            response = self.session.post(
                 url, files=files, proxies=self.proxies, timeout=30)
             response.raise_for_status()
 
@@ -1083,6 +1210,15 @@ class WechatUploader:
         return mime_types.get(ext, 'image/jpeg')
 
     def _get_access_token(self) -> Optional[str]:
+        """
+        获取 access_token（并发上传时只由一个线程刷新，其余线程复用结果）
+
+        :return: access_token 或 None
+        """
+        with self._token_lock:
+            return self._resolve_access_token()
+
+    def _resolve_access_token(self) -> Optional[str]:
         """
         获取 access_token（自动选择最佳方式）
 
@@ -1146,7 +1282,7 @@ class WechatUploader:
                 if self.server_token:
                     data['token'] = self.server_token
 
-                response = requests.post(
+                response = self.session.post(
                     self.server_url,
                     headers=headers,
                     json=data if data else None,
@@ -1209,7 +1345,7 @@ class WechatUploader:
 
             url = f"{self.TOKEN_URL}?grant_type=client_credential&appid={self.app_id}&secret={self.app_secret}"
 
-            response = requests.get(url, proxies=self.proxies, timeout=10)
+            response = self.session.get(url, proxies=self.proxies, timeout=10)
             response.raise_for_status()
 
             result = response.json()
@@ -0,0 +1,237 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：Markdown 图片扫描 一次扫描找出行内、引用式和 HTML 图片 跳过代码块 批量生成图片清单
+# 文件路径：mdnice/images.py
+
+"""
+Markdown 图片扫描
+
+逐行扫描一次 Markdown，找出三种图片写法：
+
+- 行内图片：![alt](url "title")，地址可以用 <...> 包裹
+- 引用式图片：![alt][id]、![alt][]、![alt]，地址取自 [id]: url 定义（替换时改写定义行）
+- HTML 图片：<img src="url">
+
+围栏代码块（``` / ~~~）、缩进代码块（4 个空格或制表符，不含列表项内容和段落续行）和行内代码中的
+图片语法不处理，不会触发无意义的上传和文件检查。
+每个结果记录地址在原文中的位置，替换时只改写地址本身，alt、标题等保持原样。
+
+collect_images 在转换前扫描一批文件，按图片内容去重，得到整批文章需要处理的图片清单，
+可以据此提前规划、限速和并发上传。
+
+示例：
+    >>> refs = scan_images(markdown_content)
+    >>> manifest = collect_images(['a.md', 'b.md'])
+"""
+
+import re
+import os
+from html import escape, unescape
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from .cache import UploadCache
+
+_FENCE_PATTERN = re.compile(r' {0,3}(`{3,}|~{3,})')
+_QUOTE_PATTERN = re.compile(r'(?: {0,3}> ?)*')
+_LIST_PATTERN = re.compile(r'( *)([-+*]|\d{1,9}[.)])( +|$)')
+_HEADING_PATTERN = re.compile(r' {0,3}#{1,6}(?:\s|$)')
+_CODE_SPAN_PATTERN = re.compile(r'(`+)(?!`).+?(?<!`)\1(?!`)')
+_COMMENT_PATTERN = re.compile(r'<!--.*?-->')
+_DEFINITION_PATTERN = re.compile(
+    r' {0,3}\[([^\]]+)\]:[ \t]*(?:<([^>\n]*)>|(\S+))(?:[ \t]+(?:"[^"\n]*"|\'[^\'\n]*\'|\([^)\n]*\)))?[ \t]*$')
+_IMAGE_PATTERN = re.compile(
+    # 行内图片：地址在 <...> 中（第 2 组）或不含空白的地址（第 3 组）
+    r'!\[([^\]]*)\]\((?:<([^>\n]*)>|([^)\s]+))(?:\s+(?:"[^"]*"|\'[^\']*\'|\([^)]*\)))?\s*\)'
+    # 引用式图片：![alt][id]（第 5 组为 id，可为空）或 ![alt]
+    r'|!\[([^\]]*)\](?:\[([^\]]*)\])?'
+    # HTML 图片：src 的值在第 6、7、8 组之一
+    r'|<img\b[^>]*?\ssrc\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))',
+    re.I)
+
+
+class ImageRef:
+    """Markdown 中的一处图片地址"""
+
+    __slots__ = ('url', 'kind', 'start', 'end', 'line')
+
+    def __init__(self, url: str, kind: str, start: int, end: int, line: int) -> None:
+        """
+        :param url: 图片地址（HTML 中的实体已解码）
+        :param kind: 写法（inline/reference/html）
+        :param start: 地址在原文中的起始位置
+        :param end: 地址在原文中的结束位置
+        :param line: 所在行号（从 1 开始；引用式图片为定义所在行）
+        """
+        self.url = url
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.line = line
+
+    def __repr__(self) -> str:
+        return f'ImageRef({self.kind}, {self.url[:60]!r}, line={self.line})'
+
+
+def _normalize_label(label: str) -> str:
+    return ' '.join(label.split()).lower()
+
+
+def _mask(line: str) -> str:
+    """把行内代码和 HTML 注释替换为等长空格（保持位置不变）"""
+    if '`' in line:
+        line = _CODE_SPAN_PATTERN.sub(lambda m: ' ' * len(m.group(0)), line)
+    if '<!--' in line:
+        line = _COMMENT_PATTERN.sub(lambda m: ' ' * len(m.group(0)), line)
+    return line
+
+
+def scan_images(markdown_content: str) -> List[ImageRef]:
+    """
+    扫描 Markdown 中的图片（跳过代码块和行内代码）
+
+    同一个引用定义被多张图片使用时只返回一次。
+
+    :param markdown_content: Markdown内容
+    :return: 按出现位置排序的图片地址列表
+    """
+    inline: List[ImageRef] = []
+    # 引用定义：标签 -> ImageRef（只保留第一个定义）
+    definitions: Dict[str, ImageRef] = {}
+    used_labels: List[str] = []
+
+    fence: Optional[str] = None
+    # 缩进代码块状态：所在列表项内容的缩进（不在列表中为 0）、上一行是否为空行、上一行是否为段落
+    list_indent = 0
+    previous_blank, previous_paragraph, indented_code = True, False, False
+    offset = 0
+    for number, line in enumerate(markdown_content.splitlines(keepends=True), 1):
+        line_start = offset
+        offset += len(line)
+
+        fence_match = _FENCE_PATTERN.match(line)
+        if fence is not None:
+            if fence_match and fence_match.group(1)[0] == fence[0] and len(fence_match.group(1)) >= len(fence) \
+                    and not line[fence_match.end():].strip():
+                fence = None
+            continue
+
+        body = line[_QUOTE_PATTERN.match(line).end():].expandtabs(4)
+        if not body.strip():
+            previous_blank, previous_paragraph = True, False
+            continue
+        indent = len(body) - len(body.lstrip(' '))
+        if list_indent and previous_blank and indent < list_indent and not _LIST_PATTERN.match(body):
+            list_indent = 0  # 空行后没有缩进到列表项内容，列表结束
+        if indent >= list_indent + 4 and (indented_code or not previous_paragraph):
+            indented_code = True
+            previous_blank = False
+            continue
+        indented_code = False
+        list_match = _LIST_PATTERN.match(body)
+        if list_match:
+            spaces = len(list_match.group(3))
+            list_indent = list_match.end(2) + (spaces if 0 < spaces <= 4 else 1)
+        previous_blank, previous_paragraph = False, not _HEADING_PATTERN.match(body)
+
+        if fence_match and not (fence_match.group(1)[0] == '`' and '`' in line[fence_match.end():]):
+            fence = fence_match.group(1)
+            previous_paragraph = False
+            continue
+
+        text = _mask(line)
+        definition = _DEFINITION_PATTERN.match(text.rstrip('\r\n'))
+        if definition:
+            label = _normalize_label(definition.group(1))
+            group = 2 if definition.group(2) is not None else 3
+            if label not in definitions:
+                definitions[label] = ImageRef(definition.group(group), 'reference',
+                                              line_start + definition.start(group),
+                                              line_start + definition.end(group), number)
+            continue
+
+        if '!' not in text and '<' not in text:
+            continue
+        for match in _IMAGE_PATTERN.finditer(text):
+            if match.group(2) is not None or match.group(3) is not None:
+                group = 2 if match.group(2) is not None else 3
+                inline.append(ImageRef(match.group(group), 'inline', line_start + match.start(group),
+                                       line_start + match.end(group), number))
+            elif match.group(4) is not None:
+                label = match.group(5) or match.group(4)
+                used_labels.append(_normalize_label(label))
+            else:
+                group = next(g for g in (6, 7, 8) if match.group(g) is not None)
+                inline.append(ImageRef(unescape(match.group(group)), 'html', line_start + match.start(group),
+                                       line_start + match.end(group), number))
+
+    references = {label: definitions[label] for label in used_labels if label in definitions}
+    return sorted(inline + list(references.values()), key=lambda ref: ref.start)
+
+
+def replace_image_urls(markdown_content: str, replacements: List[Tuple[ImageRef, str]]) -> str:
+    """
+    一次性替换图片地址
+
+    :param markdown_content: Markdown内容
+    :param replacements: [(scan_images 返回的图片, 新地址)]，按位置排序
+    :return: 替换后的 Markdown
+    """
+    parts: List[str] = []
+    position = 0
+    for ref, url in replacements:
+        parts.append(markdown_content[position:ref.start])
+        parts.append(escape(url) if ref.kind == 'html' else url)
+        position = ref.end
+    parts.append(markdown_content[position:])
+    return ''.join(parts)
+
+
+def image_type(url: str) -> str:
+    """
+    图片地址类型
+
+    :param url: 图片地址
+    :return: remote（网络图片）、data（Data URL）或 local（本地文件）
+    """
+    if url.startswith('data:image/'):
+        return 'data'
+    if urlparse(url).scheme in ('http', 'https', 'ftp'):
+        return 'remote'
+    return 'local'
+
+
+def collect_images(files: Iterable[Union[str, Path]]) -> List[Dict[str, Any]]:
+    """
+    扫描一批 Markdown 文件，生成按内容去重的图片清单
+
+    本地图片按文件内容去重（不同路径的相同图片合并为一项），网络图片按地址，Data URL 按内容。
+
+    :param files: Markdown 文件路径
+    :return: 图片清单，每项为 {'key': 去重键, 'type': local/remote/data, 'target': 本地绝对路径或地址,
+             'exists': 本地文件是否存在, 'size': 本地文件字节数, 'references': [{'file', 'line', 'url'}]}
+    """
+    manifest: Dict[str, Dict[str, Any]] = {}
+    for file in files:
+        file = Path(file)
+        with open(file, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
+
+        for ref in scan_images(markdown_content):
+            kind = image_type(ref.url)
+            target, exists, size = ref.url, True, None
+            if kind == 'local':
+                path = Path(ref.url) if os.path.isabs(ref.url) else file.parent / ref.url
+                target = str(path.resolve())
+                exists = os.path.isfile(target)
+                size = os.path.getsize(target) if exists else None
+
+            key = UploadCache.content_key(target) if exists else 'missing:' + target
+            entry = manifest.get(key)
+            if entry is None:
+                entry = manifest[key] = {'key': key, 'type': kind, 'target': target, 'exists': exists,
+                                         'size': size, 'references': []}
+            entry['references'].append({'file': str(file), 'line': ref.line, 'url': ref.url})
+    return list(manifest.values())
@@ -0,0 +1,271 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：增量预览 按顶层块缓存渲染结果 文档修改后只重新渲染变化的块
+# 文件路径：mdnice/incremental.py
+
+"""
+增量预览
+
+实时预览时每次修改都整篇重新渲染，耗时与文档长度成正比。这里把 Markdown 拆成顶层块
+（段落、标题、列表、代码块、表格等），按块内容的哈希缓存渲染结果；再次渲染时只把
+变化的块拼成一篇文档（块之间插入分隔段落）渲染一次，按分隔段落切开后与缓存的片段拼接。
+预览耗时因此取决于修改的大小，而不是文档的大小。
+
+块之间互相依赖的文档无法按块渲染，会自动整篇渲染：
+- 引用式链接定义（[text][id] 与 [id]: url）和脚注
+- 编辑器渲染时的外链（微信格式会把外链转为文末脚注并统一编号）
+
+示例：
+    >>> from mdnice import MarkdownConverter, IncrementalPreview
+    >>> with IncrementalPreview(MarkdownConverter(), theme='rose') as preview:
+    ...     html = preview.render(text)          # 首次渲染全部块
+    ...     html = preview.render(edited_text)   # 只渲染修改过的块
+
+依赖：pip install markdown-it-py mdit-py-plugins
+"""
+
+import re
+import hashlib
+from pathlib import Path
+from functools import lru_cache
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .data_urls import extract_data_urls, restore_data_urls
+
+try:
+    from markdown_it import MarkdownIt
+except ImportError:
+    MarkdownIt = None  # 增量预览需要 markdown-it-py 拆分文档
+
+try:
+    from mdit_py_plugins.footnote import footnote_plugin
+except ImportError:
+    footnote_plugin = None
+
+if TYPE_CHECKING:
+    from . import MarkdownConverter
+
+# 块之间的分隔段落（纯字母数字，任何渲染器都会原样输出为一个段落）
+BLOCK_SEPARATOR = 'mdniceblockseparator'
+_SEPARATOR_PATTERN = re.compile(rf'<p\b[^>]*>\s*{BLOCK_SEPARATOR}(\d+)\s*</p>\s*')
+_WRAPPER_PATTERN = re.compile(r'^\s*(<section\b[^>]*>)(.*)</section>\s*$', re.S)
+
+
+@lru_cache(maxsize=1)
+def _block_parser():
+    """获取（缓存的）块拆分用解析器，语法配置与离线引擎一致"""
+    if MarkdownIt is None:
+        raise ImportError("增量预览需要 markdown-it-py: pip install markdown-it-py mdit-py-plugins")
+    parser = MarkdownIt('commonmark', {'html': True}).enable(['table', 'strikethrough'])
+    if footnote_plugin:
+        parser.use(footnote_plugin)
+    return parser
+
+
+def split_blocks(markdown_content: str) -> Tuple[List[str], List[str]]:
+    """
+    把 Markdown 拆成顶层块
+
+    :param markdown_content: Markdown内容
+    :return: (块源码列表, 跨块依赖的语法描述列表)；依赖列表不为空时不能按块渲染
+    """
+    env: Dict[str, Any] = {}
+    tokens = _block_parser().parse(markdown_content, env)
+    lines = markdown_content.splitlines(keepends=True)
+
+    dependencies: List[str] = []
+    if env.get('references'):
+        dependencies.append('引用式链接定义')
+    # 脚注插件遇到未定义的 [text][id] 也会创建空的 footnotes，只看是否有脚注定义
+    if (env.get('footnotes') or {}).get('refs'):
+        dependencies.append('脚注')
+    if any(child.type == 'link_open' and (child.attrGet('href') or '').startswith(('http://', 'https://'))
+           for token in tokens if token.type == 'inline' for child in token.children or []):
+        dependencies.append('外链')
+
+    blocks: List[str] = []
+    start: Optional[int] = None
+    for token in tokens:
+        if token.level != 0 or token.map is None:
+            continue
+        if start is None:
+            start = token.map[0]
+        end = token.map[1]
+        block = ''.join(lines[start:end])
+        # $$ 块公式中可能有空行，CommonMark 会拆成多个段落，合并到公式闭合为止
+        if block.count('$$') % 2:
+            continue
+        blocks.append(block)
+        start = None
+    if start is not None:
+        blocks.append(''.join(lines[start:]))
+
+    return blocks, dependencies
+
+
+class IncrementalPreview:
+    """
+    增量预览渲染器
+
+    持有一个转换器（浏览器在多次渲染之间保持打开），按（块哈希, 主题, 代码主题,
+    Mac 风格, 平台, 引擎）缓存块片段，最久未使用的片段超过上限时淘汰。
+    """
+
+    def __init__(self,
+                 converter: 'MarkdownConverter',
+                 theme: str = 'normal',
+                 code_theme: Optional[str] = None,
+                 mac_style: Optional[bool] = None,
+                 platform: str = 'wechat',
+                 engine: str = 'browser',
+                 base_path: Optional[Path] = None,
+                 max_fragments: int = 4096) -> None:
+        """
+        初始化增量预览
+
+        :param converter: 转换器（图片处理、渲染引擎等配置取自转换器）
+        :param theme: 默认主题
+        :param code_theme: 默认代码主题（默认取转换器设置）
+        :param mac_style: 默认 Mac 风格（默认取转换器设置）
+        :param platform: 默认目标平台
+        :param engine: 渲染引擎（browser/offline/hybrid/embedded）
+        :param base_path: Markdown 所在目录，用于解析图片相对路径
+        :param max_fragments: 最多缓存的块片段数
+        """
+        if engine not in ('browser', 'offline', 'hybrid', 'embedded'):
+            raise ValueError(f"不支持的渲染引擎: {engine}")
+        if engine == 'embedded' and not converter.render_bundle:
+            raise ValueError("engine='embedded' 需要通过 render_bundle 指定编辑器渲染包")
+        _block_parser()
+
+        self.converter = converter
+        self.theme = converter._parse_theme(theme)
+        self.code_theme = code_theme if code_theme is not None else converter.code_theme
+        self.mac_style = mac_style if mac_style is not None else converter.mac_style
+        self.platform = platform
+        self.engine = engine
+        self.base_path = base_path
+        self.max_fragments = max_fragments
+
+        self._fragments: 'OrderedDict[Tuple, str]' = OrderedDict()
+        self._wrappers: Dict[Tuple, str] = {}
+        self._counters: Dict[str, int] = {'renders': 0, 'full_renders': 0, 'reused': 0, 'rendered': 0}
+
+    def __enter__(self) -> 'IncrementalPreview':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def render(self,
+               markdown_content: str,
+               theme: Optional[str] = None,
+               code_theme: Optional[str] = None,
+               platform: Optional[str] = None) -> str:
+        """
+        渲染文档，只重新渲染与缓存不同的块
+
+        :param markdown_content: Markdown内容
+        :param theme: 主题（默认使用初始化时的设置）
+        :param code_theme: 代码主题（默认使用初始化时的设置）
+        :param platform: 目标平台（默认使用初始化时的设置）
+        :return: 转换后的HTML
+        """
+        options = (self.converter._parse_theme(theme) if theme is not None else self.theme,
+                   code_theme or self.code_theme, self.mac_style, platform or self.platform, self.engine)
+        self._counters['renders'] += 1
+
+        blocks, dependencies = split_blocks(markdown_content)
+        if self.engine == 'offline' and dependencies == ['外链']:
+            # 离线引擎不做外链转脚注，外链不影响其他块
+            dependencies = []
+        if dependencies or not blocks:
+            if dependencies:
+                print(f"🔄 文档包含跨块语法（{'、'.join(dependencies)}），整篇渲染")
+            return self.converter._post_process(self._render_full(markdown_content, options))
+
+        keys = [(hashlib.sha256(block.encode('utf-8')).hexdigest(),) + options for block in blocks]
+        missing: Dict[Tuple, str] = {}
+        for key, block in zip(keys, blocks):
+            if key not in self._fragments and key not in missing:
+                missing[key] = block
+
+        if missing and not self._render_blocks(missing, options):
+            return self.converter._post_process(self._render_full(markdown_content, options))
+
+        fragments = []
+        for key in keys:
+            self._fragments.move_to_end(key)
+            fragments.append(self._fragments[key])
+        self._counters['reused'] += len(keys) - len(missing)
+        self._counters['rendered'] += len(missing)
+        print(f"⚡ 增量渲染: {len(missing)}/{len(keys)} 个块需要重新渲染")
+
+        # 淘汰放在拼接之后，避免淘汰本次要用的片段
+        while len(self._fragments) > self.max_fragments:
+            self._fragments.popitem(last=False)
+        html_content = self._wrappers[options] + ''.join(fragments) + '</section>'
+        return self.converter._post_process(html_content)
+
+    def _render(self, md_content: str, options: Tuple) -> str:
+        theme, code_theme, mac_style, platform, engine = options
+        return self.converter._render_uncached(engine, md_content, theme, code_theme, mac_style, platform)
+
+    def _render_full(self, markdown_content: str, options: Tuple) -> str:
+        """整篇渲染（经过转换器的缓存）"""
+        self._counters['full_renders'] += 1
+        theme, code_theme, mac_style, platform, engine = options
+        md_content = self.converter._process_images_in_markdown(markdown_content, self.base_path)
+        return self.converter._render_document(engine, md_content, theme, code_theme, mac_style, platform)
+
+    def _render_blocks(self, missing: Dict[Tuple, str], options: Tuple) -> bool:
+        """
+        把缺失的块拼成一篇文档渲染一次，按分隔段落切开后写入片段缓存
+
+        :param missing: {片段键: 块源码}
+        :param options: 渲染选项
+        :return: 切分结果与块数一致时返回 True，否则返回 False（调用方改为整篇渲染）
+        """
+        sources = [self.converter._process_images_in_markdown(block, self.base_path)
+                   for block in missing.values()]
+        combined = ''.join(f'{source.rstrip()}\n\n{BLOCK_SEPARATOR}{index}\n\n'
+                           for index, source in enumerate(sources))
+        combined, data_urls = extract_data_urls(combined)
+        html_content = self._render(combined, options)
+
+        match = _WRAPPER_PATTERN.match(html_content)
+        if match is None:
+            print("⚠️ 渲染结果缺少外层 section，整篇渲染")
+            return False
+        parts = _SEPARATOR_PATTERN.split(match.group(2))
+        pieces, numbers = parts[0::2], parts[1::2]
+        if numbers != [str(index) for index in range(len(sources))] or pieces[-1].strip():
+            print("⚠️ 块分隔段落未能原样保留，整篇渲染")
+            return False
+
+        self._wrappers[options] = match.group(1)
+        # 渲染时 Data URL 图片使用占位地址，写入缓存前换回原图（随片段一起淘汰）
+        for key, fragment in zip(missing, pieces):
+            self._fragments[key] = restore_data_urls(fragment, data_urls)
+        return True
+
+    def clear(self) -> None:
+        """清空片段缓存"""
+        self._fragments.clear()
+        self._wrappers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取统计信息
+
+        :return: 渲染次数、整篇渲染次数、复用和重新渲染的块数、缓存片段数
+        """
+        stats: Dict[str, Any] = dict(self._counters)
+        stats['fragments'] = len(self._fragments)
+        return stats
+
+    def close(self) -> None:
+        """关闭转换器打开的浏览器"""
+        self.converter._close_driver()
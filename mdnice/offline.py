@@ -0,0 +1,294 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：离线渲染引擎 不启动浏览器直接生成 mdnice 风格的内联样式 HTML
+# 文件路径：mdnice/offline.py
+
+"""
+离线渲染引擎
+
+使用 markdown-it-py 解析 Markdown，按 mdnice 编辑器的结构输出 HTML，
+再通过 CSS 内联引擎把主题、代码主题和 Mac 风格样式写到每个元素上。
+代码块由 Pygments 按所选代码主题高亮（见 highlighter 模块）。
+
+依赖：pip install markdown-it-py mdit-py-plugins pygments
+"""
+
+import re
+import difflib
+from html import escape
+from typing import Any, Dict, List, Tuple
+
+from .css_inliner import HTMLElement, get_theme_inliner, parse_html
+from .highlighter import highlight_code
+from .platforms import restore_link_footnotes, transform_html
+from .themes import DATA_TOOL, DATA_WEBSITE
+
+try:
+    from markdown_it import MarkdownIt
+except ImportError:
+    MarkdownIt = None  # 离线渲染需要 markdown-it-py
+
+try:
+    from mdit_py_plugins.footnote import footnote_plugin
+except ImportError:
+    footnote_plugin = None  # 未安装时不支持脚注语法
+
+
+# 离线引擎可以原样保留的内联 HTML 标签（其余标签交给编辑器渲染）
+SUPPORTED_HTML_TAGS = frozenset({
+    'a', 'b', 'br', 'code', 'del', 'div', 'em', 'i', 'img', 'p', 's', 'section',
+    'span', 'strong', 'sub', 'sup', 'u',
+})
+
+# 数学公式（$$...$$ 块公式或 $...$ 行内公式）
+_MATH_PATTERN = re.compile(r'\$\$|(?<![\\$\w])\$(?=\S)[^$\n]+?(?<=\S)\$(?![\w$])')
+_HTML_TAG_PATTERN = re.compile(r'<\s*([a-zA-Z][a-zA-Z0-9-]*)')
+
+
+# ============================================================================
+# 渲染器
+# ============================================================================
+
+class OfflineRenderer:
+    """
+    离线渲染器
+
+    输出结构与 mdnice 编辑器一致（section#nice 包裹、标题 prefix/content/suffix、
+    列表项 section、代码块 pre.custom 等），样式全部内联。
+    """
+
+    def __init__(self) -> None:
+        """初始化渲染器"""
+        if MarkdownIt is None:
+            raise ImportError("离线渲染需要 markdown-it-py: pip install markdown-it-py mdit-py-plugins")
+
+        self.md = MarkdownIt('commonmark', {'html': True}).enable(['table', 'strikethrough'])
+        if footnote_plugin:
+            self.md.use(footnote_plugin)
+
+        self.md.core.ruler.push('mdnice_figure', self._mark_figures)
+        for name in ('heading_open', 'heading_close', 'paragraph_open', 'paragraph_close',
+                     'bullet_list_open', 'ordered_list_open', 'list_item_open', 'list_item_close',
+                     'blockquote_open', 'table_open', 'table_close', 'hr', 'fence', 'code_block'):
+            self.md.add_render_rule(name, getattr(self, f'_render_{name}'))
+
+    @staticmethod
+    def _mark_figures(state) -> None:
+        """把只包含一张图片的段落标记为 figure"""
+        tokens = state.tokens
+        for index in range(len(tokens) - 2):
+            if (tokens[index].type == 'paragraph_open' and tokens[index + 1].type == 'inline'
+                    and tokens[index + 2].type == 'paragraph_close'):
+                children = [c for c in (tokens[index + 1].children or []) if not (c.type == 'text' and not c.content.strip())]
+                if len(children) == 1 and children[0].type == 'image':
+                    tokens[index].meta['figure'] = children[0].content
+                    tokens[index + 2].meta['figure'] = children[0].content
+
+    # ------------------------------------------------------------------
+    # 渲染规则（签名与 markdown-it 渲染器规则一致）
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _render_heading_open(renderer, tokens, idx, options, env) -> str:
+        return f'<{tokens[idx].tag} data-tool="{DATA_TOOL}"><span class="prefix"></span><span class="content">'
+
+    @staticmethod
+    def _render_heading_close(renderer, tokens, idx, options, env) -> str:
+        return f'</span><span class="suffix"></span></{tokens[idx].tag}>\n'
+
+    @staticmethod
+    def _render_paragraph_open(renderer, tokens, idx, options, env) -> str:
+        if tokens[idx].hidden:
+            return ''
+        if 'figure' in tokens[idx].meta:
+            return f'<figure data-tool="{DATA_TOOL}">'
+        return f'<p data-tool="{DATA_TOOL}">'
+
+    @staticmethod
+    def _render_paragraph_close(renderer, tokens, idx, options, env) -> str:
+        if tokens[idx].hidden:
+            return ''
+        if 'figure' in tokens[idx].meta:
+            caption = tokens[idx].meta['figure']
+            if caption:
+                return f'<figcaption>{escape(caption)}</figcaption></figure>\n'
+            return '</figure>\n'
+        return '</p>\n'
+
+    @staticmethod
+    def _render_bullet_list_open(renderer, tokens, idx, options, env) -> str:
+        return f'<ul data-tool="{DATA_TOOL}">\n'
+
+    @staticmethod
+    def _render_ordered_list_open(renderer, tokens, idx, options, env) -> str:
+        start = tokens[idx].attrGet('start')
+        start_attr = f' start="{start}"' if start is not None else ''
+        return f'<ol{start_attr} data-tool="{DATA_TOOL}">\n'
+
+    @staticmethod
+    def _render_list_item_open(renderer, tokens, idx, options, env) -> str:
+        return '<li><section>'
+
+    @staticmethod
+    def _render_list_item_close(renderer, tokens, idx, options, env) -> str:
+        return '</section></li>\n'
+
+    @staticmethod
+    def _render_blockquote_open(renderer, tokens, idx, options, env) -> str:
+        return f'<blockquote class="custom-blockquote multiquote-1" data-tool="{DATA_TOOL}">\n'
+
+    @staticmethod
+    def _render_table_open(renderer, tokens, idx, options, env) -> str:
+        return f'<section class="table-container" data-tool="{DATA_TOOL}"><table>\n'
+
+    @staticmethod
+    def _render_table_close(renderer, tokens, idx, options, env) -> str:
+        return '</table></section>\n'
+
+    @staticmethod
+    def _render_hr(renderer, tokens, idx, options, env) -> str:
+        return f'<hr data-tool="{DATA_TOOL}">\n'
+
+    @staticmethod
+    def _render_fence(renderer, tokens, idx, options, env) -> str:
+        token = tokens[idx]
+        language = token.info.strip().split()[0] if token.info.strip() else ''
+        return OfflineRenderer._code_block_html(token.content, language, env.get('code_theme', 'atom-one-dark'))
+
+    @staticmethod
+    def _render_code_block(renderer, tokens, idx, options, env) -> str:
+        return OfflineRenderer._code_block_html(tokens[idx].content, '', env.get('code_theme', 'atom-one-dark'))
+
+    @staticmethod
+    def _code_block_html(code: str, language: str, code_theme: str) -> str:
+        """生成与编辑器一致的代码块结构（Mac 风格头部由代码主题 CSS 的 ::before 生成）"""
+        code = code.rstrip('\n')
+        language_class = f' language-{escape(language)}' if language else ''
+        highlighted = highlight_code(code, language, code_theme)
+        if highlighted is None:
+            highlighted = escape(code, quote=False)
+        return (f'<pre class="custom" data-tool="{DATA_TOOL}">'
+                f'<code class="hljs{language_class}">{highlighted}</code></pre>\n')
+
+    # ------------------------------------------------------------------
+
+    def unsupported_features(self, markdown_content: str) -> List[str]:
+        """
+        检查文档中离线引擎不支持的语法（数学公式、未知 HTML 标签）
+
+        :param markdown_content: Markdown内容
+        :return: 不支持的语法描述列表，为空表示可以离线渲染
+        """
+        features: List[str] = []
+
+        def add(feature: str) -> None:
+            if feature not in features:
+                features.append(feature)
+
+        for token in self.md.parse(markdown_content):
+            if token.type == 'html_block':
+                for tag in _HTML_TAG_PATTERN.findall(token.content):
+                    if tag.lower() not in SUPPORTED_HTML_TAGS:
+                        add(f'HTML 标签 <{tag.lower()}>')
+            elif token.type == 'inline':
+                for child in token.children or []:
+                    if child.type == 'text' and _MATH_PATTERN.search(child.content):
+                        add('数学公式')
+                    elif child.type == 'html_inline':
+                        match = _HTML_TAG_PATTERN.match(child.content)
+                        if match and match.group(1).lower() not in SUPPORTED_HTML_TAGS:
+                            add(f'HTML 标签 <{match.group(1).lower()}>')
+            elif token.type == 'fence' and token.info.strip().lower() in ('math', 'katex', 'latex'):
+                add('数学公式')
+
+        return features
+
+    def render(self,
+               markdown_content: str,
+               theme: str = 'normal',
+               code_theme: str = 'atom-one-dark',
+               mac_style: bool = True,
+               platform: str = 'wechat') -> str:
+        """
+        渲染 Markdown 为带内联样式的 HTML
+
+        :param markdown_content: Markdown内容
+        :param theme: 文章主题
+        :param code_theme: 代码主题
+        :param mac_style: 是否启用 Mac 风格
+        :param platform: 目标平台（知乎、掘金格式由微信格式转换得到）
+        :return: 带内联样式的HTML
+        """
+        env: Dict[str, Any] = {'code_theme': code_theme, 'mac_style': mac_style, 'platform': platform}
+        body = self.md.render(markdown_content, env)
+        html_content = (f'<section id="nice" data-tool="{DATA_TOOL}" data-website="{DATA_WEBSITE}">'
+                        f'{body}</section>')
+
+        html_content = get_theme_inliner(theme, code_theme, mac_style).inline(html_content)
+        return transform_html(html_content, platform)
+
+
+# ============================================================================
+# 结构比较
+# ============================================================================
+
+def _structure_signature(html_content: str, restore_links: bool = False) -> Tuple[List[str], str]:
+    """
+    提取 HTML 的结构签名（元素层级、标签和类名，忽略样式）与归一化文本
+
+    :param html_content: HTML内容
+    :param restore_links: 是否先把微信「外链转脚注」还原为普通链接
+    :return: (结构签名, 归一化文本)
+    """
+    signature: List[str] = []
+    texts: List[str] = []
+
+    def walk(element: HTMLElement, depth: int) -> None:
+        for child in element.children:
+            if isinstance(child, HTMLElement):
+                classes = '.'.join(sorted(child.classes))
+                signature.append(f"{'  ' * depth}{child.tag}{'.' + classes if classes else ''}")
+                walk(child, depth + 1)
+            else:
+                texts.append(child)
+
+    root = parse_html(html_content)
+    if restore_links:
+        restore_link_footnotes(root)
+    walk(root, 0)
+    return signature, ' '.join(''.join(texts).split())
+
+
+def compare_structure(expected: str, actual: str, limit: int = 5, ignore_link_footnotes: bool = False) -> List[str]:
+    """
+    比较两段 HTML 的结构（元素层级、标签、类名和文本内容，不比较内联样式）
+
+    :param expected: 参考 HTML（如编辑器渲染结果）
+    :param actual: 待检查的 HTML（如离线渲染结果）
+    :param limit: 最多返回的差异条数
+    :param ignore_link_footnotes: 是否忽略参考 HTML 中的外链脚注（编辑器的微信格式会把外链转为文末脚注，
+                                  离线引擎保留普通链接，这不算结构差异）
+    :return: 差异描述列表，为空表示结构一致
+    """
+    expected_signature, expected_text = _structure_signature(expected, ignore_link_footnotes)
+    actual_signature, actual_text = _structure_signature(actual)
+
+    differences: List[str] = []
+    matcher = difflib.SequenceMatcher(None, expected_signature, actual_signature, autojunk=False)
+    for opcode, i1, i2, j1, j2 in matcher.get_opcodes():
+        if opcode == 'equal':
+            continue
+        if len(differences) >= limit:
+            break
+        before = ', '.join(s.strip() for s in expected_signature[i1:i2][:3]) or '-'
+        after = ', '.join(s.strip() for s in actual_signature[j1:j2][:3]) or '-'
+        differences.append(f'元素 #{i1}: {before} -> {after}')
+
+    if expected_text != actual_text and len(differences) < limit:
+        position = next((i for i, (a, b) in enumerate(zip(expected_text, actual_text)) if a != b),
+                        min(len(expected_text), len(actual_text)))
+        differences.append(f'文本第 {position} 个字符起不一致: '
+                           f'{expected_text[position:position + 20]!r} -> {actual_text[position:position + 20]!r}')
+
+    return differences
@@ -0,0 +1,113 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：输出文件写入 内容未变化时跳过 原子替换 可选生成 gzip/brotli 压缩副本
+# 文件路径：mdnice/output.py
+
+"""
+输出文件写入
+
+批量重新生成成千上万个输出文件时，大部分内容其实没有变化。每次都重写会带来无谓的磁盘 I/O，
+还会触发下游的 rsync 和 CDN 刷新。这里先比较内容，相同则跳过；需要写入时先写临时文件再原子替换，
+读取方不会看到写了一半的文件。可选为每个文件生成 .gz / .br 压缩副本（同样只在内容变化时更新）。
+
+依赖：brotli 压缩副本需要 pip install brotli
+"""
+
+import os
+import gzip
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Union
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # 生成 .br 副本需要 brotli
+
+# 支持的压缩副本格式 -> 文件后缀
+COMPRESSION_SUFFIXES: Dict[str, str] = {'gzip': '.gz', 'br': '.br'}
+
+# 进程的 umask（导入时读取一次；os.umask 只能通过设置来读取，运行中反复切换会影响其他线程创建的文件）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def check_compression(formats: Iterable[str]) -> None:
+    """
+    检查压缩副本格式是否可用
+
+    :param formats: 压缩副本格式列表（gzip/br）
+    :raises ValueError: 格式不支持
+    :raises ImportError: 需要的库未安装
+    """
+    for fmt in formats:
+        if fmt not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"不支持的压缩格式: {fmt}（可选 {'/'.join(COMPRESSION_SUFFIXES)}）")
+        if fmt == 'br' and brotli is None:
+            raise ImportError("生成 brotli 压缩副本需要 brotli: pip install brotli")
+
+
+def _compress(data: bytes, fmt: str) -> bytes:
+    if fmt == 'gzip':
+        # mtime 固定为 0，相同内容得到相同的压缩结果
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data)
+
+
+def atomic_write_bytes(path: Union[str, Path], data: bytes) -> None:
+    """
+    原子写入文件（同目录临时文件写完后替换目标）
+
+    临时文件创建时权限为 0600，替换前改为目标文件原有的权限（新文件按 umask，与 open() 创建的一致），
+    以免 Web 服务器、rsync 等其他用户的读取方无权读取。
+
+    :param path: 目标路径
+    :param data: 文件内容
+    """
+    path = Path(path)
+    try:
+        mode = path.stat().st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def _same_content(path: Path, data: bytes) -> bool:
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return path.read_bytes() == data
+    except OSError:
+        return False
+
+
+def write_if_changed(path: Union[str, Path], content: str, compression: Iterable[str] = ()) -> bool:
+    """
+    内容变化时原子写入文件，并更新压缩副本
+
+    :param path: 目标路径
+    :param content: 文件内容
+    :param compression: 需要生成的压缩副本格式（gzip/br）
+    :return: 是否写入了主文件（内容未变化时为 False）
+    """
+    path = Path(path)
+    data = content.encode('utf-8')
+    changed = not _same_content(path, data)
+    if changed:
+        atomic_write_bytes(path, data)
+
+    for fmt in compression:
+        sidecar = path.with_name(path.name + COMPRESSION_SUFFIXES[fmt])
+        if changed or not sidecar.exists():
+            atomic_write_bytes(sidecar, _compress(data, fmt))
+    return changed
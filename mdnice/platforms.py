@@ -0,0 +1,189 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：平台格式转换 从一次微信格式渲染结果派生知乎、掘金格式
+# 文件路径：mdnice/platforms.py
+
+"""
+平台格式转换
+
+编辑器中三个平台的复制按钮输出的是同一份渲染结果，差别只在复制前的几步处理：
+公式的表示方式、代码块结构、链接和内联样式。这里用 Python 实现这些差异，
+对一次微信格式的渲染结果做后处理即可得到其他平台的格式，不需要再次渲染或读取剪贴板。
+
+示例：
+    >>> from mdnice.platforms import transform_html
+    >>> zhihu_html = transform_html(wechat_html, 'zhihu')
+"""
+
+from html import escape, unescape
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+from .css_inliner import HTMLElement, parse_html, serialize_html
+
+Transform = Callable[[HTMLElement], None]
+
+
+# ============================================================================
+# 工具函数
+# ============================================================================
+
+def _find_all(root: HTMLElement, predicate: Callable[[HTMLElement], bool]) -> List[HTMLElement]:
+    return [element for element in root.iter() if predicate(element)]
+
+
+def _text_content(element: HTMLElement) -> str:
+    """提取元素的纯文本（已反转义）"""
+    parts: List[str] = []
+
+    def walk(node: HTMLElement) -> None:
+        for child in node.children:
+            if isinstance(child, HTMLElement):
+                walk(child)
+            else:
+                parts.append(child)
+
+    walk(element)
+    return unescape(''.join(parts))
+
+
+def _replace(element: HTMLElement, replacement: List) -> None:
+    """用新的节点列表替换元素"""
+    siblings = element.parent.children
+    index = siblings.index(element)
+    for node in replacement:
+        if isinstance(node, HTMLElement):
+            node.parent = element.parent
+    siblings[index:index + 1] = replacement
+
+
+def _formula_of(element: HTMLElement) -> Optional[str]:
+    formula = element.attrs.get('data-formula')
+    return formula.strip() if formula else None
+
+
+def _is_equation(element: HTMLElement, kind: str) -> bool:
+    return f'{kind}-equation' in element.classes and _formula_of(element) is not None
+
+
+# ============================================================================
+# 转换步骤
+# ============================================================================
+
+def _formula_to_image(build_image: Callable[[str], HTMLElement]) -> Transform:
+    """把 MathJax 公式（inline-equation / block-equation，公式源码在 data-formula 上）替换为平台的公式图片"""
+
+    def transform(root: HTMLElement) -> None:
+        for element in _find_all(root, lambda e: _is_equation(e, 'block')):
+            paragraph = HTMLElement('p', {})
+            image = build_image(_formula_of(element))
+            image.parent = paragraph
+            paragraph.children.append(image)
+            _replace(element, [paragraph])
+        for element in _find_all(root, lambda e: _is_equation(e, 'inline')):
+            _replace(element, [build_image(_formula_of(element))])
+
+    return transform
+
+
+def _zhihu_formula(formula: str) -> HTMLElement:
+    # 知乎编辑器识别 data-eeimg 图片并按 alt 中的 TeX 重新渲染
+    return HTMLElement('img', {'class': 'Formula-image', 'data-eeimg': 'true', 'src': '', 'alt': formula})
+
+
+def _juejin_formula(formula: str) -> HTMLElement:
+    return HTMLElement('img', {'class': 'equation', 'src': f'https://juejin.cn/equation?tex={quote(formula)}',
+                               'alt': formula})
+
+
+def restore_link_footnotes(root: HTMLElement) -> None:
+    """
+    还原微信「外链转脚注」：把 footnote-word + footnote-ref 恢复为普通链接，并移除文末参考资料
+
+    脚注条目格式为 <span class="footnote-item"><span class="footnote-num">[n] </span><p>标题: <em>URL</em></p></span>
+    """
+    urls: Dict[str, str] = {}
+    link_items: List[HTMLElement] = []
+    for item in _find_all(root, lambda e: 'footnote-item' in e.classes):
+        number = next((_text_content(e) for e in item.iter() if 'footnote-num' in e.classes), '').strip()
+        url = next((_text_content(e) for e in item.iter() if e.tag == 'em'), '').strip()
+        if number and url.startswith(('http://', 'https://')):
+            urls[number] = url
+            link_items.append(item)
+    if not urls:
+        return
+
+    for word in _find_all(root, lambda e: 'footnote-word' in e.classes):
+        siblings = word.parent.children
+        index = siblings.index(word)
+        ref = next((node for node in siblings[index + 1:] if isinstance(node, HTMLElement)), None)
+        if ref is None or 'footnote-ref' not in ref.classes or _text_content(ref).strip() not in urls:
+            continue
+        link = HTMLElement('a', {'href': urls[_text_content(ref).strip()]})
+        link.children = list(word.children)
+        siblings.remove(ref)
+        _replace(word, [link])
+
+    # 移除已还原的脚注条目；参考资料区为空时连同标题一起移除
+    for item in link_items:
+        item.parent.children.remove(item)
+    for section in _find_all(root, lambda e: 'footnotes' in e.classes):
+        if any('footnote-item' in e.classes for e in section.iter()):
+            continue
+        siblings = section.parent.children
+        index = siblings.index(section)
+        heading = next((node for node in reversed(siblings[:index]) if isinstance(node, HTMLElement)), None)
+        if heading is not None and 'footnotes-sep' in heading.classes:
+            siblings.remove(heading)
+        siblings.remove(section)
+
+
+def _plain_code_blocks(root: HTMLElement) -> None:
+    """代码块改为 <pre lang="语言"><code>纯文本</code></pre>（知乎只识别这种结构，会自行高亮）"""
+    for pre in _find_all(root, lambda e: e.tag == 'pre'):
+        code = next((child for child in pre.element_children() if child.tag == 'code'), None)
+        if code is None:
+            continue
+        language = next((c[len('language-'):] for c in code.classes if c.startswith('language-')), '')
+        new_code = HTMLElement('code', {})
+        new_code.children.append(escape(_text_content(code), quote=False))
+        new_pre = HTMLElement('pre', {'lang': language} if language else {})
+        new_code.parent = new_pre
+        new_pre.children.append(new_code)
+        _replace(pre, [new_pre])
+
+
+def _strip_styles(root: HTMLElement) -> None:
+    """移除内联样式（知乎编辑器会丢弃 style，保留只会增大粘贴内容）"""
+    for element in root.iter():
+        element.attrs.pop('style', None)
+
+
+# 各平台的转换步骤（按顺序执行；微信为基础格式，不做处理）
+PLATFORM_TRANSFORMS: Dict[str, List[Transform]] = {
+    'wechat': [],
+    'zhihu': [_formula_to_image(_zhihu_formula), restore_link_footnotes, _plain_code_blocks, _strip_styles],
+    'juejin': [_formula_to_image(_juejin_formula), restore_link_footnotes],
+}
+
+
+def transform_html(wechat_html: str, platform: str) -> str:
+    """
+    从微信格式的 HTML 派生目标平台格式
+
+    :param wechat_html: 微信格式的 HTML（编辑器「复制到微信」或离线渲染的结果）
+    :param platform: 目标平台（wechat/zhihu/juejin）
+    :return: 目标平台格式的 HTML
+    """
+    if platform not in PLATFORM_TRANSFORMS:
+        raise ValueError(f"不支持的平台: {platform}")
+
+    transforms = PLATFORM_TRANSFORMS[platform]
+    if not transforms:
+        return wechat_html
+
+    root = parse_html(wechat_html)
+    for transform in transforms:
+        transform(root)
+    return serialize_html(root)
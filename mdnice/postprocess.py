@@ -0,0 +1,185 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：HTML 后处理流水线 一次扫描对每个标签依次应用内置规则和自定义规则
+# 文件路径：mdnice/postprocess.py
+
+"""
+HTML 后处理流水线
+
+渲染结果在保存或返回前通常还需要一些处理：去掉编辑器标记、替换图片地址、删除空 span 等。
+这里用一个预编译的正则按顺序扫描一次 HTML，每个开始标签解析为 Tag 后交给适用于该标签的规则，
+文本和未修改的标签原样输出。规则按标签名预先分组，耗时只与 HTML 长度成正比，
+与启用的规则数量基本无关。
+
+规则是接收 Tag 的函数，可以修改 tag.attrs，或设置 tag.remove_if_empty（元素没有内容时整体删除）。
+用 rule(*tags) 装饰可以限定规则只处理指定标签；rule(markers=...) 限定只处理属性原文中包含
+指定子串的标签，其他标签不解析属性、直接跳过。
+
+示例：
+    >>> from mdnice.postprocess import PostProcessor, rewrite_image_urls, strip_editor_marks
+    >>> processor = PostProcessor([strip_editor_marks, rewrite_image_urls(lambda url: url.replace('http:', 'https:'))])
+    >>> html = processor.process(html)
+"""
+
+import re
+from html import escape, unescape
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+_TAG_PATTERN = re.compile(
+    r'<!--.*?-->'
+    r'|<([a-zA-Z][a-zA-Z0-9:-]*)((?:\s+[^\s"\'>/=]+(?:\s*=\s*(?:"[^"]*"|\'[^\']*\'|[^\s"\'>]+))?)*)\s*(/?)>',
+    re.S)
+_ATTR_PATTERN = re.compile(r'([^\s"\'>/=]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+)))?')
+
+
+class Tag:
+    """后处理中的开始标签（属性值保持 HTML 转义后的原文）"""
+
+    __slots__ = ('name', 'attrs', 'remove_if_empty')
+
+    def __init__(self, name: str, attrs: Dict[str, Optional[str]]) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.remove_if_empty = False
+
+
+Rule = Callable[[Tag], None]
+
+
+def rule(*tags: str, markers: Iterable[str] = ()) -> Callable[[Rule], Rule]:
+    """
+    限定规则只处理指定标签
+
+    :param tags: 标签名（小写），不指定时处理所有标签
+    :param markers: 属性原文中必须包含其中之一的子串（区分大小写），不指定时不限制
+    :return: 装饰器
+    """
+
+    def decorate(func: Rule) -> Rule:
+        func.tags = frozenset(tags) if tags else None
+        func.markers = tuple(markers)
+        return func
+
+    return decorate
+
+
+def _parse_attrs(source: str) -> Dict[str, Optional[str]]:
+    attrs: Dict[str, Optional[str]] = {}
+    for match in _ATTR_PATTERN.finditer(source):
+        value = next((v for v in match.group(2, 3, 4) if v is not None), None)
+        attrs.setdefault(match.group(1).lower(), value)
+    return attrs
+
+
+def _serialize_tag(tag: Tag, self_closing: bool) -> str:
+    parts = [tag.name]
+    for name, value in tag.attrs.items():
+        parts.append(name if value is None else f'{name}="{value.replace(chr(34), "&quot;")}"')
+    return f"<{' '.join(parts)}{' /' if self_closing else ''}>"
+
+
+class PostProcessor:
+    """HTML 后处理流水线"""
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        """
+        初始化流水线
+
+        :param rules: 按顺序执行的规则列表
+        """
+        self.rules: List[Rule] = list(rules)
+        self._by_tag: Dict[str, List[Tuple[Rule, Tuple[str, ...]]]] = {}
+
+    def _rules_for(self, name: str) -> List[Tuple[Rule, Tuple[str, ...]]]:
+        """取出适用于标签的规则及其属性预检子串（保持原有顺序，按标签名缓存）"""
+        rules = self._by_tag.get(name)
+        if rules is None:
+            rules = self._by_tag[name] = [
+                (r, getattr(r, 'markers', ())) for r in self.rules
+                if getattr(r, 'tags', None) is None or name in r.tags]
+        return rules
+
+    def process(self, html_content: str) -> str:
+        """
+        对 HTML 执行全部规则
+
+        :param html_content: HTML
+        :return: 处理后的HTML
+        """
+        if not self.rules:
+            return html_content
+
+        output: List[str] = []
+        position = 0
+        for match in _TAG_PATTERN.finditer(html_content):
+            name = match.group(1)
+            if name is None:
+                continue
+            name = name.lower()
+            rules = self._rules_for(name)
+            if not rules:
+                continue
+
+            source = match.group(2)
+            tag = None
+            for current, markers in rules:
+                if markers and not any(marker in source for marker in markers):
+                    continue
+                if tag is None:
+                    tag = Tag(name, _parse_attrs(source))
+                    original = dict(tag.attrs)
+                current(tag)
+            if tag is None:
+                continue
+
+            closing = f'</{name}>'
+            if tag.remove_if_empty and html_content.startswith(closing, match.end()):
+                output.append(html_content[position:match.start()])
+                position = match.end() + len(closing)
+            elif tag.attrs != original or tag.name != name:
+                output.append(html_content[position:match.start()])
+                output.append(_serialize_tag(tag, bool(match.group(3))))
+                position = match.end()
+
+        if position == 0:
+            return html_content
+        output.append(html_content[position:])
+        return ''.join(output)
+
+
+# ============================================================================
+# 内置规则
+# ============================================================================
+
+@rule(markers=('data-tool', 'data-website'))
+def strip_editor_marks(tag: Tag) -> None:
+    """移除编辑器标记（data-tool="mdnice编辑器"、data-website）"""
+    if tag.attrs.get('data-tool') == 'mdnice编辑器':
+        del tag.attrs['data-tool']
+    tag.attrs.pop('data-website', None)
+
+
+@rule('span')
+def drop_empty_spans(tag: Tag) -> None:
+    """删除没有内容且不可见或没有样式的 span（保留带背景等样式的装饰元素，例如 Mac 风格圆点）"""
+    style = (tag.attrs.get('style') or '').replace(' ', '').lower()
+    if not style or 'display:none' in style:
+        tag.remove_if_empty = True
+
+
+def rewrite_image_urls(rewrite: Callable[[str], str]) -> Rule:
+    """
+    创建替换图片地址的规则
+
+    :param rewrite: 接收原地址、返回新地址的函数（Data URL 不处理）
+    :return: 规则
+    """
+
+    @rule('img')
+    def rewrite_image(tag: Tag) -> None:
+        src = tag.attrs.get('src')
+        if src and not src.startswith('data:'):
+            tag.attrs['src'] = escape(rewrite(unescape(src)))
+
+    return rewrite_image
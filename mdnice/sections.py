@@ -0,0 +1,143 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：分段渲染 超长文档按标题拆分后在多个页面并行渲染 再按顺序拼接
+# 文件路径：mdnice/sections.py
+
+"""
+分段渲染
+
+超长文档在一个页面中渲染时，CodeMirror 和预览区都在同一个页面线程中工作，容易超时。
+这里按顶层标题把文档拆成长度接近的若干段，各段在独立页面中并行渲染后按顺序拼接：
+
+- 引用式链接定义追加到每一段末尾，任何一段中的 [text][id] 都能解析
+- 微信格式的外链脚注（文末「参考资料」）按段依次重新编号，合并为一个参考资料区放在文末
+- 包含 Markdown 脚注（[^1]）的文档不拆分（脚注定义和引用可能分散在不同段中）
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from .css_inliner import HTMLElement, parse_html, serialize_html
+from .incremental import _block_parser
+
+_NUMBER_PATTERN = re.compile(r'\d+')
+
+
+def _reference_definitions(references: Dict[str, Dict[str, Any]]) -> str:
+    """把解析得到的引用式链接定义还原为 Markdown"""
+    lines = []
+    for label, reference in references.items():
+        title = (reference.get('title') or '').replace('\\', '\\\\').replace('"', '\\"')
+        title_part = f' "{title}"' if title else ''
+        lines.append(f"[{label}]: <{reference['href']}>{title_part}")
+    return '\n'.join(lines)
+
+
+def split_sections(markdown_content: str, parts: int) -> List[str]:
+    """
+    按顶层标题把文档拆成长度接近的若干段
+
+    :param markdown_content: Markdown内容
+    :param parts: 最多拆成的段数
+    :return: 各段 Markdown；不能拆分（标题太少或包含脚注）时只有一段
+    """
+    env: Dict[str, Any] = {}
+    tokens = _block_parser().parse(markdown_content, env)
+    if parts < 2 or (env.get('footnotes') or {}).get('refs'):
+        return [markdown_content]
+
+    lines = markdown_content.splitlines(keepends=True)
+    cuts = sorted({token.map[0] for token in tokens
+                   if token.type == 'heading_open' and token.level == 0 and token.map and token.map[0] > 0})
+    if not cuts:
+        return [markdown_content]
+
+    # 在标题处切分，每段累计长度达到总长度的 k/parts 时结束
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    target = offsets[-1] / parts
+    boundaries = [0]
+    for cut in cuts:
+        if len(boundaries) < parts and offsets[cut] >= target * len(boundaries):
+            boundaries.append(cut)
+    boundaries.append(len(lines))
+
+    sections = [''.join(lines[start:end]) for start, end in zip(boundaries, boundaries[1:])]
+    definitions = _reference_definitions(env.get('references') or {})
+    if definitions:
+        sections = [f'{section.rstrip()}\n\n{definitions}\n' for section in sections]
+    return sections
+
+
+def _renumber(element: HTMLElement, offset: int) -> None:
+    """把元素内文本中的编号加上偏移量"""
+    for index, child in enumerate(element.children):
+        if isinstance(child, HTMLElement):
+            _renumber(child, offset)
+        else:
+            element.children[index] = _NUMBER_PATTERN.sub(lambda m: str(int(m.group()) + offset), child)
+
+
+def _detach(element: HTMLElement) -> HTMLElement:
+    element.parent.children.remove(element)
+    element.parent = None
+    return element
+
+
+def stitch_sections(htmls: List[str]) -> str:
+    """
+    按顺序拼接各段的渲染结果
+
+    :param htmls: 各段的 HTML（每段都是 section#nice 包裹的完整渲染结果）
+    :return: 拼接后的 HTML
+    :raises ValueError: 某段缺少 section#nice 时抛出
+    """
+    document: Optional[HTMLElement] = None
+    base: Optional[HTMLElement] = None
+    separator: Optional[HTMLElement] = None
+    footnotes: Optional[HTMLElement] = None
+    items: List[HTMLElement] = []
+
+    for html_content in htmls:
+        root = parse_html(html_content)
+        nice = next((e for e in root.iter() if e.tag == 'section' and e.attrs.get('id') == 'nice'), None)
+        if nice is None:
+            raise ValueError("渲染结果缺少 section#nice")
+
+        # 外链脚注：引用和条目编号顺延，参考资料区先取下，最后统一放到文末
+        offset = len(items)
+        for element in nice.iter():
+            if 'footnote-ref' in element.classes or 'footnote-num' in element.classes:
+                _renumber(element, offset)
+        for section in [e for e in nice.iter() if 'footnotes' in e.classes]:
+            siblings = section.parent.children
+            index = siblings.index(section)
+            heading = next((node for node in reversed(siblings[:index]) if isinstance(node, HTMLElement)), None)
+            if heading is not None and 'footnotes-sep' in heading.classes:
+                heading = _detach(heading)
+                separator = separator or heading
+            items.extend(e for e in section.iter() if 'footnote-item' in e.classes)
+            section = _detach(section)
+            footnotes = footnotes or section
+
+        if base is None:
+            document, base = root, nice
+            continue
+        for node in nice.children:
+            if isinstance(node, HTMLElement):
+                node.parent = base
+            base.children.append(node)
+
+    if footnotes is not None:
+        footnotes.children = []
+        for item in items:
+            item.parent = footnotes
+            footnotes.children.append(item)
+        for node in (separator, footnotes):
+            if node is not None:
+                node.parent = base
+                base.children.append(node)
+
+    return serialize_html(document)
@@ -0,0 +1,236 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：输出目标 目录、流式 zip/tar 归档、JSON Lines 文件 转换结果完成一项写入一项
+# 文件路径：mdnice/sinks.py
+
+"""
+输出目标
+
+convert(output_dir=...) 传入目录时每篇文章保存为一个小 HTML 文件，几万篇文章会占用大量 inode，
+上传时也要逐个传输。这里把输出抽象为 OutputSink，除目录外还可以写入流式归档或 JSON Lines 文件，
+每转换完一项就追加写入，不在内存中累积。
+
+- DirectorySink: 目录（与传入路径相同，内容未变化时跳过写入）
+- ArchiveSink: zip / tar / tar.gz 归档，wrap_full_html 时页面样式只写入一次 style.css
+- JSONLinesSink: 每行一个 {"name", "platform", "source", "html"} 记录
+
+输出目标由调用方创建和关闭，可以在多次 convert 之间共用：
+
+示例：
+    >>> with ArchiveSink('output/articles.zip') as sink:
+    ...     converter.convert(files, output_dir=sink, engine='offline')
+"""
+
+import io
+import json
+import time
+import tarfile
+import zipfile
+import hashlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, IO, Iterable, Optional, Union
+
+from .output import check_compression, write_if_changed
+
+
+class OutputSink(ABC):
+    """输出目标基类（子类实现 _write）"""
+
+    # 共用样式表在输出中的名称（None 表示每个完整 HTML 内联自己的样式）
+    shared_stylesheet: Optional[str] = None
+
+    def __init__(self) -> None:
+        # 写入统计（写入、跳过的项数）
+        self.stats: Dict[str, int] = {'written': 0, 'skipped': 0}
+        self._stylesheet_written = False
+
+    def link_stylesheet(self, css: str) -> Optional[str]:
+        """
+        写入共用样式表（只写一次）
+
+        :param css: 样式表内容
+        :return: 样式表的引用地址；不共用样式表时返回 None
+        """
+        if self.shared_stylesheet is None:
+            return None
+        if not self._stylesheet_written:
+            self._write(self.shared_stylesheet, css.encode('utf-8'), None)
+            self.stats['written'] -= 1  # 样式表不计入写入项数
+            self._stylesheet_written = True
+        return self.shared_stylesheet
+
+    def write(self, name: str, content: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """
+        写入一项输出
+
+        :param name: 文件名
+        :param content: HTML内容
+        :param metadata: 附加信息（platform、source 等，JSON Lines 中原样保存）
+        :return: 写入位置（文件路径或归档内的名称）
+        """
+        return self._write(name, content.encode('utf-8'), metadata)
+
+    @abstractmethod
+    def _write(self, name: str, data: bytes, metadata: Optional[Dict[str, Any]]) -> str:
+        """
+        写入一项输出
+
+        :param name: 文件名
+        :param data: UTF-8 编码的内容
+        :param metadata: 附加信息
+        :return: 写入位置
+        """
+
+    def close(self) -> None:
+        """关闭输出目标"""
+
+    def __enter__(self) -> 'OutputSink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class DirectorySink(OutputSink):
+    """目录输出（内容未变化时跳过写入，写入时原子替换）"""
+
+    def __init__(self, directory: Union[str, Path], compression: Iterable[str] = ()) -> None:
+        """
+        初始化目录输出
+
+        :param directory: 输出目录（不存在时创建）
+        :param compression: 同时生成的压缩副本格式（gzip/br）
+        """
+        super().__init__()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compression = list(compression)
+        check_compression(self.compression)
+
+    def _write(self, name: str, data: bytes, metadata: Optional[Dict[str, Any]]) -> str:
+        path = self.directory / name
+        if write_if_changed(path, data.decode('utf-8'), self.compression):
+            self.stats['written'] += 1
+        else:
+            self.stats['skipped'] += 1
+        return str(path)
+
+
+class ArchiveSink(OutputSink):
+    """流式归档输出（zip、tar、tar.gz）"""
+
+    shared_stylesheet = 'style.css'
+
+    FORMATS = ('zip', 'tar', 'tar.gz')
+
+    def __init__(self, target: Union[str, Path, IO[bytes]], archive_format: Optional[str] = None) -> None:
+        """
+        初始化归档输出
+
+        :param target: 归档文件路径或可写的二进制文件对象（tar 格式支持不可 seek 的流）
+        :param archive_format: 归档格式（zip/tar/tar.gz），默认按文件后缀判断
+        """
+        super().__init__()
+        if archive_format is None:
+            name = str(target if isinstance(target, (str, Path)) else getattr(target, 'name', '')).lower()
+            if name.endswith('.zip'):
+                archive_format = 'zip'
+            elif name.endswith(('.tar.gz', '.tgz')):
+                archive_format = 'tar.gz'
+            elif name.endswith('.tar'):
+                archive_format = 'tar'
+            else:
+                raise ValueError("无法从文件名判断归档格式，请指定 archive_format（zip/tar/tar.gz）")
+        if archive_format not in self.FORMATS:
+            raise ValueError(f"不支持的归档格式: {archive_format}")
+
+        if isinstance(target, (str, Path)):
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+        self.archive_format = archive_format
+        self._mtime = time.time()
+        # 已写入的名称 -> 内容哈希（同名同内容跳过，同名不同内容改名）
+        self._entries: Dict[str, str] = {}
+
+        if archive_format == 'zip':
+            self._zip: Optional[zipfile.ZipFile] = zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED)
+            self._tar: Optional[tarfile.TarFile] = None
+        else:
+            mode = 'w|gz' if archive_format == 'tar.gz' else 'w|'
+            if isinstance(target, (str, Path)):
+                self._tar = tarfile.open(str(target), mode)
+            else:
+                self._tar = tarfile.open(fileobj=target, mode=mode)
+            self._zip = None
+
+    def _unique_name(self, name: str, digest: str) -> Optional[str]:
+        """取得不冲突的名称（同名同内容返回 None）"""
+        stem, dot, suffix = name.rpartition('.') if '.' in name else (name, '', '')
+        candidate, index = name, 1
+        while candidate in self._entries:
+            if self._entries[candidate] == digest:
+                return None
+            index += 1
+            candidate = f'{stem}-{index}{dot}{suffix}'
+        return candidate
+
+    def _write(self, name: str, data: bytes, metadata: Optional[Dict[str, Any]]) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        member = self._unique_name(name, digest)
+        if member is None:
+            self.stats['skipped'] += 1
+            return name
+        self._entries[member] = digest
+
+        if self._zip is not None:
+            info = zipfile.ZipInfo(member, time.localtime(self._mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            self._zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(member)
+            info.size = len(data)
+            info.mtime = int(self._mtime)
+            self._tar.addfile(info, io.BytesIO(data))
+        self.stats['written'] += 1
+        return member
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+
+
+class JSONLinesSink(OutputSink):
+    """JSON Lines 输出（每项一行，写入后立即 flush）"""
+
+    def __init__(self, target: Union[str, Path, IO[str]], append: bool = False) -> None:
+        """
+        初始化 JSON Lines 输出
+
+        :param target: 文件路径或可写的文本文件对象
+        :param append: 是否追加到已有文件（默认覆盖，重复运行同一批转换不会产生重复记录）
+        """
+        super().__init__()
+        if isinstance(target, (str, Path)):
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+            self._file: Optional[IO[str]] = open(target, 'a' if append else 'w', encoding='utf-8')
+            self._owns_file = True
+        else:
+            self._file = target
+            self._owns_file = False
+
+    def _write(self, name: str, data: bytes, metadata: Optional[Dict[str, Any]]) -> str:
+        record = {'name': name, **(metadata or {}), 'html': data.decode('utf-8')}
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.stats['written'] += 1
+        return name
+
+    def close(self) -> None:
+        if self._file is not None and self._owns_file:
+            self._file.close()
+        self._file = None
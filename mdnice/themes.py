@@ -0,0 +1,605 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：离线渲染使用的主题样式
+# 文件路径：mdnice/themes.py
+
+"""
+离线渲染使用的主题样式
+
+编辑器的主题 CSS 只存在于远程页面中。harvest() 会驱动一次编辑器，把所有主题、
+代码主题和 Mac 风格样式保存为带版本号和校验和的主题包（theme_pack.json）；
+主题包存在时离线渲染直接使用其中的 CSS。没有主题包时使用内置的基础排版规则，
+并按各主题的主色生成近似样式。
+
+主题包默认保存在用户缓存目录（~/.cache/mdnice，Windows 为 %LOCALAPPDATA%\\mdnice），
+不写入安装目录：site-packages 可能只读，升级时包目录也会被清空。
+"""
+
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from functools import lru_cache
+from typing import Dict, Optional, Union, Any
+
+from .output import atomic_write_bytes
+
+# mdnice 编辑器标记
+DATA_TOOL = 'mdnice编辑器'
+DATA_WEBSITE = 'https://www.mdnice.com'
+
+
+def _user_cache_dir() -> Path:
+    """用户缓存目录（遵循 XDG_CACHE_HOME，Windows 使用 LOCALAPPDATA）"""
+    base = os.environ.get('LOCALAPPDATA') if os.name == 'nt' else os.environ.get('XDG_CACHE_HOME')
+    return Path(base) if base else Path.home() / '.cache'
+
+
+# 主题包默认位置（用户缓存目录）、随包分发的主题包位置（只读，找不到用户主题包时使用）及格式版本
+THEME_PACK_PATH = _user_cache_dir() / 'mdnice' / 'theme_pack.json'
+BUNDLED_THEME_PACK_PATH = Path(__file__).parent / 'theme_pack.json'
+THEME_PACK_FORMAT = 1
+
+# 编辑器页面中各类样式所在的 <style> 元素 ID
+EDITOR_STYLE_IDS: Dict[str, str] = {
+    'basic': 'basic-theme',
+    'theme': 'markdown-theme',
+    'code': 'code-theme',
+    'font': 'font-theme',
+}
+
+# 基础排版样式（所有主题共用）
+BASIC_THEME_CSS = """
+#nice {
+  line-height: 1.5;
+  font-family: Optima-Regular, Optima, PingFangSC-light, PingFangTC-light, 'PingFang SC', Cambria, Cochin, Georgia, Times, 'Times New Roman', serif;
+  font-size: 16px;
+  color: #000000;
+  padding: 0 10px;
+  word-spacing: 0px;
+  letter-spacing: 0px;
+  word-break: break-word;
+  word-wrap: break-word;
+  text-align: left;
+}
+#nice p {
+  font-size: 16px;
+  line-height: 26px;
+  color: #000000;
+  margin: 0;
+  padding: 8px 0;
+}
+#nice h1, #nice h2, #nice h3, #nice h4, #nice h5, #nice h6 {
+  margin-top: 30px;
+  margin-bottom: 15px;
+  padding: 0px;
+  font-weight: bold;
+  color: #000000;
+}
+#nice h1 { font-size: 24px; }
+#nice h2 { font-size: 22px; }
+#nice h3 { font-size: 20px; }
+#nice h4 { font-size: 18px; }
+#nice h5 { font-size: 16px; }
+#nice h6 { font-size: 16px; }
+#nice h1 .prefix, #nice h2 .prefix, #nice h3 .prefix, #nice h4 .prefix, #nice h5 .prefix, #nice h6 .prefix {
+  display: none;
+}
+#nice h1 .suffix, #nice h2 .suffix, #nice h3 .suffix, #nice h4 .suffix, #nice h5 .suffix, #nice h6 .suffix {
+  display: none;
+}
+#nice ul, #nice ol {
+  margin-top: 8px;
+  margin-bottom: 8px;
+  padding-left: 25px;
+  color: #000000;
+}
+#nice ul { list-style-type: disc; }
+#nice ul ul { list-style-type: square; }
+#nice ol { list-style-type: decimal; }
+#nice li section {
+  margin-top: 5px;
+  margin-bottom: 5px;
+  line-height: 26px;
+  text-align: left;
+  color: rgb(1, 1, 1);
+  font-weight: 500;
+}
+#nice blockquote {
+  display: block;
+  font-size: 0.9em;
+  overflow: auto;
+  overflow-scrolling: touch;
+  border-left: 3px solid rgba(0, 0, 0, 0.4);
+  background: rgba(0, 0, 0, 0.05);
+  color: #6a737d;
+  padding-top: 10px;
+  padding-bottom: 10px;
+  padding-left: 20px;
+  padding-right: 10px;
+  margin-bottom: 20px;
+  margin-top: 20px;
+}
+#nice blockquote p {
+  margin: 0px;
+  color: #000000;
+  line-height: 26px;
+}
+#nice a {
+  text-decoration: none;
+  color: #1e6bb8;
+  word-wrap: break-word;
+  font-weight: bold;
+  border-bottom: 1px solid #1e6bb8;
+}
+#nice strong {
+  font-weight: bold;
+  color: #000000;
+}
+#nice em {
+  font-style: italic;
+  color: #000000;
+}
+#nice em strong, #nice strong em {
+  font-weight: bold;
+  font-style: italic;
+  color: #000000;
+}
+#nice del {
+  font-style: italic;
+  color: #000000;
+}
+#nice hr {
+  height: 1px;
+  margin: 0;
+  margin-top: 10px;
+  margin-bottom: 10px;
+  border: none;
+  border-top: 1px solid black;
+}
+#nice p code, #nice li code, #nice td code, #nice th code, #nice blockquote code {
+  font-size: 14px;
+  word-wrap: break-word;
+  padding: 2px 4px;
+  border-radius: 4px;
+  margin: 0 2px;
+  color: #1e6bb8;
+  background-color: rgba(27, 31, 35, 0.05);
+  font-family: Operator Mono, Consolas, Monaco, Menlo, monospace;
+  word-break: break-all;
+}
+#nice pre {
+  margin-top: 10px;
+  margin-bottom: 10px;
+}
+#nice figure {
+  margin: 0;
+  margin-top: 10px;
+  margin-bottom: 10px;
+  display: flex;
+  flex-direction: column;
+  justify-content: center;
+  align-items: center;
+}
+#nice img {
+  display: block;
+  margin: 0 auto;
+  max-width: 100%;
+}
+#nice figcaption {
+  margin-top: 5px;
+  text-align: center;
+  color: #888;
+  font-size: 14px;
+}
+#nice .table-container {
+  overflow-x: auto;
+}
+#nice table {
+  display: table;
+  text-align: left;
+  border-collapse: collapse;
+  margin: 10px 0;
+}
+#nice tbody {
+  border: 0;
+}
+#nice table tr {
+  border: 0;
+  border-top: 1px solid #ccc;
+  background-color: white;
+}
+#nice table tr th {
+  font-size: 16px;
+  border: 1px solid #ccc;
+  padding: 5px 10px;
+  text-align: left;
+  font-weight: bold;
+  background-color: #f0f0f0;
+}
+#nice table tr td {
+  font-size: 16px;
+  border: 1px solid #ccc;
+  padding: 5px 10px;
+  text-align: left;
+}
+#nice .footnote-ref {
+  font-weight: bold;
+  color: #1e6bb8;
+}
+#nice .footnotes-sep {
+  border-top: 1px dashed #ccc;
+  margin-top: 30px;
+}
+#nice .footnotes {
+  font-size: 14px;
+  color: #595959;
+}
+#nice .footnote-item p {
+  font-size: 14px;
+  line-height: 22px;
+  color: #595959;
+}
+"""
+
+# 主题主色（近似编辑器中各主题的强调色，用于生成离线样式）
+THEME_ACCENTS: Dict[str, str] = {
+    'normal': '#1e6bb8',
+    'shanchui': '#ef9f00',
+    'rose': '#b85a9b',
+    'fullStackBlue': '#3f69ec',
+    'nightPurple': '#8064a9',
+    'cuteGreen': '#35b378',
+    'extremeBlack': '#000000',
+    'orangeHeart': '#ef7060',
+    'ink': '#2b2b2b',
+    'purple': '#773098',
+    'green': '#349d56',
+    'cyan': '#2bb3ae',
+    'wechatFormat': '#07c160',
+    'blueCyan': '#3db8d3',
+    'blueMountain': '#2196f3',
+    'geekBlack': '#555555',
+    'red': '#d9534f',
+    'blue': '#35a7e7',
+    'scienceBlue': '#0f4c81',
+    'simple': '#3f3f3f',
+}
+
+# 按主色生成的主题样式模板
+_ACCENT_THEME_TEMPLATE = """
+#nice h1 .content, #nice h2 .content {
+  color: {accent};
+}
+#nice h2 {
+  border-bottom: 2px solid {accent};
+  font-size: 1.3em;
+}
+#nice h2 .content {
+  display: inline-block;
+  font-weight: bold;
+  padding-bottom: 2px;
+}
+#nice h3 .content {
+  border-left: 4px solid {accent};
+  padding-left: 8px;
+}
+#nice blockquote {
+  border-left-color: {accent};
+}
+#nice a {
+  color: {accent};
+  border-bottom: 1px solid {accent};
+}
+#nice strong {
+  color: {accent};
+}
+#nice p code, #nice li code, #nice td code, #nice th code, #nice blockquote code {
+  color: {accent};
+}
+#nice .footnote-ref {
+  color: {accent};
+}
+"""
+
+# 代码主题的底色和前景色（与编辑器代码主题一致）
+CODE_THEME_COLORS: Dict[str, Dict[str, str]] = {
+    'wechat': {'background': '#f7f7f7', 'color': '#383a42'},
+    'atom-one-dark': {'background': '#282c34', 'color': '#abb2bf'},
+    'atom-one-light': {'background': '#fafafa', 'color': '#383a42'},
+    'monokai': {'background': '#272822', 'color': '#dddddd'},
+    'github': {'background': '#f8f8f8', 'color': '#333333'},
+    'vs2015': {'background': '#1e1e1e', 'color': '#dcdcdc'},
+    'xcode': {'background': '#ffffff', 'color': '#000000'},
+}
+
+# 代码高亮配色：highlight.js 类名（去掉 hljs- 前缀） -> 内联声明，与编辑器各代码主题一致
+CODE_THEME_TOKEN_STYLES: Dict[str, Dict[str, str]] = {
+    'wechat': {
+        'comment': 'color: #afafaf; font-style: italic;', 'keyword': 'color: #d73a49;',
+        'literal': 'color: #005cc5;', 'built_in': 'color: #e36209;', 'type': 'color: #d73a49;',
+        'title': 'color: #6f42c1;', 'name': 'color: #22863a;', 'attr': 'color: #005cc5;',
+        'string': 'color: #032f62;', 'number': 'color: #005cc5;', 'meta': 'color: #6a737d;',
+        'variable': 'color: #e36209;', 'addition': 'color: #22863a; background: #f0fff4;',
+        'deletion': 'color: #b31d28; background: #ffeef0;', 'section': 'color: #005cc5; font-weight: bold;',
+    },
+    'atom-one-dark': {
+        'comment': 'color: #5c6370; font-style: italic;', 'keyword': 'color: #c678dd;',
+        'literal': 'color: #56b6c2;', 'built_in': 'color: #e6c07b;', 'type': 'color: #e6c07b;',
+        'title': 'color: #61aeee;', 'name': 'color: #e06c75;', 'attr': 'color: #d19a66;',
+        'string': 'color: #98c379;', 'number': 'color: #d19a66;', 'meta': 'color: #61aeee;',
+        'variable': 'color: #d19a66;', 'addition': 'color: #98c379;',
+        'deletion': 'color: #e06c75;', 'section': 'color: #e06c75;',
+    },
+    'atom-one-light': {
+        'comment': 'color: #a0a1a7; font-style: italic;', 'keyword': 'color: #a626a4;',
+        'literal': 'color: #0184bb;', 'built_in': 'color: #c18401;', 'type': 'color: #986801;',
+        'title': 'color: #4078f2;', 'name': 'color: #e45649;', 'attr': 'color: #986801;',
+        'string': 'color: #50a14f;', 'number': 'color: #986801;', 'meta': 'color: #4078f2;',
+        'variable': 'color: #986801;', 'addition': 'color: #50a14f;',
+        'deletion': 'color: #e45649;', 'section': 'color: #e45649;',
+    },
+    'monokai': {
+        'comment': 'color: #75715e;', 'keyword': 'color: #f92672; font-weight: bold;',
+        'literal': 'color: #f92672; font-weight: bold;', 'built_in': 'color: #a6e22e;', 'type': 'color: #a6e22e;',
+        'title': 'color: #a6e22e;', 'name': 'color: #f92672; font-weight: bold;', 'attr': 'color: #bf79db;',
+        'string': 'color: #a6e22e;', 'number': 'color: #ae81ff;', 'meta': 'color: #75715e;',
+        'variable': 'color: #a6e22e;', 'addition': 'color: #a6e22e;',
+        'deletion': 'color: #75715e;', 'section': 'color: #a6e22e;',
+    },
+    'github': {
+        'comment': 'color: #999988; font-style: italic;', 'keyword': 'color: #333333; font-weight: bold;',
+        'literal': 'color: #008080;', 'built_in': 'color: #0086b3;', 'type': 'color: #445588; font-weight: bold;',
+        'title': 'color: #990000; font-weight: bold;', 'name': 'color: #000080;', 'attr': 'color: #008080;',
+        'string': 'color: #dd1144;', 'number': 'color: #008080;', 'meta': 'color: #999999; font-weight: bold;',
+        'variable': 'color: #008080;', 'addition': 'background: #ddffdd;',
+        'deletion': 'background: #ffdddd;', 'section': 'color: #990000; font-weight: bold;',
+    },
+    'vs2015': {
+        'comment': 'color: #57a64a; font-style: italic;', 'keyword': 'color: #569cd6;',
+        'literal': 'color: #569cd6;', 'built_in': 'color: #4ec9b0;', 'type': 'color: #4ec9b0;',
+        'title': 'color: #dcdcaa;', 'name': 'color: #569cd6;', 'attr': 'color: #9cdcfe;',
+        'string': 'color: #d69d85;', 'number': 'color: #b8d7a3;', 'meta': 'color: #9b9b9b;',
+        'variable': 'color: #bd63c5;', 'addition': 'background-color: #144212;',
+        'deletion': 'background-color: #600000;', 'section': 'color: #ffd700; font-weight: bold;',
+    },
+    'xcode': {
+        'comment': 'color: #007400;', 'keyword': 'color: #aa0d91;',
+        'literal': 'color: #aa0d91;', 'built_in': 'color: #5c2699;', 'type': 'color: #5c2699;',
+        'title': 'color: #1c00cf;', 'name': 'color: #aa0d91;', 'attr': 'color: #836c28;',
+        'string': 'color: #c41a16;', 'number': 'color: #1c00cf;', 'meta': 'color: #643820;',
+        'variable': 'color: #3f6e74;', 'addition': 'background-color: #baeeba;',
+        'deletion': 'background-color: #ffc8bd;', 'section': 'color: #1c00cf; font-weight: bold;',
+    },
+}
+
+_CODE_THEME_TEMPLATE = """
+#nice pre.custom {
+  border-radius: 5px;
+  box-shadow: rgba(0, 0, 0, 0.55) 0px 2px 10px;
+  text-align: left;
+  background: {background};
+}
+#nice pre code {
+  display: block;
+  overflow-x: auto;
+  padding: 16px;
+  padding-top: 15px;
+  color: {color};
+  background: {background};
+  font-family: Operator Mono, Consolas, Monaco, Menlo, monospace;
+  font-size: 12px;
+  line-height: 20px;
+  white-space: pre;
+  border-radius: 5px;
+  -webkit-overflow-scrolling: touch;
+}
+"""
+
+# Mac 风格代码块头部（与编辑器一样用 ::before 生成；三个圆点用 box-shadow 绘制，不依赖外链图片）
+MAC_STYLE_CSS = """
+#nice pre.custom::before {
+  content: "";
+  display: block;
+  width: 12px;
+  height: 12px;
+  margin: 10px 0 0 10px;
+  border-radius: 50%;
+  background: #ff5f56;
+  box-shadow: 20px 0 #ffbd2e, 40px 0 #27c93f;
+}
+"""
+
+
+def _checksum(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _pack_entries(pack: Dict[str, Any]) -> Dict[str, str]:
+    """展开主题包中所有 CSS 条目（用于计算校验和）"""
+    entries = {'basic': pack.get('basic', ''), 'font': pack.get('font', '')}
+    for name, css in pack.get('themes', {}).items():
+        entries[f'themes/{name}'] = css
+    for name, variants in pack.get('code_themes', {}).items():
+        for variant, css in variants.items():
+            entries[f'code_themes/{name}/{variant}'] = css
+    return entries
+
+
+def _pack_checksum(checksums: Dict[str, str]) -> str:
+    return _checksum(json.dumps(checksums, sort_keys=True))
+
+
+@lru_cache(maxsize=8)
+def load_theme_pack(path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    加载并校验主题包（结果缓存，同一路径只读取一次）
+
+    :param path: 主题包路径，默认使用用户缓存目录中的主题包，没有时使用随包分发的主题包
+    :return: 主题包内容；文件不存在或校验失败时返回 None
+    """
+    if path:
+        pack_path = Path(path)
+    else:
+        pack_path = next((p for p in (THEME_PACK_PATH, BUNDLED_THEME_PACK_PATH) if p.exists()), THEME_PACK_PATH)
+    if not pack_path.exists():
+        return None
+
+    try:
+        with open(pack_path, 'r', encoding='utf-8') as f:
+            pack = json.load(f)
+
+        if pack.get('format') != THEME_PACK_FORMAT:
+            print(f"⚠️ 主题包格式不受支持: {pack.get('format')}")
+            return None
+
+        checksums = {name: _checksum(css) for name, css in _pack_entries(pack).items()}
+        if checksums != pack.get('checksums') or _pack_checksum(checksums) != pack.get('checksum'):
+            print(f"⚠️ 主题包校验失败，已忽略: {pack_path}")
+            return None
+
+        return pack
+    except Exception as e:
+        print(f"⚠️ 加载主题包失败: {e}")
+        return None
+
+
+def get_theme_css(theme: str) -> str:
+    """
+    获取文章主题的完整 CSS（基础样式 + 主题样式）
+
+    :param theme: 主题名称
+    :return: CSS 文本
+    """
+    pack = load_theme_pack()
+    if pack and theme in pack.get('themes', {}):
+        return '\n'.join((pack.get('basic', ''), pack.get('font', ''), pack['themes'][theme]))
+
+    if theme not in THEME_ACCENTS:
+        print(f"⚠️ 离线主题 '{theme}' 不存在，使用默认主题")
+        theme = 'normal'
+    return BASIC_THEME_CSS + _ACCENT_THEME_TEMPLATE.replace('{accent}', THEME_ACCENTS[theme])
+
+
+def get_code_theme_css(code_theme: str, mac_style: bool = True) -> str:
+    """
+    获取代码主题的 CSS
+
+    :param code_theme: 代码主题名称
+    :param mac_style: 是否包含 Mac 风格头部样式
+    :return: CSS 文本
+    """
+    pack = load_theme_pack()
+    if pack and code_theme in pack.get('code_themes', {}):
+        return pack['code_themes'][code_theme]['mac' if mac_style else 'plain']
+
+    colors = CODE_THEME_COLORS.get(code_theme, CODE_THEME_COLORS['atom-one-dark'])
+    css = _CODE_THEME_TEMPLATE.replace('{color}', colors['color']).replace('{background}', colors['background'])
+    return (css + MAC_STYLE_CSS) if mac_style else css
+
+
+def get_editor_css(theme: str, code_theme: str, mac_style: bool = True) -> str:
+    """
+    按编辑器页面中 <style> 元素的顺序（basic、theme、code、font）拼接完整 CSS
+
+    与编辑器中 juice 读取到的样式一致（需要先 harvest() 生成主题包；没有主题包时使用内置样式）。
+
+    :param theme: 主题名称
+    :param code_theme: 代码主题
+    :param mac_style: 是否启用 Mac 风格
+    :return: CSS 文本
+    """
+    pack = load_theme_pack()
+    if pack and theme in pack.get('themes', {}) and code_theme in pack.get('code_themes', {}):
+        variant = 'mac' if mac_style else 'plain'
+        return '\n'.join((pack.get('basic', ''), pack['themes'][theme],
+                          pack['code_themes'][code_theme][variant], pack.get('font', '')))
+    return get_theme_css(theme) + get_code_theme_css(code_theme, mac_style)
+
+
+def harvest(editor_url: Optional[str] = None,
+            output: Optional[Union[str, Path]] = None,
+            headless: bool = True,
+            **converter_options) -> Path:
+    """
+    驱动一次编辑器，把所有主题、代码主题和 Mac 风格样式保存为本地主题包
+
+    :param editor_url: 编辑器地址（默认使用转换器的默认地址列表）
+    :param output: 主题包保存路径，默认为用户缓存目录中的 theme_pack.json（load_theme_pack 默认读取的位置）
+    :param headless: 是否使用无头模式
+    :param converter_options: 其他传给 MarkdownConverter 的参数（如 browser_ws_endpoint、proxy）
+    :return: 主题包路径
+
+    示例：
+        >>> from mdnice import themes
+        >>> themes.harvest()
+        >>> # 之后 engine='offline' 会自动使用主题包中的样式
+    """
+    from . import MarkdownConverter  # 延迟导入，避免循环依赖
+
+    output_path = Path(output) if output else THEME_PACK_PATH
+    converter = MarkdownConverter(headless=headless, editor_url=editor_url, **converter_options)
+
+    read_styles_js = """
+        (ids) => {
+            const result = {};
+            for (const [key, id] of Object.entries(ids)) {
+                const el = document.getElementById(id);
+                result[key] = el ? el.textContent : null;
+            }
+            return result;
+        }
+    """
+
+    try:
+        converter._retry_on_error(converter._init_driver)
+        converter._retry_on_error(converter._load_page)
+
+        print("🧺 开始采集主题样式...")
+        styles = converter.page.evaluate(read_styles_js, EDITOR_STYLE_IDS)
+        if styles.get('theme') is None:
+            raise RuntimeError(f"编辑器页面中找不到主题样式元素 #{EDITOR_STYLE_IDS['theme']}")
+
+        pack: Dict[str, Any] = {
+            'format': THEME_PACK_FORMAT,
+            'editor_url': converter.current_url,
+            'editor_version': converter._detect_editor_version(),
+            'harvested_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'basic': styles.get('basic') or '',
+            'font': styles.get('font') or '',
+            'themes': {},
+            'code_themes': {},
+        }
+
+        for theme in converter.AVAILABLE_THEMES:
+            converter._select_theme(theme)
+            pack['themes'][theme] = converter.page.evaluate(read_styles_js, EDITOR_STYLE_IDS)['theme'] or ''
+            print(f"  ✅ 主题: {converter.THEME_NAMES.get(theme, theme)}")
+
+        for mac_style in (False, True):
+            converter._set_mac_style(mac_style)
+            for code_theme in converter.AVAILABLE_CODE_THEMES:
+                converter._select_code_theme(code_theme)
+                css = converter.page.evaluate(read_styles_js, EDITOR_STYLE_IDS)['code'] or ''
+                variant = 'mac' if mac_style else 'plain'
+                pack['code_themes'].setdefault(code_theme, {})[variant] = css
+                print(f"  ✅ 代码主题: {converter.CODE_THEME_CONFIG[code_theme]['name']}（{variant}）")
+
+        checksums = {name: _checksum(css) for name, css in _pack_entries(pack).items()}
+        pack['checksums'] = checksums
+        pack['checksum'] = _pack_checksum(checksums)
+        pack['version'] = f"{time.strftime('%Y%m%d')}-{pack['checksum'][:8]}"
+
+        # 原子写入，避免半写入的主题包被加载
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(output_path, json.dumps(pack, ensure_ascii=False, indent=2).encode('utf-8'))
+
+        from .css_inliner import get_theme_inliner
+        load_theme_pack.cache_clear()
+        get_theme_inliner.cache_clear()
+        print(f"💾 主题包已保存: {output_path}（版本 {pack['version']}）")
+        return output_path
+    finally:
+        converter._close_driver()
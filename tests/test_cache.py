@@ -0,0 +1,224 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：转换结果缓存单元测试
+# 文件路径：tests/test_cache.py
+
+import pytest
+
+from mdnice import ConversionCache, MarkdownConverter, MemoryCache
+
+
+class TestConversionCache:
+    """测试磁盘转换结果缓存"""
+
+    def test_get_set_and_stats(self, tmp_path):
+        """测试读写与命中统计"""
+        cache = ConversionCache(tmp_path)
+        key = ConversionCache.make_key('# A', theme='normal', platform='wechat')
+        assert key != ConversionCache.make_key('# A', theme='rose', platform='wechat')
+
+        assert cache.get(key) is None
+        cache.set(key, '<h1>A</h1>')
+        assert cache.get(key) == '<h1>A</h1>'
+        assert cache.get(None) is None
+
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['writes']) == (1, 2, 1)
+        assert stats['total_bytes'] == len('<h1>A</h1>')
+
+    def test_lru_eviction(self, tmp_path):
+        """测试超过总大小上限时淘汰最久未使用的条目"""
+        import os
+        cache = ConversionCache(tmp_path, max_bytes=250)
+        for index in range(3):
+            cache.set(f'{index:064x}', 'x' * 100)
+            os.utime(cache._path(f'{index:064x}'), (index, index))
+        assert cache.get(f'{0:064x}') is None
+        assert cache.get(f'{2:064x}') is not None
+        assert cache.stats()['evictions'] >= 1
+        assert cache.stats()['total_bytes'] <= 250
+
+    def test_editor_version_ttl(self, tmp_path):
+        """测试编辑器版本记录持久化与过期"""
+        ConversionCache(tmp_path).set_editor_version('https://editor', 'abc')
+        assert ConversionCache(tmp_path).get_editor_version('https://editor') == 'abc'
+        assert ConversionCache(tmp_path, version_ttl=-1).get_editor_version('https://editor') is None
+
+
+class TestMemoryCache:
+    """测试进程内 LRU 缓存"""
+
+    def test_lru_bounds(self):
+        """测试条目数和字节数上限"""
+        cache = MemoryCache(max_entries=2, max_bytes=10)
+        cache.set('a', 'aaa')
+        cache.set('b', 'bbb')
+        assert cache.get('a') == 'aaa'
+        cache.set('c', 'ccc')
+        assert cache.get('b') is None
+        cache.set('d', 'dddddddd')
+        assert cache.get('d') == 'dddddddd' and cache.get('c') is None
+        assert cache.stats()['total_bytes'] == 8
+        assert cache.stats()['evictions'] == 3
+
+    def test_single_flight(self):
+        """测试相同键的并发请求只转换一次"""
+        import threading
+        import time
+
+        cache = MemoryCache()
+        calls = []
+        barrier = threading.Barrier(5)
+
+        def render():
+            calls.append(1)
+            time.sleep(0.2)
+            return '<p>x</p>'
+
+        def worker(results):
+            barrier.wait()
+            results.append(cache.get_or_render('key', render))
+
+        results = []
+        threads = [threading.Thread(target=worker, args=(results,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ['<p>x</p>'] * 5
+        stats = cache.stats()
+        assert (stats['misses'], stats['coalesced']) == (1, 4)
+        assert cache.get_or_render('key', render) == '<p>x</p>' and len(calls) == 1
+
+    def test_error_shared_and_not_cached(self):
+        """测试转换失败不会写入缓存"""
+        cache = MemoryCache()
+        with pytest.raises(RuntimeError):
+            cache.get_or_render('key', lambda: (_ for _ in ()).throw(RuntimeError('boom')))
+        assert cache.get_or_render('key', lambda: 'ok') == 'ok'
+
+
+class TestConverterCache:
+    """测试转换器使用缓存"""
+
+    def test_offline_cache_hit(self, tmp_path, monkeypatch):
+        """测试第二次转换直接命中缓存"""
+        pytest.importorskip('markdown_it')
+        converter = MarkdownConverter(cache_dir=tmp_path)
+        first = converter.convert('# 缓存', engine='offline')
+
+        monkeypatch.setattr(converter, '_render_offline', lambda *args: pytest.fail('不应重新渲染'))
+        assert converter.convert('# 缓存', engine='offline') == first
+        assert converter.cache.stats()['hits'] == 1
+
+    def test_browser_cache_hit_without_browser(self, tmp_path, monkeypatch):
+        """测试编辑器版本已知时，缓存命中不启动浏览器"""
+        converter = MarkdownConverter(cache_dir=tmp_path)
+        converter.cache.set_editor_version(converter.url_list[0], 'v1')
+        key = converter._cache_key('# 缓存', 'browser', 'normal', 'atom-one-dark', True, 'wechat')
+        converter.cache.set(key, '<h1>缓存</h1>')
+
+        monkeypatch.setattr(converter, '_ensure_browser', lambda: pytest.fail('不应启动浏览器'))
+        assert converter.convert('# 缓存', theme='normal', engine='browser') == '<h1>缓存</h1>'
+        assert converter.browser is None
+
+    def test_editor_version_per_url(self, tmp_path):
+        """测试编辑器版本按实际加载的地址记录，备用编辑器的版本不用于主地址"""
+        converter = MarkdownConverter(cache_dir=tmp_path)
+        converter.cache.set_editor_version(converter.backup_url, 'backup-v1')
+        assert converter._render_version('browser', '# a') is None
+
+        converter.current_url = converter.backup_url  # 上次加载的是备用地址
+        assert converter._render_version('browser', '# a') == 'editor:backup-v1'
+
+    def test_shared_memory_cache(self):
+        """测试多个转换器共用进程内缓存"""
+        pytest.importorskip('markdown_it')
+        shared = MemoryCache()
+        first = MarkdownConverter(memory_cache=shared).convert('# 共用', engine='offline')
+        second = MarkdownConverter(memory_cache=shared).convert('# 共用', engine='offline')
+        assert first == second
+        assert shared.stats()['hits'] == 1
+
+
+class TestUploadCache:
+    """测试图片上传缓存"""
+
+    def test_persist_and_ttl(self, tmp_path):
+        """测试记录跨实例保留，按图床区分，过期后失效"""
+        from mdnice import UploadCache
+
+        image = tmp_path / 'a.png'
+        image.write_bytes(b'png')
+        key = UploadCache.content_key(str(image))
+        assert key == UploadCache.content_key(b'png')
+
+        cache = UploadCache(tmp_path / 'uploads.db')
+        cache.set(key, 'SMUploader:https://smms.app', 'https://cdn.com/a.png')
+        cache.close()
+
+        cache = UploadCache(tmp_path / 'uploads.db')
+        assert cache.get(key, 'SMUploader:https://smms.app') == 'https://cdn.com/a.png'
+        assert cache.get(key, 'GitHubUploader:user/repo:main:True') is None
+        assert cache.get(key, 'SMUploader:https://smms.app', ttl=-1) is None
+        assert cache.get(key, 'SMUploader:https://smms.app') is None  # 过期记录已删除
+        assert cache.stats()['expired'] == 1
+
+    def test_export_import(self, tmp_path):
+        """测试导出后在另一份缓存中导入"""
+        from mdnice import UploadCache
+
+        source = UploadCache(tmp_path / 'a.db')
+        source.set('file:1', 'u', 'https://cdn.com/1.png')
+        source.set('file:2', 'u', 'https://cdn.com/2.png')
+        assert source.export_to(tmp_path / 'uploads.json') == 2
+
+        target = UploadCache(tmp_path / 'b.db')
+        target.set('file:2', 'u', 'https://cdn.com/newer.png')
+        assert target.import_from(tmp_path / 'uploads.json') == 1
+        assert target.get('file:1', 'u') == 'https://cdn.com/1.png'
+        assert target.get('file:2', 'u') == 'https://cdn.com/newer.png'
+
+    def test_converter_and_wrap(self, tmp_path):
+        """测试转换器和包装后的上传函数在上传前查询缓存"""
+        from mdnice import UploadCache
+        from mdnice.image_uploaders import WechatUploader, WechatUploadType
+
+        (tmp_path / 'a.png').write_bytes(b'png')
+        uploads = []
+
+        def upload(path: str) -> str:
+            uploads.append(path)
+            return 'https://cdn.com/a.png'
+
+        upload.cache_identity = 'cdn:a'
+        cache = UploadCache(tmp_path / 'uploads.db')
+        for _ in range(2):
+            converter = MarkdownConverter(image_uploader=upload, upload_cache=cache)
+            result = converter._process_images_in_markdown('![](a.png)', base_path=tmp_path)
+            assert result == '![](https://cdn.com/a.png)'
+        assert len(uploads) == 1
+
+        wrapped = cache.wrap(upload)
+        assert wrapped(str(tmp_path / 'a.png')) == 'https://cdn.com/a.png'
+        assert len(uploads) == 1
+
+        uploader = WechatUploader('wx123', 'secret', upload_type=WechatUploadType.TEMPORARY)
+        assert cache.wrap(uploader.upload).cache_identity == 'WechatUploader:wx123:TEMPORARY'
+        assert 0 < cache.wrap(uploader.upload).cache_ttl < 3 * 24 * 3600
+
+    def test_undeclared_identity_bypasses_cache(self, tmp_path):
+        """测试没有声明 cache_identity 的上传函数不使用缓存（lambda 之间无法区分图床）"""
+        from mdnice import UploadCache
+
+        (tmp_path / 'a.png').write_bytes(b'png')
+        cache = UploadCache(tmp_path / 'uploads.db')
+        for host in ('https://a.com/x.png', 'https://b.com/x.png'):
+            converter = MarkdownConverter(image_uploader=lambda path, url=host: url, upload_cache=cache)
+            assert converter._process_images_in_markdown('![](a.png)', base_path=tmp_path) == f'![]({host})'
+        upload = lambda path: 'https://c.com/x.png'
+        assert cache.wrap(upload) is upload
+        assert cache.stats()['entries'] == 0
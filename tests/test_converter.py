@@ -210,6 +210,156 @@ class TestImageUpload:
         assert converter._should_upload_image(
             '/path/to/image.jpg', False) is False
 
+    def test_concurrent_uploads(self, tmp_path, capsys):
+        """测试并发上传并按原顺序替换，单张失败不影响其他图片"""
+        import threading
+        import time
+
+        for name in ('a.png', 'b.png', 'c.png', 'bad.png'):
+            (tmp_path / name).write_bytes(name.encode())
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def mock_uploader(path: str) -> str:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            if path.endswith('bad.png'):
+                raise RuntimeError('上传失败')
+            return f"https://cdn.com/{Path(path).name}"
+
+        md = ('![a](a.png) ![b](b.png "标题") ![远程](http://x.com/r.png)\n'
+              '![缺失](missing.png) ![坏](bad.png) ![c](c.png)')
+        converter = MarkdownConverter(image_uploader=mock_uploader, image_upload_concurrency=3)
+        result = converter._process_images_in_markdown(md, base_path=tmp_path)
+        assert result == ('![a](https://cdn.com/a.png) ![b](https://cdn.com/b.png "标题") '
+                          '![远程](http://x.com/r.png)\n![缺失](missing.png) ![坏](bad.png) '
+                          '![c](https://cdn.com/c.png)')
+        assert peak[0] == 3
+        assert '共 6 张 (上传 3, 跳过 2, 失败 1)' in capsys.readouterr().out
+
+        with pytest.raises(ValueError):
+            MarkdownConverter(image_upload_concurrency=0)
+
+    def test_deduplicate_uploads(self, tmp_path, capsys):
+        """测试相同内容的图片在文档内和同一次转换的多个文档间只上传一次"""
+        (tmp_path / 'logo.png').write_bytes(b'logo')
+        (tmp_path / 'copy.png').write_bytes(b'logo')
+        (tmp_path / 'other.png').write_bytes(b'other')
+        uploads = []
+
+        def mock_uploader(path: str) -> str:
+            uploads.append(Path(path).name)
+            return f"https://cdn.com/{len(uploads)}.png"
+
+        converter = MarkdownConverter(image_uploader=mock_uploader)
+        md = '![](logo.png) ![](copy.png) ![](./logo.png) ![](other.png)'
+        result = converter._process_images_in_markdown(md, base_path=tmp_path)
+        assert sorted(uploads) == ['logo.png', 'other.png']
+        logo_url = result.split(')')[0][4:]
+        assert result.count(logo_url) == 3
+        assert '(上传 2, 复用 2, 跳过 0, 失败 0)' in capsys.readouterr().out
+
+        # 同一次转换的其他文档直接复用，新的 convert 调用重新上传
+        converter._process_images_in_markdown('![](logo.png)', base_path=tmp_path)
+        assert len(uploads) == 2
+        converter._uploaded_images = {}
+        converter._process_images_in_markdown('![](logo.png)', base_path=tmp_path)
+        assert len(uploads) == 3
+
+    def test_async_uploader(self, tmp_path):
+        """测试异步上传函数在事件循环中并发上传，同步上传函数在异步接口中整体放到线程执行"""
+        import asyncio
+        from mdnice.image_uploaders import LocalStorageUploader
+
+        for name in ('a.png', 'b.png', 'c.png'):
+            (tmp_path / name).write_bytes(name.encode())
+        md = '![](a.png) ![](b.png) ![](c.png)'
+        active, peak = [0], [0]
+
+        async def upload(path: str) -> str:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.02)
+            active[0] -= 1
+            return f"https://cdn.com/{Path(path).name}"
+
+        converter = MarkdownConverter(image_uploader=upload, image_upload_concurrency=2)
+        expected = '![](https://cdn.com/a.png) ![](https://cdn.com/b.png) ![](https://cdn.com/c.png)'
+        assert converter._process_images_in_markdown(md, base_path=tmp_path) == expected
+        assert peak[0] == 2
+
+        converter._uploaded_images = {}
+        assert asyncio.run(converter.process_images_async(md, base_path=tmp_path)) == expected
+
+        uploader = LocalStorageUploader(str(tmp_path / 'store'), 'https://static.example.com')
+        converter = MarkdownConverter(image_uploader=uploader.upload)
+        result = asyncio.run(converter.process_images_async('![](b.png)', base_path=tmp_path))
+        assert result.startswith('![](https://static.example.com/')
+
+
+class TestRenderAPI:
+    """测试页面渲染接口"""
+
+    def test_batch_render(self, monkeypatch, tmp_path):
+        """测试探测到渲染接口后，缓存中没有的剩余文档一次调用渲染接口全部渲染"""
+        from mdnice import MemoryCache
+
+        converter = MarkdownConverter(memory_cache=MemoryCache(), use_render_api=True)
+        calls = []
+
+        def ensure_browser():
+            converter.page = object()
+            converter._render_api_mode = 'api'
+
+        def render_via_api(markdown_list, *args):
+            calls.append(list(markdown_list))
+            return [f'<section id="nice"><p>{md}</p></section>'.ljust(60) for md in markdown_list]
+
+        monkeypatch.setattr(converter, '_ensure_browser', ensure_browser)
+        monkeypatch.setattr(converter, '_render_via_api', render_via_api)
+        monkeypatch.setattr(converter, '_close_driver', lambda: None)
+
+        results = converter.convert(['# 一', '# 二', '# 一', '# 三'])
+        # 第一篇启动浏览器、探测到接口后，剩余文档批量渲染
+        assert calls == [['# 一'], ['# 二', '# 三']]
+        assert [html.strip() for html in results] == [f'<section id="nice"><p># {n}</p></section>'
+                                                      for n in ('一', '二', '一', '三')]
+
+        # 已缓存的文档不再渲染，只剩一篇时不批量
+        converter.convert(['# 一', '# 四'])
+        assert calls[2:] == [['# 四']]
+        assert not converter._api_prefetched
+
+    def test_no_api_no_prefetch(self, monkeypatch):
+        """测试没有渲染接口时逐项准备、逐项渲染，不提前读取全部文档"""
+        converter = MarkdownConverter(use_render_api=True)
+        events = []
+        prepare_item = converter._prepare_item
+
+        def ensure_browser():
+            converter.page = object()
+            converter._render_api_mode = None
+
+        def prepare(md_item, theme):
+            events.append(('prepare', md_item))
+            return prepare_item(md_item, theme)
+
+        def render_in_browser(md_content, *args, **kwargs):
+            events.append(('render', md_content))
+            return f'<section id="nice"><p>{md_content}</p></section>'.ljust(60)
+
+        monkeypatch.setattr(converter, '_ensure_browser', ensure_browser)
+        monkeypatch.setattr(converter, '_prepare_item', prepare)
+        monkeypatch.setattr(converter, '_render_in_browser', render_in_browser)
+        monkeypatch.setattr(converter, '_close_driver', lambda: None)
+
+        converter.convert(['# 一', '# 二', '# 三'])
+        assert events == [(kind, md) for md in ('# 一', '# 二', '# 三') for kind in ('prepare', 'render')]
+
 
 class TestConvenienceFunctions:
     """测试便捷函数"""
@@ -261,6 +411,19 @@ class TestImageUploaders:
         )
         assert 'sm.ms' in uploader2.api_url
 
+    def test_shared_session(self):
+        """测试上传器默认共用连接池会话，只对读取请求重试"""
+        from mdnice.image_uploaders import SMUploader, GitHubUploader, create_session, shared_session
+
+        assert SMUploader(api_token='t').session is GitHubUploader(token='t', repo='u/r').session is shared_session()
+
+        session = create_session(pool_size=8, retries=2)
+        assert SMUploader(api_token='t', session=session).session is session
+        adapter = session.get_adapter('https://sm.ms')
+        assert adapter._pool_maxsize == 8 and adapter.max_retries.total == 2
+        assert 'GET' in adapter.max_retries.allowed_methods
+        assert 'POST' not in adapter.max_retries.allowed_methods
+
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,91 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：Markdown 图片扫描单元测试
+# 文件路径：tests/test_images.py
+
+from mdnice import MarkdownConverter, collect_images, scan_images
+from mdnice.images import replace_image_urls
+
+MD = '''# 标题
+
+![行内](a.png "标题") 和 ![尖括号](<my image.png>) 和 `![代码](code.png)`
+
+![引用][logo] ![logo] ![未定义][none]
+
+<p><img alt="x" src="html.png?a=1&amp;b=2"></p>
+
+```markdown
+![围栏](fence.png)
+<img src="fence.png">
+```
+
+~~~
+![波浪线围栏](tilde.png)
+~~~
+
+[logo]: logo.png "Logo"
+'''
+
+
+class TestScanImages:
+    """测试图片扫描"""
+
+    def test_scan(self):
+        """测试识别行内、引用式和 HTML 图片，跳过代码块和行内代码"""
+        refs = scan_images(MD)
+        assert [(ref.kind, ref.url) for ref in refs] == [
+            ('inline', 'a.png'), ('inline', 'my image.png'), ('html', 'html.png?a=1&b=2'), ('reference', 'logo.png')]
+        assert refs[-1].line == MD.splitlines().index('[logo]: logo.png "Logo"') + 1
+        assert all(MD[ref.start:ref.end] in (ref.url, 'html.png?a=1&amp;b=2') for ref in refs)
+
+    def test_indented_code(self):
+        """测试跳过缩进代码块，列表项内容和段落续行中的缩进图片照常识别"""
+        md = ('段落\n    ![续行](cont.png)\n\n    ![代码](code.png)\n\n\t![制表符](tab.png)\n\n'
+              '- 列表\n\n    ![列表段落](item.png)\n\n      ![列表代码](item-code.png)\n\n'
+              '> 引用\n>\n>     ![引用代码](quote-code.png)\n')
+        assert [ref.url for ref in scan_images(md)] == ['cont.png', 'item.png']
+
+    def test_replace(self):
+        """测试只替换地址本身，引用式图片改写定义行"""
+        refs = scan_images(MD)
+        result = replace_image_urls(MD, [(ref, f'https://cdn.com/{index}.png?v=1&x=2')
+                                         for index, ref in enumerate(refs)])
+        assert '![行内](https://cdn.com/0.png?v=1&x=2 "标题")' in result
+        assert '![尖括号](<https://cdn.com/1.png?v=1&x=2>)' in result
+        assert 'src="https://cdn.com/2.png?v=1&amp;x=2"' in result
+        assert '[logo]: https://cdn.com/3.png?v=1&x=2 "Logo"' in result
+        assert '![围栏](fence.png)' in result and '`![代码](code.png)`' in result
+
+    def test_converter_skips_code(self, tmp_path):
+        """测试转换器不上传代码块中的图片"""
+        for name in ('a.png', 'html.png', 'logo.png', 'fence.png', 'code.png'):
+            (tmp_path / name).write_bytes(name.encode())
+        uploads = []
+
+        def mock_uploader(path: str) -> str:
+            uploads.append(path.rsplit('/', 1)[-1])
+            return 'https://cdn.com/x.png'
+
+        converter = MarkdownConverter(image_uploader=mock_uploader)
+        converter._process_images_in_markdown(MD.replace('?a=1&amp;b=2', ''), base_path=tmp_path)
+        assert sorted(uploads) == ['a.png', 'html.png', 'logo.png']
+
+
+class TestCollectImages:
+    """测试批量图片清单"""
+
+    def test_manifest(self, tmp_path):
+        """测试按内容去重并记录每处引用"""
+        (tmp_path / 'img').mkdir()
+        (tmp_path / 'img' / 'logo.png').write_bytes(b'logo')
+        (tmp_path / 'copy.png').write_bytes(b'logo')
+        (tmp_path / 'a.md').write_text('![](img/logo.png)\n\n![](https://x.com/r.png)', encoding='utf-8')
+        (tmp_path / 'b.md').write_text('```\n![](skip.png)\n```\n![](copy.png) ![](missing.png)',
+                                       encoding='utf-8')
+
+        manifest = collect_images([tmp_path / 'a.md', tmp_path / 'b.md'])
+        assert [(item['type'], item['exists'], len(item['references'])) for item in manifest] == [
+            ('local', True, 2), ('remote', True, 1), ('local', False, 1)]
+        assert manifest[0]['size'] == 4
+        assert manifest[0]['references'][1] == {'file': str(tmp_path / 'b.md'), 'line': 4, 'url': 'copy.png'}
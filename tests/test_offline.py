@@ -0,0 +1,533 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：离线渲染引擎单元测试
+# 文件路径：tests/test_offline.py
+
+import pytest
+from pathlib import Path
+
+pytest.importorskip('markdown_it')
+
+from mdnice import MarkdownConverter, OfflineRenderer
+
+
+class TestOfflineRenderer:
+    """测试离线渲染器"""
+
+    def test_heading_structure(self):
+        """测试标题结构与编辑器一致"""
+        html = OfflineRenderer().render('## 标题')
+        assert html.startswith('<section id="nice"')
+        assert '<span class="prefix"' in html
+        assert '<span class="content" style="' in html
+        assert '>标题</span>' in html
+
+    def test_styles_inlined(self):
+        """测试主题样式被内联"""
+        html = OfflineRenderer().render('正文 **加粗**', theme='rose')
+        assert '<p data-tool="mdnice编辑器" style="' in html
+        assert '<strong style="' in html
+
+    def test_code_block_mac_style(self):
+        """测试代码块 Mac 风格开关"""
+        renderer = OfflineRenderer()
+        code = '```python\nprint(1 < 2)\n```'
+        assert 'box-shadow: 20px 0' in renderer.render(code, mac_style=True)
+        html = renderer.render(code, mac_style=False)
+        assert 'box-shadow: 20px 0' not in html
+        assert '&lt;' in html and 'class="hljs-built_in"' in html
+
+    def test_single_image_becomes_figure(self):
+        """测试单图段落渲染为 figure"""
+        html = OfflineRenderer().render('![说明](a.png)')
+        assert '<figure' in html
+        assert '>说明</figcaption>' in html
+
+
+class TestOfflineEngine:
+    """测试转换器的离线引擎"""
+
+    def test_convert_offline(self):
+        """测试离线转换无需浏览器"""
+        converter = MarkdownConverter()
+        html = converter.convert('# Hello', theme='normal', engine='offline')
+        assert 'Hello' in html
+        assert 'data-tool' not in html
+        assert converter.browser is None
+
+    def test_invalid_engine(self):
+        """测试无效引擎"""
+        converter = MarkdownConverter()
+        with pytest.raises(ValueError):
+            converter.convert('# Hello', engine='unknown')
+
+    def test_hybrid_fallback_and_verification(self, monkeypatch):
+        """测试 hybrid 引擎：不支持的语法交给编辑器，抽样比对统计不一致率"""
+        converter = MarkdownConverter(verify_ratio=1.0)
+        browser_calls = []
+
+        def fake_render_in_browser(md_content, *args, **kwargs):
+            browser_calls.append(md_content)
+            return '<section id="nice"><p>公式</p></section>' if '$' in md_content else '<section id="nice"><h1>x</h1></section>'
+
+        monkeypatch.setattr(converter, '_ensure_browser', lambda: None)
+        monkeypatch.setattr(converter, '_render_in_browser', fake_render_in_browser)
+
+        results = converter.convert(['# Hello', '公式 $x^2$'], engine='hybrid')
+        assert 'Hello' in results[0] and results[1] == '<section id="nice"><p>公式</p></section>'
+        assert browser_calls == ['# Hello', '公式 $x^2$']
+        stats = converter.hybrid_stats
+        assert (stats['offline'], stats['fallback'], stats['verified'], stats['mismatched']) == (1, 1, 1, 1)
+        assert stats['mismatch_rate'] == 1.0
+
+    def test_hybrid_verification_ignores_link_footnotes(self, monkeypatch):
+        """测试抽样比对时编辑器的外链脚注不算结构差异"""
+        converter = MarkdownConverter(verify_ratio=1.0)
+        browser_html = ('<section id="nice"><p>见 <span class="footnote-word">官网</span>'
+                        '<sup class="footnote-ref">[1]</sup> 了解</p><h3 class="footnotes-sep">参考资料</h3>'
+                        '<section class="footnotes"><span class="footnote-item"><span class="footnote-num">[1] </span>'
+                        '<p>官网: <em>https://example.com</em></p></span></section></section>')
+        monkeypatch.setattr(converter, '_ensure_browser', lambda: None)
+        monkeypatch.setattr(converter, '_render_in_browser', lambda *args, **kwargs: browser_html)
+
+        converter.convert(['见 [官网](https://example.com) 了解', '见 [官网](https://example.com) 知道'],
+                          engine='hybrid')
+        stats = converter.hybrid_stats
+        assert (stats['verified'], stats['mismatched']) == (2, 1)
+        assert '了解' in stats['mismatches'][0][0]
+
+    def test_compare_structure(self):
+        """测试结构比较忽略内联样式"""
+        from mdnice.offline import compare_structure
+        assert compare_structure('<p style="color: red;">a <b>b</b></p>', '<p>a <b>b</b></p>') == []
+        assert compare_structure('<p>a <b>b</b></p>', '<p>a <i>b</i></p>')
+        assert OfflineRenderer().unsupported_features('价格 $5 和 $6，公式 $E=mc^2$') == ['数学公式']
+
+
+class TestEmbeddedEngine:
+    """测试内嵌 JS 引擎"""
+
+    def test_convert_embedded(self, tmp_path):
+        """测试渲染包在进程内执行，options 与页面渲染接口一致"""
+        pytest.importorskip('py_mini_racer')
+        bundle = tmp_path / 'bundle.js'
+        bundle.write_text(
+            "window.mdniceRender = (md, o) => '<section id=\"nice\"><p data-tool=\"mdnice编辑器\">'"
+            " + md + '|' + o.theme + '|' + o.codeTheme + '|' + o.platform + '</p></section>';",
+            encoding='utf-8')
+
+        converter = MarkdownConverter(render_bundle=str(bundle), code_theme='github')
+        html = converter.convert('正文', theme='rose', platform='zhihu', engine='embedded')
+        assert html == '<section id="nice"><p>正文|rose|github|zhihu</p></section>'
+        assert converter.browser is None
+
+    def test_pieces_bundle_uses_theme_css(self, tmp_path):
+        """测试 markdown-it + juice 渲染包使用主题样式，其他平台由微信格式转换"""
+        pytest.importorskip('py_mini_racer')
+        from mdnice import EmbeddedRenderer
+        bundle = tmp_path / 'bundle.js'
+        bundle.write_text(
+            "window.markdownParser = { render: md => '<p>' + md + '</p>' };"
+            "window.juice = { inlineContent: (html, css) => css.indexOf('#nice') >= 0 ? html : '' };",
+            encoding='utf-8')
+
+        renderer = EmbeddedRenderer(bundle)
+        try:
+            assert renderer.mode == 'pieces'
+            assert renderer.render('hi') == '<section id="nice"><p>hi</p></section>'
+            assert renderer.render('hi', platform='zhihu') == '<section id="nice"><p>hi</p></section>'
+        finally:
+            renderer.close()
+
+    def test_bundle_download_uses_session(self):
+        """测试从 URL 下载渲染包时使用传入的 HTTP 会话"""
+        from mdnice.embedded import EmbeddedRenderer
+
+        class FakeResponse:
+            text = 'window.mdniceRender = md => md;'
+
+            def raise_for_status(self):
+                pass
+
+        class FakeSession:
+            def get(self, url, timeout):
+                self.url = url
+                return FakeResponse()
+
+        session = FakeSession()
+        assert EmbeddedRenderer._load_bundle('https://cdn.com/b.js', 5, session) == FakeResponse.text
+        assert session.url == 'https://cdn.com/b.js'
+
+    def test_embedded_requires_bundle(self):
+        """测试未指定渲染包时报错"""
+        with pytest.raises(ValueError):
+            MarkdownConverter().convert('# Hello', engine='embedded')
+
+
+class TestPlatformTransforms:
+    """测试从微信格式派生其他平台格式"""
+
+    WECHAT_HTML = (
+        '<section id="nice"><p style="color: red;">见 <span class="footnote-word">官网</span>'
+        '<sup class="footnote-ref">[1]</sup>，<span class="inline-equation" data-formula="a^2"><svg></svg></span></p>'
+        '<pre class="custom"><span style="display: block;"></span><code class="hljs language-python">'
+        '<span class="hljs-keyword">if</span> a &lt; b: pass</code></pre>'
+        '<h3 class="footnotes-sep"></h3><section class="footnotes"><span class="footnote-item">'
+        '<span class="footnote-num">[1] </span><p>官网: <em>https://example.com</em></p></span></section></section>'
+    )
+
+    def test_zhihu(self):
+        """测试知乎：公式图片、普通链接、纯文本代码块、去掉内联样式"""
+        from mdnice.platforms import transform_html
+        html = transform_html(self.WECHAT_HTML, 'zhihu')
+        assert '<a href="https://example.com">官网</a>' in html
+        assert '<img class="Formula-image" data-eeimg="true" src="" alt="a^2">' in html
+        assert '<pre lang="python"><code>if a &lt; b: pass</code></pre>' in html
+        assert 'style=' not in html and 'footnotes' not in html
+
+    def test_juejin_keeps_styles(self):
+        """测试掘金：公式转为公式图片，保留内联样式和高亮"""
+        from mdnice.platforms import transform_html
+        html = transform_html(self.WECHAT_HTML, 'juejin')
+        assert 'src="https://juejin.cn/equation?tex=a%5E2"' in html
+        assert '<p style="color: red;">' in html and 'hljs-keyword' in html
+        assert transform_html(self.WECHAT_HTML, 'wechat') == self.WECHAT_HTML
+
+    def test_convert_multiple_platforms(self):
+        """测试一次渲染输出多个平台"""
+        results = MarkdownConverter().convert('```python\nx = 1\n```', platform=['wechat', 'zhihu'], engine='offline')
+        assert set(results) == {'wechat', 'zhihu'}
+        assert 'hljs-' in results['wechat']
+        assert '<pre lang="python"><code>x = 1</code></pre>' in results['zhihu']
+
+
+class TestCSSInliner:
+    """测试 CSS 内联引擎"""
+
+    def test_specificity_and_inline_priority(self):
+        """测试特异性顺序与原有内联样式优先"""
+        from mdnice import CSSInliner
+        inliner = CSSInliner('p { color: red; } #nice p { color: blue; margin: 0; }')
+        html = inliner.inline('<section id="nice"><p>a</p><p style="color: green;">b</p></section>')
+        assert '<p style="color: blue; margin: 0;">a</p>' in html
+        assert '<p style="color: green; margin: 0;">b</p>' in html
+
+    def test_pseudo_elements(self):
+        """测试伪元素转换为 span"""
+        from mdnice import CSSInliner
+        html = CSSInliner('h2::before { content: "#"; color: red; }').inline('<h2>标题</h2>')
+        assert html == '<h2><span style="color: red;">#</span>标题</h2>'
+
+    def test_unsupported_selectors_skipped(self):
+        """测试不支持的选择器被忽略"""
+        from mdnice import CSSInliner
+        html = CSSInliner('a:hover { color: red; } a { color: blue; }').inline('<a href="#">x</a>')
+        assert html == '<a href="#" style="color: blue;">x</a>'
+
+    def test_theme_inliner_cached(self):
+        """测试同一主题组合只编译一次"""
+        from mdnice.css_inliner import get_theme_inliner
+        assert get_theme_inliner('rose', 'monokai', True) is get_theme_inliner('rose', 'monokai', True)
+
+
+class TestThemePack:
+    """测试主题包加载与校验"""
+
+    @staticmethod
+    def _write_pack(path, theme_css):
+        import json
+        from mdnice import themes
+
+        pack = {
+            'format': themes.THEME_PACK_FORMAT,
+            'basic': '#nice p { margin: 0; }',
+            'font': '',
+            'themes': {'normal': theme_css},
+            'code_themes': {'github': {'mac': '#nice pre code { color: #111; }', 'plain': '#nice pre code { color: #222; }'}},
+        }
+        pack['checksums'] = {name: themes._checksum(css) for name, css in themes._pack_entries(pack).items()}
+        pack['checksum'] = themes._pack_checksum(pack['checksums'])
+        path.write_text(json.dumps(pack), encoding='utf-8')
+        return pack
+
+    @pytest.fixture
+    def pack_path(self, tmp_path, monkeypatch):
+        from mdnice import themes
+        from mdnice.css_inliner import get_theme_inliner
+
+        path = tmp_path / 'theme_pack.json'
+        monkeypatch.setattr(themes, 'THEME_PACK_PATH', path)
+        themes.load_theme_pack.cache_clear()
+        get_theme_inliner.cache_clear()
+        yield path
+        themes.load_theme_pack.cache_clear()
+        get_theme_inliner.cache_clear()
+
+    def test_pack_preferred(self, pack_path):
+        """测试主题包存在时优先使用其中的样式"""
+        from mdnice import themes
+
+        self._write_pack(pack_path, '#nice strong { color: #123456; }')
+        assert '#123456' in themes.get_theme_css('normal')
+        assert themes.get_code_theme_css('github', mac_style=False) == '#nice pre code { color: #222; }'
+        assert 'color: #123456' in OfflineRenderer().render('**粗体**')
+
+    def test_default_location(self, pack_path, tmp_path, monkeypatch):
+        """测试主题包默认不放在包目录，找不到用户主题包时使用随包分发的主题包"""
+        from mdnice import themes
+
+        assert Path(themes.__file__).parent not in themes.THEME_PACK_PATH.parents
+        bundled = tmp_path / 'bundled.json'
+        self._write_pack(bundled, '#nice strong { color: #abcdef; }')
+        monkeypatch.setattr(themes, 'BUNDLED_THEME_PACK_PATH', bundled)
+        assert '#abcdef' in themes.get_theme_css('normal')
+
+    def test_tampered_pack_ignored(self, pack_path):
+        """测试校验和不匹配的主题包被忽略"""
+        import json
+        from mdnice import themes
+
+        pack = self._write_pack(pack_path, '#nice strong { color: #123456; }')
+        pack['themes']['normal'] = '#nice strong { color: #654321; }'
+        pack_path.write_text(json.dumps(pack), encoding='utf-8')
+
+        assert themes.load_theme_pack() is None
+        assert '#654321' not in themes.get_theme_css('normal')
+
+
+class TestHighlighter:
+    """测试离线代码高亮"""
+
+    def test_highlight_code_theme(self):
+        """测试按代码主题输出 highlight.js 类名和内联颜色"""
+        pytest.importorskip('pygments')
+        from mdnice.highlighter import highlight_code
+
+        html = highlight_code('def f():\n    return "a"', 'python', 'atom-one-dark')
+        assert '<span class="hljs-keyword" style="color: #c678dd;">def</span>' in html
+        assert '<span class="hljs-string" style="color: #98c379;">"a"</span>' in html
+        assert 'color: #f92672' in highlight_code('def f(): pass', 'python', 'monokai')
+
+    def test_highlight_cached_and_fallback(self):
+        """测试重复代码只高亮一次，未知语言不高亮"""
+        pytest.importorskip('pygments')
+        from mdnice.highlighter import highlight_code
+
+        code = 'x = 1  # cached'
+        first = highlight_code(code, 'python', 'github')
+        hits = highlight_code.cache_info().hits
+        assert highlight_code(code, 'python', 'github') is first
+        assert highlight_code.cache_info().hits == hits + 1
+        assert highlight_code('x', 'no-such-language', 'github') is None
+
+        html = OfflineRenderer().render('```no-such-language\na < b\n```')
+        assert '<code class="hljs language-no-such-language"' in html
+        assert 'a &lt; b' in html
+
+
+class TestIncrementalPreview:
+    """测试增量预览"""
+
+    DOC = ('# 标题\n\n第一段 *强调*\n\n- a\n- b\n\n```python\nx = 1\n\n\ny = 2\n```\n\n'
+           '| a | b |\n|---|---|\n| 1 | 2 |\n\n> 引用\n\n1. one\n2. two\n')
+
+    def test_split_blocks(self):
+        """测试按顶层块拆分，块公式中的空行不拆开"""
+        from mdnice.incremental import split_blocks
+
+        blocks, dependencies = split_blocks(self.DOC)
+        assert len(blocks) == 7 and not dependencies
+        assert blocks[3] == '```python\nx = 1\n\n\ny = 2\n```\n'
+        assert split_blocks('$$\na\n\nb\n$$\n\nc\n')[0] == ['$$\na\n\nb\n$$\n', 'c\n']
+        assert split_blocks('正文[^1]\n\n[^1]: 注释\n')[1] == ['脚注']
+        assert split_blocks('[a][1]\n\n[1]: /x\n')[1] == ['引用式链接定义']
+        assert split_blocks('[a](https://x.com)\n')[1] == ['外链']
+
+    def test_only_changed_blocks_rendered(self):
+        """测试只重新渲染变化的块，结果与整篇渲染一致"""
+        from mdnice import IncrementalPreview
+
+        converter = MarkdownConverter()
+        preview = IncrementalPreview(converter, theme='rose', engine='offline')
+        for platform in ('wechat', 'zhihu'):
+            for doc in (self.DOC, self.DOC.replace('第一段', '修改后的第一段')):
+                expected = converter._post_process(
+                    converter._render_offline(doc, 'rose', converter.code_theme, converter.mac_style, platform))
+                assert preview.render(doc, platform=platform) == expected
+
+        stats = preview.stats()
+        assert stats['rendered'] == 16 and stats['reused'] == 12
+        assert stats['full_renders'] == 0
+
+    def test_cross_block_syntax_falls_back(self):
+        """测试块之间互相依赖时整篇渲染"""
+        from mdnice import IncrementalPreview
+
+        preview = IncrementalPreview(MarkdownConverter(), engine='offline')
+        html = preview.render('正文[^1]\n\n[^1]: 注释\n')
+        assert '注释' in html
+        assert preview.stats()['full_renders'] == 1 and preview.stats()['fragments'] == 0
+
+    def test_data_urls_evicted_with_fragments(self):
+        """测试 Data URL 图片随片段一起淘汰，不在会话中累积"""
+        import base64
+        from mdnice import IncrementalPreview
+
+        png = 'data:image/png;base64,' + base64.b64encode(bytes(range(256)) * 4).decode()
+        preview = IncrementalPreview(MarkdownConverter(), engine='offline', max_fragments=2)
+        assert f'src="{png}"' in preview.render(f'# 标题\n\n![图]({png})\n')
+        preview.render('# 新标题\n\n新段落\n')
+        assert len(preview._fragments) == 2
+        assert not any(png in fragment for fragment in preview._fragments.values())
+
+    def test_hybrid_engine(self):
+        """测试 hybrid 引擎在 convert 之外直接渲染时统计可用"""
+        from mdnice import IncrementalPreview
+
+        converter = MarkdownConverter()
+        preview = IncrementalPreview(converter, engine='hybrid')
+        assert '段落' in preview.render('# 标题\n\n段落\n')
+        assert '修改' in preview.render('# 标题\n\n修改段落\n')
+        assert converter.hybrid_stats['offline'] == 2 and converter.hybrid_stats['fallback'] == 0
+
+
+class TestSectionedRendering:
+    """测试超长文档分段并行渲染"""
+
+    DOC = ''.join(f'## 第 {i} 节\n\n段落 {i} [链接][a]\n\n```python\nx = {i}\n```\n\n' for i in range(6)) + \
+        '[a]: https://example.com/a "标题"\n'
+
+    def test_split_sections(self):
+        """测试按标题拆分，引用式链接定义追加到每一段"""
+        from mdnice.sections import split_sections
+
+        sections = split_sections(self.DOC, 3)
+        assert len(sections) == 3
+        assert all(section.startswith('## 第') for section in sections)
+        assert all('[A]: <https://example.com/a> "标题"' in section for section in sections)
+        assert split_sections(self.DOC, 1) == [self.DOC]
+        assert len(split_sections('## a\n\n正文[^1]\n\n## b\n\n[^1]: 注释\n', 2)) == 1
+
+    def test_stitch_renumbers_footnotes(self):
+        """测试拼接时外链脚注顺延编号并合并到文末"""
+        from mdnice.sections import stitch_sections
+
+        def section(word: str, url: str) -> str:
+            return (f'<section id="nice"><p><span class="footnote-word">{word}</span>'
+                    f'<sup class="footnote-ref">[1]</sup></p><h3 class="footnotes-sep">参考资料</h3>'
+                    f'<section class="footnotes"><span class="footnote-item"><span class="footnote-num">[1] </span>'
+                    f'<p>{word}: <em>{url}</em></p></span></section></section>')
+
+        html = stitch_sections([section('甲', 'https://a.com'), section('乙', 'https://b.com')])
+        assert html.count('class="footnotes-sep"') == 1 and html.count('class="footnotes"') == 1
+        assert '乙</span><sup class="footnote-ref">[2]</sup>' in html
+        assert html.index('[2] </span><p>乙') > html.index('[1] </span><p>甲') > html.index('footnotes-sep')
+
+    def test_parallel_render_matches_whole(self, monkeypatch):
+        """测试各段在不同线程中渲染，拼接结果与整篇渲染一致"""
+        import threading
+
+        renderer = OfflineRenderer()
+        threads = set()
+
+        def fake_render(self, md_content, theme, code_theme, mac_style, platform, clear_editor=False):
+            threads.add(threading.get_ident())
+            return renderer.render(md_content, theme, code_theme, mac_style, platform)
+
+        monkeypatch.setattr(MarkdownConverter, '_ensure_browser', lambda self: None)
+        monkeypatch.setattr(MarkdownConverter, '_close_driver', lambda self: None)
+        monkeypatch.setattr(MarkdownConverter, '_render_in_browser', fake_render)
+
+        converter = MarkdownConverter(render_pages=3, parallel_min_chars=0, clean_html=False)
+        html = converter.convert(self.DOC, theme='normal')
+        assert html == renderer.render(self.DOC, 'normal', converter.code_theme, converter.mac_style)
+        assert len(threads) >= 2  # 第一段在当前线程，其余段在工作线程
+
+    def test_section_workers_reused(self, monkeypatch):
+        """测试分段渲染的工作浏览器在多篇文档之间复用、在各自线程中关闭，且不共享可变状态"""
+        import threading
+        from mdnice.sections import split_sections
+
+        renderer = OfflineRenderer()
+        launches, closes = [], []
+
+        class FakePage:
+            def close(self):
+                closes.append(threading.get_ident())
+
+        def fake_ensure_browser(self):
+            if self.page is None:
+                launches.append(threading.get_ident())
+                self.page = FakePage()
+
+        def fake_render(self, md_content, theme, code_theme, mac_style, platform, clear_editor=False):
+            return renderer.render(md_content, theme, code_theme, mac_style, platform)
+
+        monkeypatch.setattr(MarkdownConverter, '_ensure_browser', fake_ensure_browser)
+        monkeypatch.setattr(MarkdownConverter, '_render_in_browser', fake_render)
+
+        converter = MarkdownConverter(render_pages=3, parallel_min_chars=0, clean_html=False)
+        expected = renderer.render(self.DOC, 'normal', converter.code_theme, converter.mac_style)
+        assert converter.convert([self.DOC, self.DOC], theme='normal') == [expected, expected]
+        assert len(launches) == len(split_sections(self.DOC, 3))  # 第二篇文档复用已启动的浏览器
+        assert sorted(closes) == sorted(launches)  # 每个浏览器在启动它的线程中关闭
+        assert converter._section_workers == []
+
+        worker = converter._spawn_worker()
+        for name in ('post_processor', 'hybrid_stats', 'compact_stats', 'output_stats', 'url_list',
+                     '_uploaded_images', '_image_hashes', '_ui_state', '_api_prefetched', '_clipboard_granted_origins'):
+            assert getattr(worker, name) is not getattr(converter, name), name
+
+
+class TestDataURLs:
+    """测试 Data URL 图片提取"""
+
+    PNG = 'data:image/png;base64,' + __import__('base64').b64encode(bytes(range(256)) * 4).decode()
+
+    def test_extract_and_restore(self):
+        """测试相同图片共用一个占位地址，恢复后与原文一致"""
+        from mdnice.data_urls import PLACEHOLDER_PREFIX, extract_data_urls, restore_data_urls
+
+        md = f'![a]({self.PNG})\n\n<img src="{self.PNG}">\n\n![小图](data:image/gif;base64,R0lGODlhAQABAAAAACw=)\n'
+        extracted, data_urls = extract_data_urls(md)
+        assert len(data_urls) == 1 and self.PNG not in extracted
+        assert extracted.count(PLACEHOLDER_PREFIX) == 2
+        assert 'data:image/gif' in extracted  # 短 Data URL 保持原样
+        assert restore_data_urls(extracted, data_urls) == md
+        assert extract_data_urls('![坏](data:image/png;base64,' + 'A' * 301 + ')')[1] == {}
+
+    def test_cache_keeps_only_digests(self):
+        """测试解码缓存只保存摘要和占位地址，不保存 Data URL 原文"""
+        from mdnice import data_urls
+
+        data_urls.extract_data_urls(f'![a]({self.PNG})')
+        assert all(len(key) == 32 and (value is None or len(value) < 100)
+                   for key, value in data_urls._placeholder_cache.items())
+
+    def test_unusual_subtypes(self):
+        """测试 MIME 子类型含 - 和 . 时占位地址仍能恢复"""
+        from mdnice.data_urls import extract_data_urls, restore_data_urls
+
+        payload = self.PNG.split(',', 1)[1]
+        md = ''.join(f'![{subtype}](data:image/{subtype};base64,{payload})\n\n'
+                     for subtype in ('x-icon', 'vnd.microsoft.icon', 'x-portable-bitmap', 'vnd.adobe.photoshop'))
+        extracted, data_urls = extract_data_urls(md)
+        assert len(data_urls) == 4 and 'data:image/' not in extracted
+        assert '.ico)' in extracted and '.xportablebitmap)' in extracted
+        assert restore_data_urls(f'<p>{extracted}</p>', data_urls) == f'<p>{md}</p>'
+
+    def test_convert_restores_data_urls(self, monkeypatch):
+        """测试渲染时只出现占位地址，输出中恢复原始 Data URL"""
+        converter = MarkdownConverter()
+        rendered = []
+        original = converter._render_offline
+
+        def render_offline(md_content, *args):
+            rendered.append(md_content)
+            return original(md_content, *args)
+
+        monkeypatch.setattr(converter, '_render_offline', render_offline)
+        html = converter.convert(f'![图]({self.PNG})', engine='offline')
+        assert self.PNG not in rendered[0]
+        assert f'src="{self.PNG}"' in html
@@ -0,0 +1,159 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：输出文件写入单元测试
+# 文件路径：tests/test_output.py
+
+import gzip
+import os
+
+import pytest
+
+from mdnice import MarkdownConverter
+from mdnice.output import check_compression, write_if_changed
+
+
+class TestWriteIfChanged:
+    """测试输出文件写入"""
+
+    def test_skip_unchanged(self, tmp_path):
+        """测试内容未变化时不重写，变化时原子替换且不留临时文件"""
+        path = tmp_path / 'a.html'
+        assert write_if_changed(path, '<p>一</p>')
+        os.utime(path, (0, 0))
+
+        assert not write_if_changed(path, '<p>一</p>')
+        assert path.stat().st_mtime == 0
+
+        assert write_if_changed(path, '<p>二</p>')
+        assert path.read_text(encoding='utf-8') == '<p>二</p>'
+        assert [p.name for p in tmp_path.iterdir()] == ['a.html']
+
+    @pytest.mark.skipif(os.name == 'nt', reason='Windows 不支持 POSIX 权限位')
+    def test_file_mode(self, tmp_path):
+        """测试新文件按 umask 设置权限，重写时保留原有权限"""
+        from mdnice import output
+
+        path = tmp_path / 'a.html'
+        write_if_changed(path, '<p>一</p>', ['gzip'])
+        expected = 0o666 & ~output._UMASK
+        assert path.stat().st_mode & 0o777 == expected
+        assert (tmp_path / 'a.html.gz').stat().st_mode & 0o777 == expected
+
+        os.chmod(path, 0o640)
+        write_if_changed(path, '<p>二</p>')
+        assert path.stat().st_mode & 0o777 == 0o640
+
+    def test_gzip_sidecar(self, tmp_path):
+        """测试 gzip 副本随主文件更新，缺失时补写"""
+        path = tmp_path / 'a.html'
+        write_if_changed(path, '<p>一</p>', ['gzip'])
+        sidecar = tmp_path / 'a.html.gz'
+        assert gzip.decompress(sidecar.read_bytes()).decode('utf-8') == '<p>一</p>'
+
+        sidecar.unlink()
+        assert not write_if_changed(path, '<p>一</p>', ['gzip'])
+        assert sidecar.exists()
+
+        write_if_changed(path, '<p>二</p>', ['gzip'])
+        assert gzip.decompress(sidecar.read_bytes()).decode('utf-8') == '<p>二</p>'
+
+    def test_check_compression(self):
+        """测试不支持的压缩格式"""
+        with pytest.raises(ValueError):
+            check_compression(['zip'])
+        with pytest.raises(ValueError):
+            MarkdownConverter(output_compression=['zip'])
+
+
+class TestSaveHTML:
+    """测试转换器保存文件"""
+
+    def test_batch_summary(self, tmp_path):
+        """测试重复生成时跳过未变化的文件，内容文件名不含时间戳"""
+        converter = MarkdownConverter()
+        converter._save_html('<p>一</p>', tmp_path, 'a.md')
+        first = converter._save_html('<p>二</p>', tmp_path)
+        assert converter.output_stats == {'written': 2, 'skipped': 0}
+
+        converter._save_html('<p>一</p>', tmp_path, 'a.md')
+        assert converter._save_html('<p>二</p>', tmp_path) == first
+        assert converter.output_stats == {'written': 2, 'skipped': 2}
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted(['a_wechat.html', first.name])
+
+
+class TestOutputSinks:
+    """测试输出目标"""
+
+    MD = ['# 一\n\n正文', '# 二\n\n正文']
+
+    def test_archive_sink(self, tmp_path):
+        """测试归档输出逐项写入，完整 HTML 共用一份样式表，同名不同内容自动改名"""
+        pytest.importorskip('markdown_it')
+        import tarfile
+        import zipfile
+        from mdnice import ArchiveSink
+
+        converter = MarkdownConverter()
+        with ArchiveSink(tmp_path / 'out.zip') as sink:
+            locations = converter.convert(self.MD, output_dir=sink, return_html=False,
+                                          wrap_full_html=True, engine='offline')
+            converter._save_to_sink('<p>x</p>', sink, 'a.md')
+            converter._save_to_sink('<p>y</p>', sink, 'a.md')
+            converter._save_to_sink('<p>y</p>', sink, 'a.md')
+        assert sink.stats == {'written': 4, 'skipped': 1}
+        with zipfile.ZipFile(tmp_path / 'out.zip') as archive:
+            names = archive.namelist()
+            page = archive.read(locations[0]).decode('utf-8')
+        assert names[0] == 'style.css' and names[-2:] == ['a_wechat.html', 'a_wechat-2.html']
+        assert '<link rel="stylesheet" href="style.css">' in page and '<style>' not in page
+
+        with ArchiveSink(tmp_path / 'out.tar.gz') as sink:
+            converter.convert(self.MD, output_dir=sink, engine='offline')
+        with tarfile.open(tmp_path / 'out.tar.gz') as archive:
+            assert len(archive.getnames()) == 2
+
+    def test_jsonlines_sink(self, tmp_path):
+        """测试 JSON Lines 输出每项一行并附带平台信息"""
+        pytest.importorskip('markdown_it')
+        import json
+        from mdnice import JSONLinesSink
+
+        with JSONLinesSink(tmp_path / 'out.jsonl') as sink:
+            html = MarkdownConverter().convert(self.MD, output_dir=sink, platform=['wechat', 'zhihu'],
+                                               engine='offline')
+        records = [json.loads(line) for line in (tmp_path / 'out.jsonl').read_text(encoding='utf-8').splitlines()]
+        assert [r['platform'] for r in records] == ['wechat', 'zhihu'] * 2
+        assert records[2]['html'] == html['wechat'][1]
+        assert records[0]['name'].startswith('article_wechat_')
+
+        with JSONLinesSink(tmp_path / 'out.jsonl') as sink:
+            MarkdownConverter().convert(self.MD, output_dir=sink, engine='offline')
+        assert len((tmp_path / 'out.jsonl').read_text(encoding='utf-8').splitlines()) == 2
+        with JSONLinesSink(tmp_path / 'out.jsonl', append=True) as sink:
+            MarkdownConverter().convert(self.MD, output_dir=sink, engine='offline')
+        assert len((tmp_path / 'out.jsonl').read_text(encoding='utf-8').splitlines()) == 4
+
+    def test_sink_requires_write(self):
+        """测试没有实现 _write 的输出目标在创建时报错"""
+        from mdnice import OutputSink
+
+        class IncompleteSink(OutputSink):
+            pass
+
+        with pytest.raises(TypeError):
+            IncompleteSink()
+
+    def test_directory_sink(self, tmp_path):
+        """测试目录输出与传入目录路径结果一致"""
+        pytest.importorskip('markdown_it')
+        from mdnice import DirectorySink
+
+        converter = MarkdownConverter()
+        converter.convert(self.MD, output_dir=tmp_path / 'a', wrap_full_html=True, engine='offline')
+        sink = DirectorySink(tmp_path / 'b')
+        converter.convert(self.MD, output_dir=sink, wrap_full_html=True, engine='offline')
+        converter.convert(self.MD, output_dir=sink, wrap_full_html=True, engine='offline')
+        assert sink.stats == {'written': 2, 'skipped': 2}
+        for path in (tmp_path / 'a').iterdir():
+            assert (tmp_path / 'b' / path.name).read_bytes() == path.read_bytes()
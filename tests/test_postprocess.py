@@ -0,0 +1,128 @@
+# 作者：Xiaoqiang
+# 微信公众号：XiaoqiangClub
+# 创建时间：2025-11-18T09:57:00.672Z
+# 文件描述：HTML 后处理流水线单元测试
+# 文件路径：tests/test_postprocess.py
+
+import pytest
+
+from mdnice import MarkdownConverter
+from mdnice.postprocess import PostProcessor, Tag, drop_empty_spans, rewrite_image_urls, rule, strip_editor_marks
+
+HTML = ('<section id="nice" data-tool="mdnice编辑器" data-website="https://www.mdnice.com">'
+        '<h2 data-tool="mdnice编辑器"><span class="prefix" style="display: none;"></span>'
+        '<span class="content">标题</span><span></span></h2>'
+        '<!-- <img src="http://comment.com/a.png"> -->'
+        '<p data-tool="other">正文<img src="http://a.com/x.png?a=1&amp;b=2" alt="图"></p>'
+        '<pre><span style="display: block; background: url(dots.svg);"></span><code>x</code></pre></section>')
+
+
+class TestPostProcessor:
+    """测试后处理流水线"""
+
+    def test_builtin_rules(self):
+        """测试内置规则在一次扫描中生效，未修改的部分原样保留"""
+        processor = PostProcessor([
+            strip_editor_marks,
+            drop_empty_spans,
+            rewrite_image_urls(lambda url: url.replace('http://', 'https://cdn.example.com/')),
+        ])
+        html = processor.process(HTML)
+        assert 'mdnice编辑器' not in html and 'data-website' not in html
+        assert '<p data-tool="other">' in html
+        assert '<span class="prefix"' not in html and '<span></span>' not in html
+        assert 'background: url(dots.svg);"></span>' in html  # 带样式的装饰元素保留
+        assert 'src="https://cdn.example.com/a.com/x.png?a=1&amp;b=2"' in html
+        assert 'http://comment.com' in html  # 注释中的标签不处理
+
+    def test_custom_rule_and_noop(self):
+        """测试自定义规则只作用于指定标签，没有修改时返回原字符串"""
+        seen = []
+
+        @rule('h2')
+        def add_class(tag: Tag) -> None:
+            seen.append(tag.name)
+            tag.attrs['class'] = 'title'
+
+        html = PostProcessor([add_class]).process(HTML)
+        assert seen == ['h2'] and '<h2 data-tool="mdnice编辑器" class="title">' in html
+        assert PostProcessor([]).process(HTML) is HTML
+        assert PostProcessor([lambda tag: None]).process(HTML) is HTML
+
+    def test_marker_rule_skips_other_tags(self):
+        """测试带预检子串的规则只处理属性中包含该子串的标签"""
+        seen = []
+
+        @rule(markers=('data-tool',))
+        def record(tag: Tag) -> None:
+            seen.append(tag.name)
+
+        PostProcessor([record]).process(HTML)
+        assert seen == ['section', 'h2', 'p']
+
+    def test_converter_post_processors(self):
+        """测试转换器按 clean_html 和自定义规则后处理输出"""
+        rewrite = rewrite_image_urls(lambda url: 'https://cdn.example.com/x.png')
+        converter = MarkdownConverter(post_processors=[rewrite])
+        html = converter._post_process(HTML)
+        assert 'mdnice编辑器' not in html and 'https://cdn.example.com/x.png' in html
+
+        raw = MarkdownConverter(clean_html=False)._post_process(HTML)
+        assert raw == HTML
+
+
+class TestCompactHTML:
+    """测试 HTML 压缩"""
+
+    def test_redundant_declarations(self):
+        """测试删除重复、被简写覆盖、与继承值相同和等于默认值的声明"""
+        from mdnice.compact import compact_html
+
+        html = ('<section style="color: #333; font-size: 16px; font-family: &quot;PingFang SC&quot;, serif;">\n'
+                '<p style="color: #333; margin-top: 5px; margin: 0 0 8px; color: red; color: #333;">'
+                '<span style="margin: 0; color: #333; display: inline;">字</span>'
+                '<strong style="font-weight: bold; font-size: 16px;">粗</strong></p>\n'
+                '<h2 style="font-size: 16px; color: #333 !important;">标题</h2>\n'
+                '<pre style="margin: 0;"><code style="font-size: 16px;">a\n  b</code>\n</pre>\n</section>')
+        compacted, saved = compact_html(html)
+        assert saved == len(html.encode('utf-8')) - len(compacted.encode('utf-8')) > 0
+        assert 'font-family:\'PingFang SC\',serif' in compacted
+        assert '<p style="margin:0 0 8px">' in compacted
+        assert '<span>字</span>' in compacted
+        assert '<strong style="font-weight:bold">' in compacted  # strong 有浏览器默认字重，保留
+        assert '<h2 style="font-size:16px;color:#333!important">' in compacted
+        assert '<pre style="margin:0"><code style="font-size:16px">a\n  b</code>\n</pre>' in compacted
+        assert '</p><h2' in compacted
+
+    def test_shorthand_keeps_unrelated_longhands(self):
+        """测试简写只覆盖自己重置的长写属性（border 不覆盖 border-radius，overflow 不覆盖 overflow-wrap）"""
+        from mdnice.compact import compact_html
+
+        compacted, _ = compact_html('<section><p style="border-radius: 8px; border-top-color: blue; '
+                                    'border: 1px solid red; overflow-wrap: anywhere; outline-offset: 2px; '
+                                    'overflow-x: hidden; outline: none; overflow: auto;">x</p></section>')
+        assert '<p style="border-radius:8px;border:1px solid red;overflow-wrap:anywhere;outline-offset:2px;' \
+               'outline:none;overflow:auto">' in compacted
+
+    def test_structure_kept_for_platforms(self):
+        """测试各平台输出压缩后结构不变"""
+        pytest.importorskip('markdown_it')
+        from mdnice.compact import compact_html
+        from mdnice.offline import OfflineRenderer, _structure_signature
+
+        md = '# 标题\n\n正文 **加粗** [链接](https://example.com)\n\n- 列表\n\n```python\nx = 1\n```\n'
+        for platform in MarkdownConverter.PLATFORM_CONFIG:
+            html = OfflineRenderer().render(md, theme='rose', platform=platform)
+            compacted, saved = compact_html(html)
+            assert saved > 0 or platform == 'zhihu'
+            (tags, text), (compacted_tags, compacted_text) = map(_structure_signature, (html, compacted))
+            assert tags == compacted_tags
+            assert text.replace(' ', '') == compacted_text.replace(' ', '')  # 只去掉块级元素之间的空白
+
+    def test_converter_compact(self):
+        """测试转换器压缩输出并统计节省的字节数"""
+        pytest.importorskip('markdown_it')
+        converter = MarkdownConverter(compact=True)
+        html = converter.convert('# 标题\n\n正文', engine='offline')
+        assert 'style="' in html and '; ' not in html
+        assert converter.compact_stats['output_bytes'] < converter.compact_stats['input_bytes']